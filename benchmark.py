@@ -0,0 +1,236 @@
+"""Замеры производительности путей данных без графического интерфейса.
+
+Каждый замер вызывает те же запросы, что и формы: поиск клиентов,
+список платежей с итогом, прибыль заказа, три отчета формы отчетов,
+выгрузку в Excel и PDF и фоновые проверки. Результаты пишутся в JSON,
+чтобы сравнивать их между коммитами.
+
+Замеры выполняются на отдельной БД, созданной генератором
+database.synthetic: фоновые проверки пишут в нее уведомления.
+
+    python -m database.synthetic bench.db --tier 1m
+    python benchmark.py bench.db -o results.json
+    python benchmark.py bench.db -o new.json --compare results.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import func
+from database import init_db, Session, queries
+from database.models import Client, Carrier, Order, Payment, Document, LedgerMonthly, JobState, Notification
+from engine import Engine
+from utils.background_tasks import BackgroundTaskManager
+from utils.config import DATABASE_URL_ENV
+
+# Число повторов каждого замера (первый запуск учитывается отдельно)
+DEFAULT_REPEAT = 5
+
+# Размер страницы списков форм
+PAGE_SIZE = 200
+
+# Строка поиска клиентов (есть в названиях синтетических клиентов)
+SEARCH_TEXT = "Транс"
+
+# Число заказов для замера расчета прибыли
+PROFIT_ORDERS = 100
+
+# Примерный размер выгрузки реестра платежей: выбирается клиент с близким числом платежей
+EXPORT_ROWS = 20_000
+
+
+def measure(fn, repeat, setup=None):
+    """Время выполнения fn: первый запуск и статистика повторов, с.
+
+    setup() вызывается перед каждым запуском и в замер не входит.
+    """
+    times = []
+    result = None
+    for _ in range(repeat + 1):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    first, runs = times[0], times[1:]
+    return {
+        'first': first,
+        'min': min(runs),
+        'median': statistics.median(runs),
+        'max': max(runs),
+        'rows': result if isinstance(result, int) else len(result) if hasattr(result, '__len__') else None,
+    }
+
+
+class Benchmark:
+    """Набор замеров на БД из конфигурации (или переменной окружения DATABASE_URL_ENV)"""
+
+    def __init__(self, repeat=DEFAULT_REPEAT):
+        self.repeat = repeat
+        self.engine = init_db()
+        self.Session = Session
+        self.session = Session()
+        self.today = self._last_order_date()
+        self.year = self.today.year
+        self.results = {}
+
+    def _last_order_date(self):
+        return self.session.query(func.max(Order.order_date)).scalar() or date.today()
+
+    def counts(self):
+        return {
+            model.__tablename__: self.session.query(func.count(model.id)).scalar()
+            for model in (Client, Carrier, Order, Payment, Document)
+        }
+
+    def run(self, name, fn, setup=None):
+        self.session.rollback()
+        self.results[name] = result = measure(fn, self.repeat, setup)
+        print(f"{name:32} {result['median'] * 1000:10.1f} мс  (первый {result['first'] * 1000:.1f} мс)",
+              file=sys.stderr)
+
+    def _export_client(self):
+        """Клиент, у которого за год около EXPORT_ROWS платежей"""
+        counts = self.session.query(
+            LedgerMonthly.client_id, func.sum(LedgerMonthly.payment_count)
+        ).filter(LedgerMonthly.year == self.year).group_by(LedgerMonthly.client_id).all()
+        if not counts:
+            return None
+        return min(counts, key=lambda item: abs(item[1] - EXPORT_ROWS))[0]
+
+    def run_all(self):
+        session = self.session
+
+        # Формы: первая страница списка клиентов, поиск, платежи за месяц с итогом
+        self.run('clients.first_page', lambda: queries.client_page(session, "", "Все", None, PAGE_SIZE))
+        self.run('clients.search', lambda: queries.client_page(session, SEARCH_TEXT, "Все", None, PAGE_SIZE))
+        month_ago = self.today - timedelta(days=30)
+        self.run('payments.first_page', lambda: queries.payment_page(
+            session, None, month_ago, self.today, None, PAGE_SIZE))
+        self.run('payments.total', lambda: queries.payment_total(session, None, month_ago, self.today))
+        # В синтетической БД у клиента 1 больше всего заказов
+        top_client = 1
+        self.run('payments.client_year', lambda: queries.payment_page(
+            session, top_client, date(self.year, 1, 1), self.today, None, PAGE_SIZE))
+
+        # Прибыль заказа (OrderForm.calculate_profit) для набора заказов
+        max_id = session.query(func.max(Order.id)).scalar() or 0
+        order_ids = range(1, max_id + 1, max(1, max_id // PROFIT_ORDERS))
+        self.run('orders.profit', lambda: [
+            session.query(Order.profit).filter(Order.id == order_id).scalar()
+            for order_id in order_ids
+        ])
+
+        # Отчеты формы отчетов
+        engine = Engine()
+        self.run('reports.monthly_profit', lambda: engine.monthly_profit(self.year, session=session).rows)
+        self.run('reports.client_profit', lambda: engine.client_profit(self.year, session=session).rows)
+        self.run('reports.carrier_activity', lambda: engine.carrier_activity(self.year, session=session).rows)
+
+        # Выгрузка реестра платежей одного клиента в Excel и PDF
+        client_id = self._export_client()
+        with tempfile.TemporaryDirectory() as directory:
+            for file_format in ('xlsx', 'pdf'):
+                path = os.path.join(directory, f"register.{file_format}")
+                self.run(f'export.{file_format}', lambda: engine.export(
+                    'payment_register', path, file_format, self.year, client_id, session=session))
+
+        self._run_background_checks()
+        session.close()
+        return self.results
+
+    def _run_background_checks(self):
+        """Фоновые проверки: полный проход без состояния и повторный (инкрементальный)"""
+        manager = BackgroundTaskManager(start=False)
+
+        def reset_state():
+            session = self.Session()
+            try:
+                session.query(JobState).delete()
+                session.query(Notification).delete()
+                session.commit()
+            finally:
+                session.close()
+
+        def job(check):
+            def run():
+                check()
+                manager.Session.remove()
+            return run
+
+        self.run('background.overdue_full', job(manager.check_overdue_payments), setup=reset_state)
+        self.run('background.overdue_incremental', job(manager.check_overdue_payments))
+        self.run('background.upcoming_full', job(manager.check_upcoming_orders), setup=reset_state)
+        self.run('background.upcoming_incremental', job(manager.check_upcoming_orders))
+        manager.stop()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """Таблица изменений медианы относительно прошлого прогона"""
+    lines = [f"{'замер':32} {'было, мс':>10} {'стало, мс':>10} {'изм.':>7}"]
+    for name, result in results['results'].items():
+        old = baseline['results'].get(name)
+        if old is None:
+            lines.append(f"{name:32} {'-':>10} {result['median'] * 1000:10.1f}")
+            continue
+        ratio = result['median'] / old['median'] if old['median'] else float('inf')
+        lines.append(f"{name:32} {old['median'] * 1000:10.1f} {result['median'] * 1000:10.1f} {ratio:6.2f}x")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности MurphyLogistik")
+    parser.add_argument('database', help="файл БД SQLite (см. python -m database.synthetic)")
+    parser.add_argument('-o', '--output', help="файл результатов JSON (по умолчанию стандартный вывод)")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--compare', help="JSON прошлого прогона для сравнения")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.database):
+        parser.error(f"нет файла БД: {args.database}")
+    os.environ[DATABASE_URL_ENV] = f"sqlite:///{os.path.abspath(args.database)}"
+
+    benchmark = Benchmark(args.repeat)
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': os.path.abspath(args.database),
+            'counts': benchmark.counts(),
+            'repeat': args.repeat,
+        },
+        'results': benchmark.run_all(),
+    }
+
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print(compare(results, json.load(f)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
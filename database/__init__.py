@@ -1,7 +1 @@
-from sqlalchemy import create_engine
-from .models import Base
-
-def init_db():
-    engine = create_engine('sqlite:///murphylogistik.db')
-    Base.metadata.create_all(bind=engine)
-    return engine
\ No newline at end of file
+from .session import init_db, get_engine, dispose_engine, Session, ScopedSession
@@ -0,0 +1,37 @@
+"""Обслуживание БД из командной строки.
+
+Запуск: python -m database {migrate, rebuild-ledger, verify-balances, rebuild-balances}
+"""
+import argparse
+import logging
+from . import init_db, get_engine, aggregates, migrations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m database', description="Обслуживание БД")
+    parser.add_argument('command', choices=['migrate', 'rebuild-ledger', 'verify-balances', 'rebuild-balances'])
+    args = parser.parse_args(argv)
+
+    if args.command == 'migrate':
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        print(f"Версия схемы: {migrations.migrate(get_engine())}")
+        return 0
+
+    engine = init_db()
+    with engine.begin() as connection:
+        if args.command == 'rebuild-ledger':
+            aggregates.rebuild_ledger(connection)
+            print("Помесячные итоги пересчитаны")
+        elif args.command == 'verify-balances':
+            mismatches = aggregates.verify_order_balances(connection)
+            for order_id, stored, actual in mismatches:
+                print(f"Заказ #{order_id}: сохранено {stored:.2f}, по платежам {actual:.2f}")
+            print(f"Расхождений: {len(mismatches)}")
+        elif args.command == 'rebuild-balances':
+            aggregates.rebuild_order_balances(connection)
+            print("Итоги заказов пересчитаны")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,202 @@
+"""Агрегаты платежей, которые поддерживаются триггерами SQLite.
+
+ledger_monthly хранит суммы по ключу (год, месяц, клиент, перевозчик,
+направление платежа), а колонки orders.income_total / expense_total /
+profit - итоги по каждому заказу. Триггеры обновляют их в той же
+транзакции, что и изменение платежа, поэтому итоги верны для любых
+способов записи (формы, массовый импорт, ручные правки БД).
+
+Обслуживание: python -m database {rebuild-ledger, verify-balances, rebuild-balances}
+"""
+from sqlalchemy import text
+
+# Ключ строки итогов для платежа P (NEW или OLD в триггере)
+_LEDGER_KEY = """
+    COALESCE(CAST(strftime('%Y', {p}.payment_date) AS INTEGER), 0),
+    COALESCE(CAST(strftime('%m', {p}.payment_date) AS INTEGER), 0),
+    COALESCE((SELECT client_id FROM orders WHERE id = {p}.order_id), 0),
+    COALESCE((SELECT carrier_id FROM orders WHERE id = {p}.order_id), 0),
+    COALESCE({p}.is_client_payment, 0)
+"""
+
+_LEDGER_UPSERT = """
+    INSERT INTO ledger_monthly
+        (year, month, client_id, carrier_id, is_client_payment, amount, payment_count)
+    VALUES ({key}, {sign} {p}.amount, {sign} 1)
+    ON CONFLICT (year, month, client_id, carrier_id, is_client_payment) DO UPDATE SET
+        amount = amount + excluded.amount,
+        payment_count = payment_count + excluded.payment_count;
+"""
+
+# Перенос итогов заказа при смене клиента или перевозчика
+_LEDGER_MOVE_ORDER = """
+    INSERT INTO ledger_monthly
+        (year, month, client_id, carrier_id, is_client_payment, amount, payment_count)
+    SELECT
+        COALESCE(CAST(strftime('%Y', payment_date) AS INTEGER), 0),
+        COALESCE(CAST(strftime('%m', payment_date) AS INTEGER), 0),
+        COALESCE({o}.client_id, 0),
+        COALESCE({o}.carrier_id, 0),
+        COALESCE(is_client_payment, 0),
+        {sign} SUM(amount),
+        {sign} COUNT(*)
+    FROM payments
+    WHERE order_id = {o}.id
+    GROUP BY 1, 2, 5
+    ON CONFLICT (year, month, client_id, carrier_id, is_client_payment) DO UPDATE SET
+        amount = amount + excluded.amount,
+        payment_count = payment_count + excluded.payment_count;
+"""
+
+
+def _ledger_upsert(row, sign):
+    return _LEDGER_UPSERT.format(key=_LEDGER_KEY.format(p=row), p=row, sign=sign)
+
+
+LEDGER_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_ledger_payment_insert
+    AFTER INSERT ON payments
+    BEGIN
+        {_ledger_upsert('NEW', '+')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_ledger_payment_delete
+    AFTER DELETE ON payments
+    BEGIN
+        {_ledger_upsert('OLD', '-')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_ledger_payment_update
+    AFTER UPDATE OF order_id, amount, payment_date, is_client_payment ON payments
+    BEGIN
+        {_ledger_upsert('OLD', '-')}
+        {_ledger_upsert('NEW', '+')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_ledger_order_update
+    AFTER UPDATE OF client_id, carrier_id ON orders
+    WHEN OLD.client_id IS NOT NEW.client_id OR OLD.carrier_id IS NOT NEW.carrier_id
+    BEGIN
+        {_LEDGER_MOVE_ORDER.format(o='OLD', sign='-')}
+        {_LEDGER_MOVE_ORDER.format(o='NEW', sign='+')}
+    END
+    """,
+]
+
+
+# Изменение итогов заказа на сумму платежа P со знаком SIGN
+_BALANCE_UPDATE = """
+    UPDATE orders SET
+        income_total = income_total + {sign} {income},
+        expense_total = expense_total + {sign} {expense},
+        profit = profit + {sign} ({income} - {expense})
+    WHERE id = {p}.order_id;
+"""
+
+
+def _balance_update(row, sign):
+    income = f"(CASE WHEN {row}.is_client_payment = 1 THEN {row}.amount ELSE 0 END)"
+    expense = f"(CASE WHEN {row}.is_client_payment = 0 THEN {row}.amount ELSE 0 END)"
+    return _BALANCE_UPDATE.format(p=row, sign=sign, income=income, expense=expense)
+
+
+BALANCE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_balance_payment_insert
+    AFTER INSERT ON payments
+    BEGIN
+        {_balance_update('NEW', '+')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_balance_payment_delete
+    AFTER DELETE ON payments
+    BEGIN
+        {_balance_update('OLD', '-')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_balance_payment_update
+    AFTER UPDATE OF order_id, amount, is_client_payment ON payments
+    BEGIN
+        {_balance_update('OLD', '-')}
+        {_balance_update('NEW', '+')}
+    END
+    """,
+]
+
+# Итоги заказов, вычисленные заново по таблице payments
+_ACTUAL_BALANCES = """
+    SELECT
+        o.id AS order_id,
+        COALESCE(SUM(CASE WHEN p.is_client_payment = 1 THEN p.amount END), 0) AS income_total,
+        COALESCE(SUM(CASE WHEN p.is_client_payment = 0 THEN p.amount END), 0) AS expense_total
+    FROM orders o
+    LEFT JOIN payments p ON p.order_id = o.id
+    GROUP BY o.id
+"""
+
+
+def install_ledger_triggers(connection):
+    """Создание триггеров, поддерживающих ledger_monthly"""
+    for ddl in LEDGER_TRIGGERS:
+        connection.exec_driver_sql(ddl)
+
+
+def rebuild_ledger(connection):
+    """Полный пересчет ledger_monthly по таблице payments"""
+    connection.execute(text("DELETE FROM ledger_monthly"))
+    connection.execute(text("""
+        INSERT INTO ledger_monthly
+            (year, month, client_id, carrier_id, is_client_payment, amount, payment_count)
+        SELECT
+            COALESCE(CAST(strftime('%Y', p.payment_date) AS INTEGER), 0),
+            COALESCE(CAST(strftime('%m', p.payment_date) AS INTEGER), 0),
+            COALESCE(o.client_id, 0),
+            COALESCE(o.carrier_id, 0),
+            COALESCE(p.is_client_payment, 0),
+            SUM(p.amount),
+            COUNT(*)
+        FROM payments p
+        LEFT JOIN orders o ON o.id = p.order_id
+        GROUP BY 1, 2, 3, 4, 5
+    """))
+
+
+def install_balance_triggers(connection):
+    """Создание триггеров, поддерживающих итоги заказов"""
+    for ddl in BALANCE_TRIGGERS:
+        connection.exec_driver_sql(ddl)
+
+
+def rebuild_order_balances(connection):
+    """Полный пересчет итогов всех заказов по таблице payments"""
+    connection.execute(text(f"""
+        UPDATE orders SET
+            income_total = actual.income_total,
+            expense_total = actual.expense_total,
+            profit = actual.income_total - actual.expense_total
+        FROM ({_ACTUAL_BALANCES}) AS actual
+        WHERE orders.id = actual.order_id
+    """))
+
+
+def verify_order_balances(connection, tolerance=0.005):
+    """Заказы, у которых сохраненные итоги расходятся с платежами.
+
+    Возвращает строки (order_id, сохраненная прибыль, фактическая прибыль).
+    """
+    return connection.execute(text(f"""
+        SELECT o.id, o.profit, actual.income_total - actual.expense_total
+        FROM orders o
+        JOIN ({_ACTUAL_BALANCES}) AS actual ON actual.order_id = o.id
+        WHERE ABS(o.income_total - actual.income_total) > :tolerance
+           OR ABS(o.expense_total - actual.expense_total) > :tolerance
+           OR ABS(o.profit - (actual.income_total - actual.expense_total)) > :tolerance
+        ORDER BY o.id
+    """), {'tolerance': tolerance}).fetchall()
+
@@ -0,0 +1,70 @@
+"""Счетчики ссылок на содержимое хранилища документов.
+
+Документ ссылается на содержимое по documents.content_hash (SHA-256),
+одно содержимое может быть приложено к любому числу заказов.
+document_blobs.ref_count - число документов с этим хешем; триггеры
+обновляют его в той же транзакции, что и изменение документа, поэтому
+удалить файл хранилища можно, как только счетчик стал нулевым.
+Файлы хранилища - utils/document_store.py.
+"""
+from sqlalchemy import text
+
+_INCREMENT = "UPDATE document_blobs SET ref_count = ref_count + 1 WHERE sha256 = NEW.content_hash;"
+_DECREMENT = "UPDATE document_blobs SET ref_count = ref_count - 1 WHERE sha256 = OLD.content_hash;"
+
+BLOB_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_blobs_document_insert
+    AFTER INSERT ON documents WHEN NEW.content_hash IS NOT NULL
+    BEGIN {_INCREMENT} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_blobs_document_delete
+    AFTER DELETE ON documents WHEN OLD.content_hash IS NOT NULL
+    BEGIN {_DECREMENT} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_blobs_document_update
+    AFTER UPDATE OF content_hash ON documents
+    WHEN OLD.content_hash IS NOT NEW.content_hash
+    BEGIN {_DECREMENT} {_INCREMENT} END
+    """,
+]
+
+
+def install_blob_triggers(connection):
+    """Создание триггеров, поддерживающих document_blobs.ref_count"""
+    for ddl in BLOB_TRIGGERS:
+        connection.exec_driver_sql(ddl)
+
+
+def rebuild_ref_counts(connection):
+    """Полный пересчет счетчиков ссылок по таблице documents"""
+    connection.execute(text("""
+        UPDATE document_blobs SET ref_count = (
+            SELECT COUNT(*) FROM documents WHERE documents.content_hash = document_blobs.sha256
+        )
+    """))
+
+
+def verify_ref_counts(connection):
+    """Содержимое с неверным счетчиком: строки (sha256, сохраненный, фактический)"""
+    return connection.execute(text("""
+        SELECT b.sha256, b.ref_count, COUNT(d.id)
+        FROM document_blobs b
+        LEFT JOIN documents d ON d.content_hash = b.sha256
+        GROUP BY b.sha256
+        HAVING b.ref_count != COUNT(d.id)
+        ORDER BY b.sha256
+    """)).fetchall()
+
+
+def dangling_documents(connection):
+    """Документы, ссылающиеся на отсутствующее в document_blobs содержимое: (id, content_hash)"""
+    return connection.execute(text("""
+        SELECT d.id, d.content_hash
+        FROM documents d
+        LEFT JOIN document_blobs b ON b.sha256 = d.content_hash
+        WHERE d.content_hash IS NOT NULL AND b.sha256 IS NULL
+        ORDER BY d.id
+    """)).fetchall()
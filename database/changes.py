@@ -0,0 +1,152 @@
+"""Счетчики изменений таблиц для обнаружения правок из других процессов.
+
+PRAGMA data_version меняется на соединении, когда другое соединение
+зафиксировало транзакцию; это проверка без чтения данных. Чтобы понять,
+какие именно таблицы изменились, триггеры увеличивают счетчик строки
+таблицы в table_changes при каждой вставке, изменении и удалении.
+
+PRAGMA data_version меняется и от фиксаций этого же процесса на других
+соединениях пула; LocalChangeTracker отделяет такие изменения от чужих.
+"""
+import threading
+from sqlalchemy import event, text
+
+CHANGES_TABLE = 'table_changes'
+
+# Таблицы, изменения которых отслеживаются
+TRACKED_TABLES = (
+    'clients', 'carriers', 'vehicles', 'drivers', 'orders',
+    'payments', 'documents', 'notifications',
+)
+
+
+def _change_triggers(table):
+    bump = (f"UPDATE {CHANGES_TABLE} SET change_count = change_count + 1 "
+            f"WHERE table_name = '{table}';")
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_changes_{table}_{event.lower()} "
+        f"AFTER {event} ON {table} BEGIN {bump} END"
+        for event in ('INSERT', 'UPDATE', 'DELETE')
+    ]
+
+
+def install_change_counters(connection):
+    """Таблица счетчиков и триггеры на отслеживаемых таблицах"""
+    connection.exec_driver_sql(
+        f"CREATE TABLE IF NOT EXISTS {CHANGES_TABLE} ("
+        "table_name VARCHAR(50) PRIMARY KEY, "
+        "change_count INTEGER NOT NULL DEFAULT 0)"
+    )
+    for table in TRACKED_TABLES:
+        connection.execute(
+            text(f"INSERT OR IGNORE INTO {CHANGES_TABLE} (table_name) VALUES (:table)"),
+            {'table': table}
+        )
+        for ddl in _change_triggers(table):
+            connection.exec_driver_sql(ddl)
+
+
+def data_version(connection):
+    """Номер версии данных для этого соединения (только SQLite)"""
+    return connection.exec_driver_sql("PRAGMA data_version").scalar()
+
+
+def change_counters(connection):
+    """Счетчики изменений: {таблица: число изменений}"""
+    return dict(
+        connection.exec_driver_sql(
+            f"SELECT table_name, change_count FROM {CHANGES_TABLE}"
+        ).fetchall()
+    )
+
+
+
+_WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+# Журнал изменений счетчиков на одном соединении (временные объекты соединения)
+LOCAL_CHANGES_TABLE = 'local_table_changes'
+_LOCAL_CHANGES_DDL = (
+    f"CREATE TEMP TABLE IF NOT EXISTS {LOCAL_CHANGES_TABLE} ("
+    "table_name VARCHAR(50) PRIMARY KEY, change_count INTEGER NOT NULL)",
+    f"CREATE TEMP TRIGGER IF NOT EXISTS trg_{LOCAL_CHANGES_TABLE} "
+    f"AFTER UPDATE OF change_count ON main.{CHANGES_TABLE} BEGIN "
+    f"INSERT INTO {LOCAL_CHANGES_TABLE} (table_name, change_count) "
+    "VALUES (NEW.table_name, NEW.change_count - OLD.change_count) "
+    "ON CONFLICT (table_name) DO UPDATE SET "
+    "change_count = change_count + excluded.change_count; END",
+)
+
+# Ключ Connection.info: журнал соединения подготовлен этим наблюдателем
+_TRACKER_KEY = 'local_changes_tracker'
+
+
+def _execute(dbapi_connection, statement):
+    """Запрос на соединении DBAPI без событий движка"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(statement)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+class LocalChangeTracker:
+    """Изменения счетчиков, сделанные транзакциями этого процесса (только SQLite).
+
+    Временный триггер на каждом соединении процесса записывает приращения
+    table_changes во временную таблицу соединения; перед фиксацией они
+    переносятся в общий счет процесса (откат транзакции откатывает и
+    журнал). take(table, moved) списывает из своих изменений не больше
+    moved и возвращает остаток - изменения других процессов.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._listeners = (
+            ('before_cursor_execute', self._before_cursor_execute),
+            ('commit', self._commit),
+        )
+        for name, listener in self._listeners:
+            event.listen(engine, name, listener)
+
+    def close(self):
+        for name, listener in self._listeners:
+            event.remove(self.engine, name, listener)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get(_TRACKER_KEY) == id(self):
+            return
+        if not statement.lstrip()[:7].upper().startswith(_WRITE_STATEMENTS):
+            return
+        dbapi_connection = conn.connection.dbapi_connection
+        if not _execute(dbapi_connection, "SELECT 1 FROM sqlite_master "
+                        f"WHERE type = 'table' AND name = '{CHANGES_TABLE}'"):
+            return
+        for ddl in _LOCAL_CHANGES_DDL:
+            _execute(dbapi_connection, ddl)
+        # Журнал мог остаться от прежнего наблюдателя
+        _execute(dbapi_connection, f"DELETE FROM {LOCAL_CHANGES_TABLE}")
+        conn.info[_TRACKER_KEY] = id(self)
+
+    def _commit(self, conn):
+        if conn.info.get(_TRACKER_KEY) != id(self):
+            return
+        dbapi_connection = conn.connection.dbapi_connection
+        rows = _execute(dbapi_connection, f"SELECT table_name, change_count FROM {LOCAL_CHANGES_TABLE}")
+        if not rows:
+            return
+        _execute(dbapi_connection, f"DELETE FROM {LOCAL_CHANGES_TABLE}")
+        with self._lock:
+            for table, count in rows:
+                self._pending[table] = self._pending.get(table, 0) + count
+
+    def take(self, table, moved):
+        with self._lock:
+            local = min(self._pending.get(table, 0), moved)
+            if local:
+                self._pending[table] -= local
+                if not self._pending[table]:
+                    del self._pending[table]
+        return moved - local
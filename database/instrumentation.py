@@ -0,0 +1,186 @@
+"""Замеры SQL-запросов общего движка.
+
+Обработчики before/after_cursor_execute записывают время выполнения
+каждого запроса, число строк (если драйвер его сообщает - в SQLite
+только для INSERT/UPDATE/DELETE) и вызвавший запрос метод приложения.
+Для SELECT в SQLite замеряется выполнение до первой строки: чтение
+остальных строк выполняется уже при выборке результата.
+
+Метод определяется по стеку вызовов: предпочтение отдается методам
+load_* (в том числе лямбдам, созданным в них и выполняемым в фоновом
+потоке), иначе берется ближайшая функция приложения вне пакета database.
+Медленные запросы пишутся с планом EXPLAIN QUERY PLAN в отдельный
+журнал с ротацией; относительный путь журнала считается от каталога
+приложения.
+"""
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from sqlalchemy import event
+from utils.config import app_path
+
+# Запрос медленнее этого порога (мс) пишется в журнал медленных запросов
+SLOW_QUERY_MS = 200
+
+SLOW_QUERY_LOG = 'slow_queries.log'
+SLOW_QUERY_LOG_BYTES = 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 3
+
+# Число последних замеров на метод для расчета перцентилей
+SAMPLE_SIZE = 1000
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+_DATABASE_DIR = os.path.join(_APP_ROOT, 'database') + os.sep
+_UNKNOWN_CALLER = "(вне приложения)"
+
+
+def percentile(values, fraction):
+    """Перцентиль по отсортированному списку (ближайший ранг)"""
+    if not values:
+        return None
+    index = max(math.ceil(fraction * len(values)) - 1, 0)
+    return values[index]
+
+
+def _label(code, module):
+    qualname = getattr(code, 'co_qualname', code.co_name).split('.<locals>')[0]
+    return qualname if '.' in qualname else f"{module}.{qualname}"
+
+
+def caller_label(frame):
+    """Метод приложения, выполняющий запрос"""
+    fallback = None
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        if filename.startswith(_APP_ROOT) and not filename.startswith(_DATABASE_DIR):
+            parts = getattr(code, 'co_qualname', code.co_name).split('.')
+            if any(part.startswith('load_') for part in parts):
+                return _label(code, frame.f_globals.get('__name__', ''))
+            if fallback is None:
+                fallback = _label(code, frame.f_globals.get('__name__', ''))
+        frame = frame.f_back
+    return fallback or _UNKNOWN_CALLER
+
+
+class _MethodStats:
+    __slots__ = ('count', 'total', 'max', 'rows', 'durations')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.durations = deque(maxlen=SAMPLE_SIZE)
+
+
+class QueryStats:
+    """Статистика запросов по вызывающим методам (потокобезопасная)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._methods = {}
+
+    def record(self, label, duration, rows):
+        with self._lock:
+            stats = self._methods.get(label)
+            if stats is None:
+                stats = self._methods[label] = _MethodStats()
+            stats.count += 1
+            stats.total += duration
+            stats.max = max(stats.max, duration)
+            if rows is not None and rows > 0:
+                stats.rows += rows
+            stats.durations.append(duration)
+
+    def snapshot(self):
+        """Показатели по методам (время в секундах), по убыванию p95"""
+        with self._lock:
+            items = [
+                (label, stats.count, stats.total, stats.max, stats.rows, sorted(stats.durations))
+                for label, stats in self._methods.items()
+            ]
+        result = [{
+            'method': label,
+            'count': count,
+            'total': total,
+            'p50': percentile(durations, 0.5),
+            'p95': percentile(durations, 0.95),
+            'max': maximum,
+            'rows': rows,
+        } for label, count, total, maximum, rows, durations in items]
+        result.sort(key=lambda item: item['p95'], reverse=True)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._methods.clear()
+
+
+_stats = QueryStats()
+
+
+def query_stats():
+    """Статистика запросов процесса"""
+    return _stats
+
+
+def _slow_query_logger(path):
+    slow_logger = logging.getLogger(__name__ + '.slow')
+    # Посторонние обработчики (например, перехват журнала в тестах) файл не заменяют
+    if not any(isinstance(handler, RotatingFileHandler) for handler in slow_logger.handlers):
+        handler = RotatingFileHandler(
+            path, maxBytes=SLOW_QUERY_LOG_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS, encoding='utf-8'
+        )
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+        slow_logger.addHandler(handler)
+        slow_logger.setLevel(logging.INFO)
+        slow_logger.propagate = False
+    return slow_logger
+
+
+def _query_plan(cursor, statement, parameters):
+    """EXPLAIN QUERY PLAN на том же соединении SQLite, минуя обработчики движка"""
+    plan_cursor = cursor.connection.cursor()
+    try:
+        plan_cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return "\n".join(f"    {row[-1]}" for row in plan_cursor.fetchall())
+    except Exception as e:
+        return f"    (план недоступен: {e})"
+    finally:
+        plan_cursor.close()
+
+
+def instrument(engine, slow_query_ms=SLOW_QUERY_MS, log=SLOW_QUERY_LOG, enabled=True):
+    """Подключение замеров к движку при его создании (параметры - секция diagnostics config.json)"""
+    if not enabled:
+        return
+    threshold = slow_query_ms / 1000
+    slow_logger = _slow_query_logger(app_path(log))
+    explain = engine.dialect.name == 'sqlite'
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - context._query_started
+        rows = cursor.rowcount
+        label = caller_label(sys._getframe(1))
+        _stats.record(label, duration, rows)
+
+        if duration >= threshold:
+            plan = ""
+            if explain and not executemany:
+                plan = "\n" + _query_plan(cursor, statement, parameters)
+            slow_logger.info(
+                "%.0f мс, строк %s, %s [%s]\n    %s%s",
+                duration * 1000, rows if rows >= 0 else "-", label,
+                threading.current_thread().name, " ".join(statement.split()), plan
+            )
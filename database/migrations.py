@@ -0,0 +1,206 @@
+"""Версионные миграции схемы БД.
+
+Применяются только шаги, которых еще нет в таблице schema_migrations.
+Шаги должны быть идемпотентными: базовый шаг создает таблицы по текущим
+моделям, поэтому последующие шаги проверяют наличие колонок и объектов.
+Запуск вручную: python -m database migrate
+"""
+import logging
+from datetime import datetime
+from sqlalchemy import inspect, text
+from .models import Base
+from . import aggregates, blobs, changes, search
+
+logger = logging.getLogger(__name__)
+
+VERSION_TABLE = 'schema_migrations'
+
+
+def _create_indexes(connection, *names):
+    """Создание индексов, объявленных в моделях, по их именам"""
+    indexes = {
+        index.name: index
+        for table in Base.metadata.sorted_tables
+        for index in table.indexes
+    }
+    for name in names:
+        indexes[name].create(bind=connection, checkfirst=True)
+
+
+def _require_sqlite(connection, feature):
+    """Шаги на триггерах SQLite нельзя молча пропустить: от них зависят отчеты"""
+    if connection.dialect.name != 'sqlite':
+        raise RuntimeError(
+            f"{feature} поддерживается только для SQLite, "
+            f"диалект БД: {connection.dialect.name}"
+        )
+
+
+def _migration_1_base_schema(connection):
+    """Базовая схема: таблицы первой версии приложения"""
+    tables = [
+        Base.metadata.tables[name] for name in (
+            'clients', 'carriers', 'vehicles', 'drivers', 'orders',
+            'payments', 'documents', 'notifications',
+        )
+    ]
+    Base.metadata.create_all(bind=connection, tables=tables, checkfirst=True)
+
+
+def _migration_2_hot_query_indexes(connection):
+    """Индексы для горячих запросов форм, отчетов и фоновых задач"""
+    _create_indexes(
+        connection,
+        'ix_clients_name',
+        'ix_carriers_company_name',
+        'ix_vehicles_carrier_id',
+        'ix_drivers_vehicle_id',
+        'ix_orders_client_id',
+        'ix_orders_carrier_id',
+        'ix_orders_loading_date_status',
+        'ix_orders_status',
+        'ix_payments_order_type_amount',
+        'ix_payments_date_type',
+        'ix_payments_type_date',
+        'ix_documents_order_id',
+        'ix_notifications_user_unread',
+    )
+    if connection.dialect.name == 'sqlite':
+        # Обновляем статистику, чтобы планировщик выбрал новые индексы
+        connection.execute(text("ANALYZE"))
+
+
+def _migration_3_monthly_ledger(connection):
+    """Таблица помесячных итогов платежей, триггеры и первичное заполнение"""
+    _require_sqlite(connection, "Помесячные итоги платежей")
+    Base.metadata.tables['ledger_monthly'].create(bind=connection, checkfirst=True)
+    aggregates.install_ledger_triggers(connection)
+    aggregates.rebuild_ledger(connection)
+
+
+def _migration_4_order_balances(connection):
+    """Итоги платежей в строке заказа, триггеры и первичное заполнение"""
+    _require_sqlite(connection, "Итоги платежей по заказам")
+    existing = {column['name'] for column in inspect(connection).get_columns('orders')}
+    for name in ('income_total', 'expense_total', 'profit'):
+        if name not in existing:
+            connection.exec_driver_sql(
+                f"ALTER TABLE orders ADD COLUMN {name} FLOAT NOT NULL DEFAULT 0"
+            )
+    aggregates.install_balance_triggers(connection)
+    aggregates.rebuild_order_balances(connection)
+
+
+def _migration_5_search_indexes(connection):
+    """FTS5-индексы для поиска клиентов и перевозчиков"""
+    if connection.dialect.name == 'sqlite':
+        search.install_search_indexes(connection)
+
+
+def _migration_6_notification_dedupe(connection):
+    """Ключ дедупликации уведомлений и уникальный индекс по нему"""
+    existing = {column['name'] for column in inspect(connection).get_columns('notifications')}
+    if 'dedupe_key' not in existing:
+        connection.exec_driver_sql("ALTER TABLE notifications ADD COLUMN dedupe_key VARCHAR(100)")
+    _create_indexes(connection, 'ux_notifications_dedupe_key')
+
+
+def _migration_7_change_counters(connection):
+    """Счетчики изменений таблиц для обновления окон других экземпляров"""
+    if connection.dialect.name == 'sqlite':
+        changes.install_change_counters(connection)
+
+
+def _migration_8_job_state(connection):
+    """Водяные знаки фоновых задач"""
+    Base.metadata.tables['job_state'].create(bind=connection, checkfirst=True)
+
+
+def _migration_9_order_external_ref(connection):
+    """Внешний номер заказа для массового импорта и уникальный индекс по нему"""
+    existing = {column['name'] for column in inspect(connection).get_columns('orders')}
+    if 'external_ref' not in existing:
+        connection.exec_driver_sql("ALTER TABLE orders ADD COLUMN external_ref VARCHAR(50)")
+    _create_indexes(connection, 'ux_orders_external_ref')
+
+
+def _migration_10_document_store(connection):
+    """Хеш содержимого документа, таблица содержимого хранилища и счетчики ссылок"""
+    existing = {column['name'] for column in inspect(connection).get_columns('documents')}
+    if 'content_hash' not in existing:
+        connection.exec_driver_sql("ALTER TABLE documents ADD COLUMN content_hash VARCHAR(64)")
+    _create_indexes(connection, 'ix_documents_content_hash')
+    Base.metadata.tables['document_blobs'].create(bind=connection, checkfirst=True)
+    blobs.install_blob_triggers(connection)
+    blobs.rebuild_ref_counts(connection)
+
+
+def _migration_11_order_date_index(connection):
+    """Индекс по дате заказа для отчета по перевозчикам"""
+    _create_indexes(connection, 'ix_orders_order_date')
+
+
+# (версия, описание, функция). Новые шаги добавляются только в конец.
+MIGRATIONS = [
+    (1, "Базовая схема", _migration_1_base_schema),
+    (2, "Индексы для горячих запросов", _migration_2_hot_query_indexes),
+    (3, "Помесячные итоги платежей", _migration_3_monthly_ledger),
+    (4, "Итоги платежей по заказам", _migration_4_order_balances),
+    (5, "Полнотекстовый поиск контрагентов", _migration_5_search_indexes),
+    (6, "Дедупликация уведомлений", _migration_6_notification_dedupe),
+    (7, "Счетчики изменений таблиц", _migration_7_change_counters),
+    (8, "Состояние фоновых задач", _migration_8_job_state),
+    (9, "Внешний номер заказа", _migration_9_order_external_ref),
+    (10, "Хранилище документов", _migration_10_document_store),
+    (11, "Индекс по дате заказа", _migration_11_order_date_index),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _ensure_version_table(connection):
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+        "version INTEGER PRIMARY KEY, "
+        "description VARCHAR(200), "
+        "applied_at DATETIME)"
+    ))
+
+
+def _record_version(connection, version, description):
+    connection.execute(
+        text(f"INSERT INTO {VERSION_TABLE} (version, description, applied_at) "
+             "VALUES (:version, :description, :applied_at)"),
+        {'version': version, 'description': description, 'applied_at': datetime.now()}
+    )
+
+
+def get_version(connection):
+    """Текущая версия схемы (0 - схема еще не создана)"""
+    if not inspect(connection).has_table(VERSION_TABLE):
+        return 0
+    return connection.execute(
+        text(f"SELECT MAX(version) FROM {VERSION_TABLE}")
+    ).scalar() or 0
+
+
+def migrate(engine):
+    """Применение недостающих миграций. Возвращает итоговую версию схемы"""
+    with engine.begin() as connection:
+        current = get_version(connection)
+        _ensure_version_table(connection)
+
+        for version, description, step in MIGRATIONS:
+            if version <= current:
+                continue
+            logger.info("Миграция БД до версии %s: %s", version, description)
+            step(connection)
+            _record_version(connection, version, description)
+            current = version
+
+        if current >= 5 and connection.dialect.name == 'sqlite':
+            # Индексы поиска могли не создаться при миграции 5: пробуем снова
+            search.ensure_search_indexes(connection)
+
+    return current
+
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, Boolean, Text, DateTime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, Boolean, Text, DateTime, Index
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -16,6 +16,10 @@ class Client(Base):
     orders = relationship("Order", back_populates="client")
     is_active = Column(Boolean, default=True)
 
+    __table_args__ = (
+        Index('ix_clients_name', 'name'),
+    )
+
 class Carrier(Base):
     __tablename__ = 'carriers'
     id = Column(Integer, primary_key=True)
@@ -26,6 +30,10 @@ class Carrier(Base):
     vehicles = relationship("Vehicle", back_populates="carrier")
     is_active = Column(Boolean, default=True)
 
+    __table_args__ = (
+        Index('ix_carriers_company_name', 'company_name'),
+    )
+
 class Vehicle(Base):
     __tablename__ = 'vehicles'
     id = Column(Integer, primary_key=True)
@@ -36,6 +44,10 @@ class Vehicle(Base):
     carrier = relationship("Carrier", back_populates="vehicles")
     driver = relationship("Driver", uselist=False, back_populates="vehicle")
 
+    __table_args__ = (
+        Index('ix_vehicles_carrier_id', 'carrier_id'),
+    )
+
 class Driver(Base):
     __tablename__ = 'drivers'
     id = Column(Integer, primary_key=True)
@@ -45,6 +57,10 @@ class Driver(Base):
     vehicle_id = Column(Integer, ForeignKey('vehicles.id'))
     vehicle = relationship("Vehicle", back_populates="driver")
 
+    __table_args__ = (
+        Index('ix_drivers_vehicle_id', 'vehicle_id'),
+    )
+
 class Order(Base):
     __tablename__ = 'orders'
     id = Column(Integer, primary_key=True)
@@ -60,6 +76,11 @@ class Order(Base):
     order_date = Column(Date)
     loading_date = Column(Date)
     status = Column(String(20), default='Создан')
+    external_ref = Column(String(50))  # Номер заказа во внешней системе (ключ для импорта)
+    # Итоги по платежам заказа, ведутся триггерами БД (см. database/aggregates.py)
+    income_total = Column(Float, nullable=False, default=0, server_default='0')
+    expense_total = Column(Float, nullable=False, default=0, server_default='0')
+    profit = Column(Float, nullable=False, default=0, server_default='0')
     documents = relationship("Document", back_populates="order")
     
     client = relationship("Client", back_populates="orders")
@@ -67,6 +88,18 @@ class Order(Base):
     vehicle = relationship("Vehicle")
     payments = relationship("Payment", back_populates="order")
 
+    __table_args__ = (
+        Index('ix_orders_client_id', 'client_id'),
+        Index('ix_orders_carrier_id', 'carrier_id'),
+        # Заказы на дату погрузки в заданных статусах (фоновая проверка)
+        Index('ix_orders_loading_date_status', 'loading_date', 'status'),
+        Index('ix_orders_status', 'status'),
+        # Отчеты по дате заказа (диапазон дат года)
+        Index('ix_orders_order_date', 'order_date'),
+        # Один заказ на внешний номер; NULL не ограничиваются
+        Index('ux_orders_external_ref', 'external_ref', unique=True),
+    )
+
 class Payment(Base):
     __tablename__ = 'payments'
     id = Column(Integer, primary_key=True)
@@ -77,15 +110,38 @@ class Payment(Base):
     description = Column(String)
     order = relationship("Order", back_populates="payments")
 
+    __table_args__ = (
+        # Покрывающий индекс для расчета прибыли по заказу
+        Index('ix_payments_order_type_amount', 'order_id', 'is_client_payment', 'amount'),
+        # Покрывающий индекс для фильтра по периоду и отчетов
+        Index('ix_payments_date_type', 'payment_date', 'is_client_payment', 'amount', 'order_id'),
+        # Просроченные платежи клиентов
+        Index('ix_payments_type_date', 'is_client_payment', 'payment_date'),
+    )
+
 class Document(Base):
     __tablename__ = 'documents'
     id = Column(Integer, primary_key=True)
     order_id = Column(Integer, ForeignKey('orders.id'))
     name = Column(String(100))
-    file_path = Column(String(200))
+    file_path = Column(String(200))  # Исходный путь файла при добавлении
     description = Column(Text)
+    content_hash = Column(String(64))  # SHA-256 содержимого в хранилище документов
     order = relationship("Order", back_populates="documents")
 
+    __table_args__ = (
+        Index('ix_documents_order_id', 'order_id'),
+        Index('ix_documents_content_hash', 'content_hash'),
+    )
+
+class DocumentBlob(Base):
+    """Содержимое в хранилище документов. ref_count ведется триггерами БД (см. database/blobs.py)"""
+    __tablename__ = 'document_blobs'
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.now)
+
 class Notification(Base):
     __tablename__ = 'notifications'
     id = Column(Integer, primary_key=True)
@@ -94,4 +150,30 @@ class Notification(Base):
     is_read = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.now)
     related_id = Column(Integer)  # ID связанного объекта (заказ, платеж и т.д.)
-    notification_type = Column(String(50))  # Тип уведомления: order, payment, document
\ No newline at end of file
+    notification_type = Column(String(50))  # Тип уведомления: order, payment, document
+    dedupe_key = Column(String(100))  # Ключ (тип, объект, период) для повторяющихся уведомлений
+
+    __table_args__ = (
+        # Счетчик и список непрочитанных уведомлений пользователя
+        Index('ix_notifications_user_unread', 'user_id', 'is_read', 'created_at'),
+        # Одно уведомление на ключ; NULL-ключи не ограничиваются
+        Index('ux_notifications_dedupe_key', 'dedupe_key', unique=True),
+    )
+
+class LedgerMonthly(Base):
+    """Помесячные итоги платежей. Ведется триггерами БД (см. database/aggregates.py)"""
+    __tablename__ = 'ledger_monthly'
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    month = Column(Integer, primary_key=True, autoincrement=False)
+    client_id = Column(Integer, primary_key=True, autoincrement=False)  # 0 - без клиента
+    carrier_id = Column(Integer, primary_key=True, autoincrement=False)  # 0 - без перевозчика
+    is_client_payment = Column(Boolean, primary_key=True, autoincrement=False)
+    amount = Column(Float, nullable=False, default=0)
+    payment_count = Column(Integer, nullable=False, default=0)
+
+class JobState(Base):
+    """Состояние фоновых задач между запусками (водяные знаки обработанных данных)"""
+    __tablename__ = 'job_state'
+    name = Column(String(50), primary_key=True)
+    value = Column(Text, nullable=False)  # JSON
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
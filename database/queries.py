@@ -0,0 +1,172 @@
+"""Запросы списков для форм.
+
+Каждая функция выполняет один SELECT с явным набором колонок и
+возвращает плоские кортежи в порядке колонок таблицы формы, без загрузки
+ORM-объектов и их связей. Страницы выбираются keyset-пагинацией после
+строки last_row (None - первая страница). При поиске по FTS5-индексу
+возвращается одна страница результатов, упорядоченных по релевантности.
+"""
+from sqlalchemy import func, case, select, tuple_
+from sqlalchemy.orm import aliased
+from .models import Client, Carrier, Vehicle, Driver, Order, Payment, Document
+from . import search
+
+
+def client_page(session, search_text, status_filter, last_row, limit):
+    """Клиенты: (id, название, контакт, телефон, email, адрес, активен)"""
+    query = session.query(
+        Client.id,
+        Client.name,
+        func.coalesce(Client.contact_person, ''),
+        func.coalesce(Client.phone, ''),
+        func.coalesce(Client.email, ''),
+        func.coalesce(Client.address, ''),
+        Client.is_active,
+    )
+
+    if status_filter == "Активные":
+        query = query.filter(Client.is_active == True)
+    elif status_filter == "Архивные":
+        query = query.filter(Client.is_active == False)
+
+    if search_text and search.use_fts(session, search_text):
+        if last_row is not None:
+            return []
+        query = search.client_matches(query, search_text)
+        return [tuple(row) for row in query.limit(search.SEARCH_LIMIT)]
+
+    if search_text:
+        pattern = f"%{search_text}%"
+        query = query.filter(
+            (Client.name.ilike(pattern)) |
+            (Client.contact_person.ilike(pattern)) |
+            (Client.phone.ilike(pattern))
+        )
+
+    if last_row is not None:
+        query = query.filter(tuple_(Client.name, Client.id) > (last_row[1], last_row[0]))
+
+    return [tuple(row) for row in query.order_by(Client.name, Client.id).limit(limit)]
+
+
+def carrier_page(session, search_text, last_row, limit):
+    """Перевозчики: (id, компания, контакт, телефон, email, ТС, водитель).
+
+    Для каждого перевозчика берется первое ТС и его водитель.
+    """
+    carrier_vehicle = aliased(Vehicle)
+    first_vehicle_id = select(func.min(carrier_vehicle.id)).where(
+        carrier_vehicle.carrier_id == Carrier.id
+    ).correlate(Carrier).scalar_subquery()
+    driver_name = select(Driver.full_name).where(
+        Driver.vehicle_id == Vehicle.id
+    ).order_by(Driver.id).limit(1).scalar_subquery()
+
+    query = session.query(
+        Carrier.id,
+        Carrier.company_name,
+        Carrier.contact_person,
+        Carrier.phone,
+        Carrier.email,
+        Vehicle.plate_number,
+        Vehicle.model,
+        driver_name,
+    ).outerjoin(
+        Vehicle, Vehicle.id == first_vehicle_id
+    )
+
+    if search_text and search.use_fts(session, search_text):
+        if last_row is not None:
+            return []
+        query = search.carrier_matches(query, search_text).limit(search.SEARCH_LIMIT)
+    else:
+        if search_text:
+            query = query.filter(Carrier.company_name.ilike(f"%{search_text}%"))
+        if last_row is not None:
+            query = query.filter(
+                tuple_(Carrier.company_name, Carrier.id) > (last_row[1], last_row[0])
+            )
+        query = query.order_by(Carrier.company_name, Carrier.id).limit(limit)
+
+    rows = []
+    for carrier_id, company, contact, phone, email, plate, model, driver in query:
+        vehicle_info = f"{plate} ({model})" if plate is not None else ""
+        rows.append((
+            carrier_id, company, contact or "", phone or "", email or "",
+            vehicle_info, driver or "",
+        ))
+    return rows
+
+
+def _payment_filter(query, client_id, date_from, date_to):
+    if client_id:
+        query = query.filter(Order.client_id == client_id)
+    return query.filter(Payment.payment_date >= date_from, Payment.payment_date <= date_to)
+
+
+def payment_page(session, client_id, date_from, date_to, last_row, limit):
+    """Платежи: (id, дата, заказ, клиент, сумма, от клиента, описание)"""
+    query = session.query(
+        Payment.id,
+        Payment.payment_date,
+        Payment.order_id,
+        Client.name,
+        Payment.amount,
+        Payment.is_client_payment,
+        func.coalesce(Payment.description, ''),
+    ).join(
+        Order, Order.id == Payment.order_id
+    ).join(
+        Client, Client.id == Order.client_id
+    )
+    query = _payment_filter(query, client_id, date_from, date_to)
+
+    if last_row is not None:
+        query = query.filter(
+            tuple_(Payment.payment_date, Payment.id) < (last_row[1], last_row[0])
+        )
+
+    return [
+        tuple(row) for row in
+        query.order_by(Payment.payment_date.desc(), Payment.id.desc()).limit(limit)
+    ]
+
+
+def payment_total(session, client_id, date_from, date_to):
+    """Итоговая прибыль по отфильтрованным платежам"""
+    query = session.query(
+        func.sum(case(
+            (Payment.is_client_payment == True, Payment.amount),
+            else_=-Payment.amount
+        ))
+    ).select_from(Payment).join(
+        Order, Order.id == Payment.order_id
+    ).join(
+        Client, Client.id == Order.client_id
+    )
+    return _payment_filter(query, client_id, date_from, date_to).scalar() or 0
+
+
+def document_page(session, client_id, order_id, last_row, limit):
+    """Документы: (id, заказ, клиент, название, описание, путь)"""
+    query = session.query(
+        Document.id,
+        Document.order_id,
+        Client.name,
+        Document.name,
+        func.coalesce(Document.description, ''),
+        Document.file_path,
+    ).join(
+        Order, Order.id == Document.order_id
+    ).join(
+        Client, Client.id == Order.client_id
+    )
+
+    if client_id:
+        query = query.filter(Order.client_id == client_id)
+    if order_id:
+        query = query.filter(Document.order_id == order_id)
+    if last_row is not None:
+        query = query.filter(Document.id < last_row[0])
+
+    return [tuple(row) for row in query.order_by(Document.id.desc()).limit(limit)]
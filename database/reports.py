@@ -0,0 +1,171 @@
+from collections import namedtuple
+from datetime import date
+from sqlalchemy import func, case
+from .models import LedgerMonthly, Client, Carrier, Order, Payment
+
+# Типы колонок отчетов: определяют запись значения при экспорте.
+# По колонкам MONEY и COUNT в выгрузке подводится итог
+TEXT = 'text'
+MONEY = 'money'
+COUNT = 'count'
+INTEGER = 'integer'
+DATE = 'date'
+MONTH = 'month'
+
+MONTH_NAMES = [
+    "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
+    "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
+]
+
+# Описание отчета: заголовок, колонки (название, тип) и функция
+# query(session, year, client_id=None), возвращающая запрос SQLAlchemy
+Report = namedtuple('Report', 'title columns query')
+
+
+def month_name(month):
+    return MONTH_NAMES[int(month) - 1] if 1 <= month <= 12 else str(month)
+
+
+def _income_expense_columns():
+    """Доход, расход и прибыль по таблице помесячных итогов.
+
+    Строки с нулевым числом платежей (после удалений) отсекаются в HAVING.
+    """
+    income = func.sum(case((LedgerMonthly.is_client_payment == True, LedgerMonthly.amount), else_=0))
+    expense = func.sum(case((LedgerMonthly.is_client_payment == False, LedgerMonthly.amount), else_=0))
+    return income.label('income'), expense.label('expense'), (income - expense).label('profit')
+
+
+def monthly_profit_query(session, year, client_id=None):
+    income, expense, profit = _income_expense_columns()
+    query = session.query(
+        LedgerMonthly.month, income, expense, profit
+    ).filter(
+        LedgerMonthly.year == year,
+        LedgerMonthly.month > 0
+    )
+    if client_id:
+        query = query.filter(LedgerMonthly.client_id == client_id)
+
+    return query.group_by(
+        LedgerMonthly.month
+    ).having(
+        func.sum(LedgerMonthly.payment_count) > 0
+    ).order_by(
+        LedgerMonthly.month
+    )
+
+
+def monthly_profit(session, year, client_id=None):
+    """Прибыль по месяцам: строки (месяц, доход, расход, прибыль)"""
+    return monthly_profit_query(session, year, client_id).all()
+
+
+def client_profit_query(session, year, client_id=None):
+    income, expense, profit = _income_expense_columns()
+    query = session.query(
+        Client.name.label('client_name'), income, expense, profit
+    ).join(
+        Client, Client.id == LedgerMonthly.client_id
+    ).filter(
+        LedgerMonthly.year == year
+    )
+    if client_id:
+        query = query.filter(LedgerMonthly.client_id == client_id)
+
+    return query.group_by(
+        Client.id, Client.name
+    ).having(
+        func.sum(LedgerMonthly.payment_count) > 0
+    ).order_by(
+        profit.desc()
+    )
+
+
+def client_profit(session, year, client_id=None):
+    """Прибыль по клиентам: строки (клиент, доход, расход, прибыль)"""
+    return client_profit_query(session, year, client_id).all()
+
+
+def carrier_activity_query(session, year, client_id=None):
+    query = session.query(
+        Carrier.company_name.label('carrier_name'),
+        func.count(Order.id.distinct()).label('order_count'),
+        func.sum(Payment.amount).label('total_payments')
+    ).join(
+        Order, Order.carrier_id == Carrier.id
+    ).join(
+        Payment, Payment.order_id == Order.id
+    ).filter(
+        Order.order_date >= date(year, 1, 1),
+        Order.order_date < date(year + 1, 1, 1),
+        Payment.is_client_payment == False
+    )
+    if client_id:
+        query = query.filter(Order.client_id == client_id)
+
+    return query.group_by(
+        Carrier.id, Carrier.company_name
+    ).order_by(
+        func.count(Order.id.distinct()).desc()
+    )
+
+
+def carrier_activity(session, year, client_id=None):
+    """Активность перевозчиков: строки (перевозчик, число заказов, выплачено)"""
+    return carrier_activity_query(session, year, client_id).all()
+
+
+def payment_register_query(session, year, client_id=None):
+    """Реестр платежей за год: (дата, заказ, клиент, перевозчик, направление, получено, выплачено).
+
+    Сумма платежа пишется в колонку своего направления, поэтому итоги
+    поступлений от клиентов и выплат перевозчикам не смешиваются.
+    """
+    query = session.query(
+        Payment.payment_date,
+        Payment.order_id,
+        Client.name.label('client_name'),
+        Carrier.company_name.label('carrier_name'),
+        case((Payment.is_client_payment == True, "От клиента"), else_="Перевозчику").label('direction'),
+        case((Payment.is_client_payment == True, Payment.amount)).label('income'),
+        case((Payment.is_client_payment == True, None), else_=Payment.amount).label('expense')
+    ).join(
+        Order, Order.id == Payment.order_id
+    ).outerjoin(
+        Client, Client.id == Order.client_id
+    ).outerjoin(
+        Carrier, Carrier.id == Order.carrier_id
+    ).filter(
+        Payment.payment_date >= date(year, 1, 1),
+        Payment.payment_date < date(year + 1, 1, 1)
+    )
+    if client_id:
+        query = query.filter(Order.client_id == client_id)
+
+    return query.order_by(Payment.payment_date, Payment.id)
+
+
+REPORTS = {
+    'monthly_profit': Report(
+        "Прибыль по месяцам",
+        (("Месяц", MONTH), ("Доход", MONEY), ("Расход", MONEY), ("Прибыль", MONEY)),
+        monthly_profit_query
+    ),
+    'client_profit': Report(
+        "Прибыль по клиентам",
+        (("Клиент", TEXT), ("Доход", MONEY), ("Расход", MONEY), ("Прибыль", MONEY)),
+        client_profit_query
+    ),
+    'carrier_activity': Report(
+        "Активность перевозчиков",
+        (("Перевозчик", TEXT), ("Количество заказов", COUNT), ("Выплачено", MONEY)),
+        carrier_activity_query
+    ),
+    'payment_register': Report(
+        "Реестр платежей",
+        (("Дата", DATE), ("Заказ", INTEGER), ("Клиент", TEXT), ("Перевозчик", TEXT),
+         ("Направление", TEXT), ("Получено", MONEY), ("Выплачено", MONEY)),
+        payment_register_query
+    ),
+}
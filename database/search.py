@@ -0,0 +1,151 @@
+"""Полнотекстовый поиск клиентов и перевозчиков (SQLite FTS5, триграммы).
+
+Индексы clients_fts и carriers_fts построены как external content
+таблицы и синхронизируются триггерами. Триграммный токенизатор находит
+подстроки длиной от 3 символов без учета регистра; для более коротких
+запросов и сборок SQLite без FTS5 используется обычный LIKE.
+"""
+import logging
+import weakref
+from sqlalchemy import inspect, literal_column
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql import table, column
+from .models import Client, Carrier
+
+logger = logging.getLogger(__name__)
+
+# Максимум результатов поиска, ранжированных по релевантности
+SEARCH_LIMIT = 200
+
+# Минимальная длина запроса для триграммного индекса
+MIN_QUERY_LENGTH = 3
+
+# Индексируемые колонки: таблица -> (индекс, колонки)
+FTS_INDEXES = {
+    'clients': ('clients_fts', ('name', 'contact_person', 'phone')),
+    'carriers': ('carriers_fts', ('company_name',)),
+}
+
+clients_fts = table('clients_fts', column('rowid'), column('rank'))
+carriers_fts = table('carriers_fts', column('rowid'), column('rank'))
+
+# Есть ли FTS5-индексы: движок -> bool (при смене движка проверяется заново)
+_available = weakref.WeakKeyDictionary()
+
+
+def _sync_triggers(source, index, columns):
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{name}" for name in columns)
+    old_values = ", ".join(f"old.{name}" for name in columns)
+    insert = f"INSERT INTO {index}(rowid, {names}) VALUES (new.id, {new_values});"
+    delete = (f"INSERT INTO {index}({index}, rowid, {names}) "
+              f"VALUES ('delete', old.id, {old_values});")
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_{index}_insert AFTER INSERT ON {source} "
+        f"BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{index}_delete AFTER DELETE ON {source} "
+        f"BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{index}_update AFTER UPDATE OF {names} ON {source} "
+        f"BEGIN {delete} {insert} END",
+    ]
+
+
+def install_search_indexes(connection):
+    """Создание FTS5-индексов, триггеров синхронизации и их заполнение.
+
+    Возвращает False, если SQLite собран без FTS5 или триграммного токенизатора.
+    """
+    try:
+        for source, (index, columns) in FTS_INDEXES.items():
+            connection.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+                f"{', '.join(columns)}, content='{source}', content_rowid='id', "
+                f"tokenize='trigram')"
+            )
+            for ddl in _sync_triggers(source, index, columns):
+                connection.exec_driver_sql(ddl)
+            connection.exec_driver_sql(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+    except OperationalError as e:
+        logger.warning("Полнотекстовый поиск недоступен, используется LIKE: %s", e)
+        return False
+    _available.pop(connection.engine, None)
+    return True
+
+
+def ensure_search_indexes(connection):
+    """Повторная установка FTS5-индексов, если их нет (например, не удалась при миграции).
+
+    Вызывается при каждой миграции БД. Возвращает, есть ли индексы.
+    """
+    inspector = inspect(connection)
+    if all(inspector.has_table(index) for index, _ in FTS_INDEXES.values()):
+        return True
+    return install_search_indexes(connection)
+
+
+def rebuild_search_indexes(connection):
+    """Полная перестройка FTS5-индексов по исходным таблицам"""
+    for index, _ in FTS_INDEXES.values():
+        connection.exec_driver_sql(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+
+
+def fts_available(session):
+    """Есть ли в БД FTS5-индексы (проверяется один раз для движка БД)"""
+    engine = session.get_bind()
+    if engine not in _available:
+        _available[engine] = inspect(session.connection()).has_table('clients_fts')
+    return _available[engine]
+
+
+def use_fts(session, search_text):
+    return len(search_text.strip()) >= MIN_QUERY_LENGTH and fts_available(session)
+
+
+def match_expression(search_text):
+    """Запрос MATCH: вся строка как одна фраза (поиск подстроки)"""
+    return '"' + search_text.strip().replace('"', '""') + '"'
+
+
+def client_matches(query, search_text):
+    """Ограничение запроса по клиентам найденными строками, по релевантности"""
+    return query.join(
+        clients_fts, clients_fts.c.rowid == Client.id
+    ).filter(
+        literal_column(clients_fts.name).op('MATCH')(match_expression(search_text))
+    ).order_by(clients_fts.c.rank, Client.id)
+
+
+def carrier_matches(query, search_text):
+    """Ограничение запроса по перевозчикам найденными строками, по релевантности"""
+    return query.join(
+        carriers_fts, carriers_fts.c.rowid == Carrier.id
+    ).filter(
+        literal_column(carriers_fts.name).op('MATCH')(match_expression(search_text))
+    ).order_by(carriers_fts.c.rank, Carrier.id)
+
+
+def search_clients(session, search_text, limit=SEARCH_LIMIT):
+    """Поиск клиентов: список (id, название) по убыванию релевантности"""
+    query = session.query(Client.id, Client.name)
+    if use_fts(session, search_text):
+        query = client_matches(query, search_text)
+    else:
+        pattern = f"%{search_text.strip()}%"
+        query = query.filter(
+            (Client.name.ilike(pattern)) |
+            (Client.contact_person.ilike(pattern)) |
+            (Client.phone.ilike(pattern))
+        ).order_by(Client.name, Client.id)
+    return [tuple(row) for row in query.limit(limit)]
+
+
+def search_carriers(session, search_text, limit=SEARCH_LIMIT):
+    """Поиск перевозчиков: список (id, название) по убыванию релевантности"""
+    query = session.query(Carrier.id, Carrier.company_name)
+    if use_fts(session, search_text):
+        query = carrier_matches(query, search_text)
+    else:
+        query = query.filter(
+            Carrier.company_name.ilike(f"%{search_text.strip()}%")
+        ).order_by(Carrier.company_name, Carrier.id)
+    return [tuple(row) for row in query.limit(limit)]
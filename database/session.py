@@ -0,0 +1,104 @@
+import threading
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.pool import QueuePool, StaticPool
+from utils.config import load_config
+from .migrations import migrate
+from .instrumentation import instrument
+
+# Общая для всего процесса фабрика сессий. Привязывается к движку
+# при первом вызове get_engine(), поэтому формы могут импортировать её сразу.
+Session = sessionmaker()
+
+# Потокобезопасная сессия для фоновых задач: у каждого потока своя
+# сессия, которую поток обязан освободить через ScopedSession.remove().
+ScopedSession = scoped_session(Session)
+
+_engine = None
+_schema_ready = False
+_lock = threading.Lock()
+
+
+def _set_sqlite_pragmas(pragmas):
+    """Обработчик подключения, выставляющий PRAGMA для каждого соединения"""
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+    return on_connect
+
+
+def _create_engine(db_config):
+    """Создание движка по секции database из config.json"""
+    url = db_config['url']
+
+    if not url.startswith('sqlite'):
+        return create_engine(
+            url,
+            pool_size=db_config.get('pool_size', 5),
+            max_overflow=db_config.get('max_overflow', 10),
+            pool_timeout=db_config.get('pool_timeout', 30),
+            pool_pre_ping=True,
+        )
+
+    if url in ('sqlite://', 'sqlite:///:memory:'):
+        # Одна общая in-memory база на все потоки
+        engine = create_engine(
+            url,
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool,
+        )
+    else:
+        engine = create_engine(
+            url,
+            connect_args={'check_same_thread': False},
+            poolclass=QueuePool,
+            pool_size=db_config.get('pool_size', 5),
+            max_overflow=db_config.get('max_overflow', 10),
+            pool_timeout=db_config.get('pool_timeout', 30),
+        )
+
+    pragmas = db_config.get('pragmas', {})
+    if pragmas:
+        event.listen(engine, 'connect', _set_sqlite_pragmas(pragmas))
+    return engine
+
+
+def get_engine():
+    """Получение общего движка процесса (создается один раз)"""
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                config = load_config()
+                engine = _create_engine(config['database'])
+                instrument(engine, **config.get('diagnostics', {}))
+                Session.configure(bind=engine)
+                _engine = engine
+    return _engine
+
+
+def init_db():
+    """Инициализация БД: общий движок и миграция схемы один раз за процесс"""
+    global _schema_ready
+    engine = get_engine()
+    if not _schema_ready:
+        with _lock:
+            if not _schema_ready:
+                migrate(engine)
+                _schema_ready = True
+    return engine
+
+
+def dispose_engine():
+    """Закрытие пула соединений (при завершении приложения)"""
+    global _engine, _schema_ready
+    with _lock:
+        ScopedSession.remove()
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+        _schema_ready = False
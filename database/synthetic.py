@@ -0,0 +1,315 @@
+"""Генератор синтетических данных для замеров производительности.
+
+Данные детерминированы: одинаковые уровень, seed и конечная дата дают
+одинаковую БД. Размер задается числом платежей (уровни 10k, 1m, 10m),
+остальные таблицы масштабируются от него. Распределение заказов по
+клиентам и перевозчикам неравномерное (закон Ципфа): клиент с меньшим
+id получает больше заказов, как крупные клиенты в реальной базе.
+Заказы идут по возрастанию даты за последние YEARS года до конечной
+даты; старые заказы в основном завершены, свежие - в работе.
+
+Загрузка выполняется без триггеров (они снимаются и создаются заново),
+итоги и поисковые индексы затем пересчитываются одним проходом.
+
+Запуск: python -m database.synthetic bench.db --tier 1m [--seed 1] [--end-date 2025-06-30]
+"""
+import argparse
+import bisect
+import itertools
+import os
+import random
+import time
+from array import array
+from datetime import date, timedelta
+from sqlalchemy import create_engine, text
+from .migrations import migrate
+from . import aggregates, search
+
+TIERS = {
+    '10k': 10_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000,
+}
+
+DEFAULT_SEED = 1
+
+# Период данных, лет до конечной даты
+YEARS = 3
+
+# Показатели распределения Ципфа для клиентов и перевозчиков
+CLIENT_SKEW = 1.1
+CARRIER_SKEW = 0.9
+
+# Среднее число платежей на заказ (не меньше двух: от клиента и перевозчику)
+PAYMENTS_PER_ORDER = 3
+
+# Строк в одном executemany
+INSERT_CHUNK = 10_000
+
+_COMPANY_FORMS = ("ООО", "АО", "ИП", "ЗАО")
+_COMPANY_WORDS = (
+    "Транс", "Логистик", "Сервис", "Груз", "Экспресс", "Альфа", "Вектор", "Меридиан",
+    "Север", "Волга", "Урал", "Сибирь", "Балтика", "Континент", "Импульс", "Магистраль",
+)
+_CITIES = (
+    "Москва", "Санкт-Петербург", "Казань", "Нижний Новгород", "Екатеринбург",
+    "Новосибирск", "Самара", "Ростов-на-Дону", "Краснодар", "Воронеж", "Пермь", "Уфа",
+)
+_STREETS = ("Ленина", "Промышленная", "Складская", "Заводская", "Садовая", "Мира")
+_CARGO = (
+    "Стройматериалы", "Продукты питания", "Оборудование", "Мебель", "Бытовая техника",
+    "Металлопрокат", "Текстиль", "Химия", "Запчасти", "Бумага",
+)
+_PACKAGING = ("Паллеты", "Коробки", "Навалом", "Контейнер", "Биг-бэги")
+_LOADING_TYPES = ("Задняя", "Боковая", "Верхняя")
+_VEHICLE_MODELS = ("Volvo FH", "Scania R", "MAN TGX", "КАМАЗ 5490", "Mercedes Actros", "ГАЗель Next")
+_NAMES = ("Иван", "Петр", "Сергей", "Андрей", "Алексей", "Дмитрий", "Олег", "Николай")
+_SURNAMES = ("Иванов", "Петров", "Смирнов", "Кузнецов", "Попов", "Соколов", "Лебедев", "Козлов")
+_PLATE_LETTERS = "АВЕКМНОРСТУХ"
+
+
+def scale(payments):
+    """Размеры таблиц для заданного числа платежей"""
+    clients = max(20, payments // 500)
+    carriers = max(10, clients // 3)
+    orders = max(1, payments // PAYMENTS_PER_ORDER)
+    return {
+        'clients': clients,
+        'carriers': carriers,
+        'vehicles': carriers * 2,
+        'drivers': carriers * 2,
+        'orders': orders,
+        'payments': payments,
+        'documents': orders // 2,
+    }
+
+
+def _zipf_weights(count, skew):
+    """Накопленные веса для выбора id 1..count по закону Ципфа"""
+    return list(itertools.accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+def _pick(rng, cumulative):
+    """id (с 1) по накопленным весам"""
+    return bisect.bisect_left(cumulative, rng.random() * cumulative[-1]) + 1
+
+
+def _company(rng, number):
+    return f"{rng.choice(_COMPANY_FORMS)} «{rng.choice(_COMPANY_WORDS)}{rng.choice(_COMPANY_WORDS).lower()}-{number}»"
+
+
+def _person(rng):
+    return f"{rng.choice(_SURNAMES)} {rng.choice(_NAMES)}"
+
+
+def _phone(rng):
+    return f"+7 9{rng.randint(10, 99)} {rng.randint(100, 999)}-{rng.randint(10, 99)}-{rng.randint(10, 99)}"
+
+
+def _address(rng):
+    return f"г. {rng.choice(_CITIES)}, ул. {rng.choice(_STREETS)}, д. {rng.randint(1, 150)}"
+
+
+def _clients(rng, count):
+    for id in range(1, count + 1):
+        yield (id, _company(rng, id), _person(rng), _phone(rng), f"client{id}@example.ru",
+               _address(rng), rng.random() < 0.9)
+
+
+def _carriers(rng, count):
+    for id in range(1, count + 1):
+        yield (id, _company(rng, id), _person(rng), _phone(rng), f"carrier{id}@example.ru",
+               rng.random() < 0.9)
+
+
+def _vehicles(rng, count):
+    # Два ТС на перевозчика: ТС 2c-1 и 2c принадлежат перевозчику c
+    for id in range(1, count + 1):
+        plate = (f"{rng.choice(_PLATE_LETTERS)}{id % 1000:03d}"
+                 f"{rng.choice(_PLATE_LETTERS)}{rng.choice(_PLATE_LETTERS)}{rng.randint(10, 199)}")
+        yield (id, plate, rng.choice(_VEHICLE_MODELS), float(rng.choice((1.5, 10, 20, 22))),
+               (id + 1) // 2)
+
+
+def _drivers(rng, count):
+    for id in range(1, count + 1):
+        yield (id, _person(rng), f"{rng.randint(10, 99)} {rng.randint(10, 99)} {rng.randint(100000, 999999)}",
+               _phone(rng), id)
+
+
+def _status(rng, age):
+    """Статус заказа по его возрасту в днях"""
+    if age > 60:
+        return "Отменен" if rng.random() < 0.04 else "Завершен"
+    if age > 14:
+        return rng.choice(("В пути", "Выгрузка", "Завершен", "Завершен"))
+    return rng.choice(("Создан", "В обработке", "Погрузка"))
+
+
+def _orders(rng, count, sizes, end_date, order_days, prices):
+    """Заказы по возрастанию даты; дата и сумма сохраняются для платежей"""
+    clients = _zipf_weights(sizes['clients'], CLIENT_SKEW)
+    carriers = _zipf_weights(sizes['carriers'], CARRIER_SKEW)
+    start = end_date - timedelta(days=365 * YEARS)
+    span = (end_date - start).days
+    for id in range(1, count + 1):
+        order_date = start + timedelta(days=(id - 1) * span // count)
+        loading_date = order_date + timedelta(days=rng.randint(0, 10))
+        carrier_id = _pick(rng, carriers)
+        price = round(rng.lognormvariate(11, 0.6), 2)
+        order_days.append(order_date.toordinal())
+        prices.append(price)
+        yield (id, _pick(rng, clients), carrier_id, 2 * carrier_id - rng.randint(0, 1),
+               _address(rng), _address(rng), rng.choice(_CARGO), rng.choice(_PACKAGING),
+               round(rng.uniform(0.5, 20), 1), rng.choice(_LOADING_TYPES),
+               order_date.isoformat(), loading_date.isoformat(),
+               _status(rng, (end_date - order_date).days), f"SYN-{id:08d}")
+
+
+def _split(rng, total, parts):
+    """Разбиение суммы на части"""
+    if parts == 1:
+        return [total]
+    shares = [rng.random() + 0.5 for _ in range(parts)]
+    factor = total / sum(shares)
+    amounts = [round(share * factor, 2) for share in shares[:-1]]
+    return amounts + [round(total - sum(amounts), 2)]
+
+
+def _payments(rng, count, order_days, prices):
+    """Платежи по заказам: не меньше одного от клиента и одного перевозчику"""
+    orders = len(order_days)
+    remaining = count
+    id = 0
+    for index in range(orders):
+        left = orders - index
+        if left == 1:
+            parts = remaining
+        else:
+            # Дополнительные платежи распределяются так, чтобы сумма сошлась с count
+            extra = max(0.0, min(2.0, (remaining - 2 * left) / left))
+            parts = 2 + int(extra) + (rng.random() < extra - int(extra))
+            parts = max(min(parts, remaining - 2 * (left - 1)), min(2, remaining))
+        if parts <= 0:
+            continue
+        remaining -= parts
+        order_id = index + 1
+        order_day = order_days[index]
+        price = prices[index]
+        client_parts = (parts + 1) // 2
+        for is_client, total, direction_parts in (
+            (True, price, client_parts),
+            (False, round(price * rng.uniform(0.7, 0.9), 2), parts - client_parts),
+        ):
+            if not direction_parts:
+                continue
+            for amount in _split(rng, total, direction_parts):
+                id += 1
+                delay = rng.randint(0, 30) if is_client else rng.randint(5, 40)
+                description = None
+                if rng.random() < 0.2:
+                    description = f"{'Оплата' if is_client else 'Перевозка'} по заказу #{order_id}"
+                yield (id, order_id, amount, date.fromordinal(order_day + delay).isoformat(),
+                       is_client, description)
+
+
+def _documents(rng, count, orders):
+    for id in range(1, count + 1):
+        order_id = rng.randint(1, orders)
+        kind = rng.choice(("ТТН", "Счет", "Акт", "Договор"))
+        yield (id, order_id, f"{kind} {id}", f"documents/{order_id}/{id}.pdf", None)
+
+
+_INSERTS = {
+    'clients': "INSERT INTO clients (id, name, contact_person, phone, email, address, is_active) "
+               "VALUES (?, ?, ?, ?, ?, ?, ?)",
+    'carriers': "INSERT INTO carriers (id, company_name, contact_person, phone, email, is_active) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+    'vehicles': "INSERT INTO vehicles (id, plate_number, model, capacity, carrier_id) VALUES (?, ?, ?, ?, ?)",
+    'drivers': "INSERT INTO drivers (id, full_name, license_number, phone, vehicle_id) VALUES (?, ?, ?, ?, ?)",
+    'orders': "INSERT INTO orders (id, client_id, carrier_id, vehicle_id, loading_address, "
+              "unloading_address, cargo_name, packaging, weight, loading_type, order_date, "
+              "loading_date, status, external_ref) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    'payments': "INSERT INTO payments (id, order_id, amount, payment_date, is_client_payment, description) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+    'documents': "INSERT INTO documents (id, order_id, name, file_path, description) VALUES (?, ?, ?, ?, ?)",
+}
+
+
+def _insert(cursor, table, rows):
+    statement = _INSERTS[table]
+    count = 0
+    while True:
+        chunk = list(itertools.islice(rows, INSERT_CHUNK))
+        if not chunk:
+            return count
+        cursor.executemany(statement, chunk)
+        count += len(chunk)
+
+
+def generate(path, payments, seed=DEFAULT_SEED, end_date=None, log=print):
+    """Создание новой БД path с синтетическими данными. Возвращает размеры таблиц"""
+    if os.path.exists(path):
+        raise FileExistsError(f"Файл уже существует: {path}")
+    end_date = end_date or date.today()
+    sizes = scale(payments)
+
+    engine = create_engine(f"sqlite:///{path}")
+    migrate(engine)
+
+    # Отдельный генератор на таблицу: размер одной таблицы не сдвигает данные другой
+    def rng(name):
+        return random.Random(f"{seed}:{name}")
+
+    with engine.begin() as connection:
+        cursor = connection.connection.cursor()
+        cursor.execute("PRAGMA synchronous=OFF")
+        triggers = cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger'"
+        ).fetchall()
+        for name, _ in triggers:
+            cursor.execute(f"DROP TRIGGER {name}")
+
+        order_days, prices = array('i'), array('d')
+        started = time.perf_counter()
+        for table, rows in (
+            ('clients', _clients(rng('clients'), sizes['clients'])),
+            ('carriers', _carriers(rng('carriers'), sizes['carriers'])),
+            ('vehicles', _vehicles(rng('vehicles'), sizes['vehicles'])),
+            ('drivers', _drivers(rng('drivers'), sizes['drivers'])),
+            ('orders', _orders(rng('orders'), sizes['orders'], sizes, end_date, order_days, prices)),
+            ('payments', _payments(rng('payments'), payments, order_days, prices)),
+            ('documents', _documents(rng('documents'), sizes['documents'], sizes['orders'])),
+        ):
+            count = _insert(cursor, table, rows)
+            log(f"{table}: {count} ({time.perf_counter() - started:.1f} с)")
+
+        for _, sql in triggers:
+            cursor.execute(sql)
+        cursor.close()
+        aggregates.rebuild_ledger(connection)
+        aggregates.rebuild_order_balances(connection)
+        search.rebuild_search_indexes(connection)
+        log(f"итоги и индексы поиска: {time.perf_counter() - started:.1f} с")
+
+    with engine.connect() as connection:
+        connection.execute(text("ANALYZE"))
+    engine.dispose()
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Синтетическая БД для замеров производительности")
+    parser.add_argument('path', help="файл новой БД SQLite")
+    parser.add_argument('--tier', choices=sorted(TIERS), default='10k', help="число платежей")
+    parser.add_argument('--payments', type=int, help="число платежей вместо уровня")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--end-date', type=date.fromisoformat,
+                        help="последняя дата заказов (по умолчанию сегодня)")
+    args = parser.parse_args(argv)
+
+    generate(args.path, args.payments or TIERS[args.tier], args.seed, args.end_date)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,105 @@
+"""Движок отчетов без графического интерфейса.
+
+Отчеты описаны в database.reports, выгрузка в файлы - в utils.export;
+Qt здесь не используется, поэтому отчеты можно строить на сервере.
+
+Запуск из командной строки:
+    python -m engine list
+    python -m engine report monthly_profit --year 2024 --format csv
+    python -m engine report payment_register --year 2024 --format xlsx -o registry.xlsx
+    python -m engine report carrier_activity --year 2024 --client-id 7
+
+Фильтр --client-id поддерживают все отчеты.
+"""
+import argparse
+import sys
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date
+from database import init_db, Session, reports
+from utils import export
+
+# Результат отчета: ключ, заголовок, колонки (название, тип), строки и итоги
+ReportResult = namedtuple('ReportResult', 'key title columns rows totals')
+
+
 class Engine:
+    """Построение и выгрузка отчетов.
+
+    Методы принимают необязательную сессию: вызывающий код (например,
+    фоновый поток формы) может передать свою, иначе движок открывает и
+    закрывает сессию сам.
+    """
+
     def __init__(self):
-        print("Движок инициализирован")
-    
-    # Добавьте нужные методы
-    def example_method(self):
-        return "Работа движка"
\ No newline at end of file
+        self.db_engine = init_db()
+
+    @contextmanager
+    def _session(self, session=None):
+        if session is not None:
+            yield session
+            return
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def available_reports(self):
+        """Ключи и заголовки отчетов"""
+        return {key: report.title for key, report in reports.REPORTS.items()}
+
+    def report(self, key, year, client_id=None, session=None):
+        """Отчет целиком в памяти - для небольших итоговых отчетов"""
+        spec = reports.REPORTS[key]
+        with self._session(session) as session:
+            rows = spec.query(session, year, client_id).all()
+        totals = export.Totals(spec.columns)
+        for row in rows:
+            totals.add(row)
+        return ReportResult(key, spec.title, spec.columns, rows, totals.values)
+
+    def monthly_profit(self, year, client_id=None, session=None):
+        return self.report('monthly_profit', year, client_id, session)
+
+    def client_profit(self, year, client_id=None, session=None):
+        return self.report('client_profit', year, client_id, session)
+
+    def carrier_activity(self, year, client_id=None, session=None):
+        return self.report('carrier_activity', year, client_id, session)
+
+    def export(self, key, path, file_format, year, client_id=None, session=None):
+        """Потоковая выгрузка отчета в файл ('-' - стандартный вывод). Возвращает число строк"""
+        with self._session(session) as session:
+            return export.export_report(session, key, path, file_format, year, client_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Отчеты MurphyLogistik без интерфейса")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('list', help="список отчетов")
+
+    report_parser = commands.add_parser('report', help="выгрузка отчета")
+    report_parser.add_argument('name', choices=sorted(reports.REPORTS))
+    report_parser.add_argument('--year', type=int, default=date.today().year)
+    report_parser.add_argument('--client-id', type=int)
+    report_parser.add_argument('--format', choices=sorted(export.EXPORTERS), default='csv')
+    report_parser.add_argument('-o', '--output', default='-',
+                               help="файл результата; '-' - стандартный вывод (csv, jsonl)")
+    args = parser.parse_args(argv)
+
+    engine = Engine()
+    if args.command == 'list':
+        for key, title in engine.available_reports().items():
+            print(f"{key}\t{title}")
+        return
+
+    if args.output == '-' and args.format not in export.TEXT_FORMATS:
+        parser.error(f"для формата {args.format} укажите файл через --output")
+    count = engine.export(args.name, args.output, args.format, args.year, args.client_id)
+    print(f"Выгружено строк: {count}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,13 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableView, QLineEdit, 
-    QLabel, QFormLayout, QGroupBox, QMessageBox, QComboBox
+    QLabel, QFormLayout, QGroupBox, QMessageBox, QComboBox, QHeaderView
 )
-from PyQt6.QtGui import QStandardItemModel, QStandardItem
 from PyQt6.QtCore import Qt
-from database import init_db
-from sqlalchemy.orm import sessionmaker
+from database import init_db, Session, queries
 from database.models import Carrier, Vehicle, Driver
 from utils.notifications import NotificationManager
+from utils.events import event_bus, CARRIER_CHANGED
+from .table_model import LazyTableModel, debounced
 
 class CarrierForm(QWidget):
     def __init__(self):
@@ -22,7 +22,7 @@ class CarrierForm(QWidget):
         
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Поиск по названию компании...")
-        self.search_input.textChanged.connect(self.load_carriers)
+        self.search_timer = debounced(self, self.search_input.textChanged, self.load_carriers)
         
         self.search_layout.addWidget(QLabel("Поиск:"))
         self.search_layout.addWidget(self.search_input)
@@ -90,12 +90,11 @@ class CarrierForm(QWidget):
         self.table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
         self.table.doubleClicked.connect(self.load_carrier_data)
         
-        self.model = QStandardItemModel()
-        self.model.setHorizontalHeaderLabels([
+        self.model = LazyTableModel([
             "ID", "Компания", "Контакт", "Телефон", "Email", "ТС", "Водитель"
         ])
         self.table.setModel(self.model)
-        self.table.horizontalHeader().setSectionResizeMode(1, QTableView.ResizeMode.Stretch)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
         
         # Компоновка
         self.layout.addWidget(self.search_group)
@@ -107,127 +106,113 @@ class CarrierForm(QWidget):
         
         # Инициализация БД
         self.engine = init_db()
-        self.Session = sessionmaker(bind=self.engine)
+        self.Session = Session
         self.current_id = None
         self.load_carriers()
     
     def load_carriers(self):
-        session = self.Session()
-        search_text = f"%{self.search_input.text()}%"
-        
-        carriers = session.query(Carrier).filter(
-            Carrier.company_name.ilike(search_text)
-        ).order_by(Carrier.company_name).all()
+        search_text = self.search_input.text()
         
-        self.model.setRowCount(0)
-        for row, carrier in enumerate(carriers):
-            self.model.insertRow(row)
-            self.model.setItem(row, 0, QStandardItem(str(carrier.id)))
-            self.model.setItem(row, 1, QStandardItem(carrier.company_name))
-            self.model.setItem(row, 2, QStandardItem(carrier.contact_person or ""))
-            self.model.setItem(row, 3, QStandardItem(carrier.phone or ""))
-            self.model.setItem(row, 4, QStandardItem(carrier.email or ""))
-            
-            # Информация о ТС и водителе
-            vehicle_info = ""
-            driver_info = ""
-            if carrier.vehicles:
-                vehicle = carrier.vehicles[0]
-                vehicle_info = f"{vehicle.plate_number} ({vehicle.model})"
-                if vehicle.driver:
-                    driver_info = vehicle.driver.full_name
-            
-            self.model.setItem(row, 5, QStandardItem(vehicle_info))
-            self.model.setItem(row, 6, QStandardItem(driver_info))
+        self.model.set_source(
+            lambda session, last_row, limit: queries.carrier_page(
+                session, search_text, last_row, limit
+            )
+        )
     
     def load_carrier_data(self, index):
         session = self.Session()
-        carrier_id = int(self.model.item(index.row(), 0).text())
-        carrier = session.query(Carrier).get(carrier_id)
+        try:
+            carrier_id = self.model.row(index.row())[0]
+            carrier = session.query(Carrier).get(carrier_id)
         
-        if carrier:
-            self.current_id = carrier.id
-            self.id_label.setText(str(carrier.id))
-            self.company_input.setText(carrier.company_name or "")
-            self.contact_input.setText(carrier.contact_person or "")
-            self.phone_input.setText(carrier.phone or "")
-            self.email_input.setText(carrier.email or "")
+            if carrier:
+                self.current_id = carrier.id
+                self.id_label.setText(str(carrier.id))
+                self.company_input.setText(carrier.company_name or "")
+                self.contact_input.setText(carrier.contact_person or "")
+                self.phone_input.setText(carrier.phone or "")
+                self.email_input.setText(carrier.email or "")
             
-            # Загрузка ТС и водителя
-            if carrier.vehicles:
-                vehicle = carrier.vehicles[0]
-                self.vehicle_plate.setText(vehicle.plate_number or "")
-                self.vehicle_model.setText(vehicle.model or "")
-                self.vehicle_capacity.setText(str(vehicle.capacity) if vehicle.capacity else "")
+                # Загрузка ТС и водителя
+                if carrier.vehicles:
+                    vehicle = carrier.vehicles[0]
+                    self.vehicle_plate.setText(vehicle.plate_number or "")
+                    self.vehicle_model.setText(vehicle.model or "")
+                    self.vehicle_capacity.setText(str(vehicle.capacity) if vehicle.capacity else "")
                 
-                if vehicle.driver:
-                    driver = vehicle.driver
-                    self.driver_name.setText(driver.full_name or "")
-                    self.driver_license.setText(driver.license_number or "")
-                    self.driver_phone.setText(driver.phone or "")
+                    if vehicle.driver:
+                        driver = vehicle.driver
+                        self.driver_name.setText(driver.full_name or "")
+                        self.driver_license.setText(driver.license_number or "")
+                        self.driver_phone.setText(driver.phone or "")
             
-            self.delete_button.setEnabled(True)
+                self.delete_button.setEnabled(True)
+        finally:
+            session.close()
     
     def save_carrier(self):
         session = self.Session()
+        try:
+            if self.current_id:
+                # Редактирование существующего перевозчика
+                carrier = session.query(Carrier).get(self.current_id)
+                if carrier:
+                    carrier.company_name = self.company_input.text()
+                    carrier.contact_person = self.contact_input.text()
+                    carrier.phone = self.phone_input.text()
+                    carrier.email = self.email_input.text()
+                    action = "обновлен"
+            else:
+                # Создание нового перевозчика
+                carrier = Carrier(
+                    company_name=self.company_input.text(),
+                    contact_person=self.contact_input.text(),
+                    phone=self.phone_input.text(),
+                    email=self.email_input.text()
+                )
+                session.add(carrier)
+                action = "добавлен"
         
-        if self.current_id:
-            # Редактирование существующего перевозчика
-            carrier = session.query(Carrier).get(self.current_id)
-            if carrier:
-                carrier.company_name = self.company_input.text()
-                carrier.contact_person = self.contact_input.text()
-                carrier.phone = self.phone_input.text()
-                carrier.email = self.email_input.text()
-                action = "обновлен"
-        else:
-            # Создание нового перевозчика
-            carrier = Carrier(
-                company_name=self.company_input.text(),
-                contact_person=self.contact_input.text(),
-                phone=self.phone_input.text(),
-                email=self.email_input.text()
-            )
-            session.add(carrier)
-            action = "добавлен"
-        
-        # Сохранение ТС
-        vehicle = None
-        if carrier.vehicles:
-            vehicle = carrier.vehicles[0]
-        else:
-            vehicle = Vehicle()
-            carrier.vehicles.append(vehicle)
+            # Сохранение ТС
+            vehicle = None
+            if carrier.vehicles:
+                vehicle = carrier.vehicles[0]
+            else:
+                vehicle = Vehicle()
+                carrier.vehicles.append(vehicle)
         
-        vehicle.plate_number = self.vehicle_plate.text()
-        vehicle.model = self.vehicle_model.text()
-        try:
-            vehicle.capacity = float(self.vehicle_capacity.text()) if self.vehicle_capacity.text() else 0.0
-        except ValueError:
-            vehicle.capacity = 0.0
+            vehicle.plate_number = self.vehicle_plate.text()
+            vehicle.model = self.vehicle_model.text()
+            try:
+                vehicle.capacity = float(self.vehicle_capacity.text()) if self.vehicle_capacity.text() else 0.0
+            except ValueError:
+                vehicle.capacity = 0.0
         
-        # Сохранение водителя
-        driver = vehicle.driver
-        if not driver:
-            driver = Driver()
-            vehicle.driver = driver
+            # Сохранение водителя
+            driver = vehicle.driver
+            if not driver:
+                driver = Driver()
+                vehicle.driver = driver
         
-        driver.full_name = self.driver_name.text()
-        driver.license_number = self.driver_license.text()
-        driver.phone = self.driver_phone.text()
+            driver.full_name = self.driver_name.text()
+            driver.license_number = self.driver_license.text()
+            driver.phone = self.driver_phone.text()
         
-        session.commit()
+            session.commit()
         
-        # Создание уведомления
-        notification_manager = NotificationManager()
-        notification_manager.create_notification(
-            message=f"Перевозчик '{carrier.company_name}' {action}",
-            notification_type="carrier",
-            related_id=carrier.id
-        )
+            # Создание уведомления
+            notification_manager = NotificationManager()
+            notification_manager.create_notification(
+                message=f"Перевозчик '{carrier.company_name}' {action}",
+                notification_type="carrier",
+                related_id=carrier.id
+            )
         
-        self.clear_fields()
-        self.load_carriers()
+            event_bus().publish(CARRIER_CHANGED, carrier_id=carrier.id)
+            self.clear_fields()
+            self.load_carriers()
+        finally:
+            session.close()
     
     def delete_carrier(self):
         if self.current_id:
@@ -239,20 +224,24 @@ class CarrierForm(QWidget):
             
             if reply == QMessageBox.StandardButton.Yes:
                 session = self.Session()
-                carrier = session.query(Carrier).get(self.current_id)
-                if carrier:
-                    # Создание уведомления перед удалением
-                    notification_manager = NotificationManager()
-                    notification_manager.create_notification(
-                        message=f"Перевозчик '{carrier.company_name}' удален",
-                        notification_type="carrier",
-                        related_id=carrier.id
-                    )
+                try:
+                    carrier = session.query(Carrier).get(self.current_id)
+                    if carrier:
+                        # Создание уведомления перед удалением
+                        notification_manager = NotificationManager()
+                        notification_manager.create_notification(
+                            message=f"Перевозчик '{carrier.company_name}' удален",
+                            notification_type="carrier",
+                            related_id=carrier.id
+                        )
                     
-                    session.delete(carrier)
-                    session.commit()
-                    self.clear_fields()
-                    self.load_carriers()
+                        session.delete(carrier)
+                        session.commit()
+                        event_bus().publish(CARRIER_CHANGED, carrier_id=self.current_id)
+                        self.clear_fields()
+                        self.load_carriers()
+                finally:
+                    session.close()
     
     def cancel_edit(self):
         self.clear_fields()
@@ -2,12 +2,12 @@ from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableView, QLineEdit,
     QLabel, QFormLayout, QGroupBox, QMessageBox, QComboBox, QHeaderView
 )
-from PyQt6.QtGui import QStandardItemModel, QStandardItem
 from PyQt6.QtCore import Qt
-from database import init_db
-from sqlalchemy.orm import sessionmaker
+from database import init_db, Session, queries
 from database.models import Client
 from utils.notifications import NotificationManager
+from utils.events import event_bus, CLIENT_CHANGED
+from .table_model import LazyTableModel, debounced
 
 class ClientForm(QWidget):
     def __init__(self):
@@ -42,7 +42,7 @@ class ClientForm(QWidget):
         
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Поиск по названию, контакту или телефону...")
-        self.search_input.textChanged.connect(self.load_clients)
+        self.search_timer = debounced(self, self.search_input.textChanged, self.load_clients)
         
         self.filter_combo = QComboBox()
         self.filter_combo.addItems(["Все", "Активные", "Архивные"])
@@ -106,10 +106,10 @@ class ClientForm(QWidget):
         self.table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
         self.table.doubleClicked.connect(self.load_client_data)
         
-        self.model = QStandardItemModel()
-        self.model.setHorizontalHeaderLabels([
-            "ID", "Название", "Контакт", "Телефон", "Email", "Адрес", "Статус"
-        ])
+        self.model = LazyTableModel(
+            ["ID", "Название", "Контакт", "Телефон", "Email", "Адрес", "Статус"],
+            formatters={6: lambda is_active: "Активный" if is_active else "Архивный"}
+        )
         self.table.setModel(self.model)
         
         # Настройка растягивания колонок
@@ -127,55 +127,25 @@ class ClientForm(QWidget):
     def _setup_db(self):
         """Инициализация подключения к БД"""
         self.engine = init_db()
-        self.Session = sessionmaker(bind=self.engine)
+        self.Session = Session
         self.current_id = None
 
     def load_clients(self):
-        """Загрузка списка клиентов из БД"""
-        session = self.Session()
-        try:
-            search_text = f"%{self.search_input.text()}%"
-            status_filter = self.filter_combo.currentText()
-            
-            query = session.query(Client)
-            
-            if search_text != "%%":
-                query = query.filter(
-                    (Client.name.ilike(search_text)) |
-                    (Client.contact_person.ilike(search_text)) |
-                    (Client.phone.ilike(search_text))
-                )
-            
-            if status_filter == "Активные":
-                query = query.filter(Client.is_active == True)
-            elif status_filter == "Архивные":
-                query = query.filter(Client.is_active == False)
-            
-            clients = query.order_by(Client.name).all()
-            
-            self.model.setRowCount(0)
-            for row, client in enumerate(clients):
-                self._add_client_to_table(row, client)
-                
-        finally:
-            session.close()
+        """Загрузка списка клиентов из БД (постранично, по мере прокрутки)"""
+        search_text = self.search_input.text()
+        status_filter = self.filter_combo.currentText()
 
-    def _add_client_to_table(self, row, client):
-        """Добавление клиента в таблицу"""
-        self.model.insertRow(row)
-        self.model.setItem(row, 0, QStandardItem(str(client.id)))
-        self.model.setItem(row, 1, QStandardItem(client.name))
-        self.model.setItem(row, 2, QStandardItem(client.contact_person or ""))
-        self.model.setItem(row, 3, QStandardItem(client.phone or ""))
-        self.model.setItem(row, 4, QStandardItem(client.email or ""))
-        self.model.setItem(row, 5, QStandardItem(client.address or ""))
-        self.model.setItem(row, 6, QStandardItem("Активный" if client.is_active else "Архивный"))
+        self.model.set_source(
+            lambda session, last_row, limit: queries.client_page(
+                session, search_text, status_filter, last_row, limit
+            )
+        )
 
     def load_client_data(self, index):
         """Загрузка данных выбранного клиента в форму"""
         session = self.Session()
         try:
-            client_id = int(self.model.item(index.row(), 0).text())
+            client_id = self.model.row(index.row())[0]
             client = session.query(Client).get(client_id)
             
             if client:
@@ -209,6 +179,7 @@ class ClientForm(QWidget):
             session.commit()
             
             self._notify_client_action(client, action)
+            event_bus().publish(CLIENT_CHANGED, client_id=client.id)
             self.clear_fields()
             self.load_clients()
             
@@ -266,6 +237,7 @@ class ClientForm(QWidget):
                 session.commit()
                 
                 self._notify_client_action(client, "удален")
+                event_bus().publish(CLIENT_CHANGED, client_id=self.current_id)
                 self.clear_fields()
                 self.load_clients()
                 
@@ -0,0 +1,109 @@
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableView, QCheckBox, QLabel, QHeaderView
+)
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QStandardItemModel, QStandardItem
+from database.instrumentation import query_stats
+from utils.config import load_config
+
+# Период обновления открытого окна, мс
+DIAGNOSTICS_REFRESH_MS = 2000
+
+HEADERS = ["Метод", "Запросов", "p50, мс", "p95, мс", "Макс., мс", "Всего, мс", "Строк"]
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.1f}"
+
+
+class DiagnosticsWindow(QWidget):
+    """Время SQL-запросов по методам форм: p50 и p95 по последним замерам"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Диагностика запросов")
+        self.setGeometry(150, 150, 800, 450)
+
+        self.layout = QVBoxLayout()
+        self.setLayout(self.layout)
+
+        # Кнопки управления
+        self.buttons_layout = QHBoxLayout()
+        self.all_methods_check = QCheckBox("Все методы (не только load_*)")
+        self.all_methods_check.toggled.connect(self.load_stats)
+        self.refresh_button = QPushButton("Обновить")
+        self.refresh_button.clicked.connect(self.load_stats)
+        self.reset_button = QPushButton("Сбросить")
+        self.reset_button.clicked.connect(self.reset_stats)
+
+        self.buttons_layout.addWidget(self.all_methods_check)
+        self.buttons_layout.addStretch()
+        self.buttons_layout.addWidget(self.refresh_button)
+        self.buttons_layout.addWidget(self.reset_button)
+
+        # Таблица показателей
+        self.model = QStandardItemModel()
+        self.model.setHorizontalHeaderLabels(HEADERS)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self.table.setSortingEnabled(True)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.model.setSortRole(Qt.ItemDataRole.UserRole)
+        self.table.sortByColumn(3, Qt.SortOrder.DescendingOrder)
+
+        diagnostics = load_config().get('diagnostics', {})
+        self.info_label = QLabel(
+            f"Медленные запросы (от {diagnostics.get('slow_query_ms', 200)} мс) пишутся в "
+            f"{diagnostics.get('log', 'slow_queries.log')}"
+        )
+
+        self.layout.addLayout(self.buttons_layout)
+        self.layout.addWidget(self.table)
+        self.layout.addWidget(self.info_label)
+
+        # Пока окно открыто, показатели обновляются периодически
+        self.timer = QTimer(self)
+        self.timer.setInterval(DIAGNOSTICS_REFRESH_MS)
+        self.timer.timeout.connect(self.load_stats)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.load_stats()
+        self.timer.start()
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def load_stats(self):
+        show_all = self.all_methods_check.isChecked()
+        rows = [
+            item for item in query_stats().snapshot()
+            if show_all or '.load_' in item['method']
+        ]
+        self.model.removeRows(0, self.model.rowCount())
+        for item in rows:
+            values = [
+                (item['method'], item['method']),
+                (str(item['count']), item['count']),
+                (_ms(item['p50']), item['p50']),
+                (_ms(item['p95']), item['p95']),
+                (_ms(item['max']), item['max']),
+                (_ms(item['total']), item['total']),
+                (str(item['rows']), item['rows']),
+            ]
+            cells = []
+            for text, value in values:
+                cell = QStandardItem(text)
+                cell.setData(value, Qt.ItemDataRole.UserRole)
+                if not isinstance(value, str):
+                    cell.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                cells.append(cell)
+            self.model.appendRow(cells)
+        header = self.table.horizontalHeader()
+        self.model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
+
+    def reset_stats(self):
+        query_stats().reset()
+        self.load_stats()
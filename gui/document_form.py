@@ -1,15 +1,33 @@
+import threading
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QTableView, QHBoxLayout, QPushButton, 
     QGroupBox, QFormLayout, QLineEdit, QComboBox, QFileDialog,
-    QLabel, QMessageBox
+    QLabel, QMessageBox, QProgressDialog
 )
-from PyQt6.QtGui import QStandardItemModel, QStandardItem
-from database import init_db
-from sqlalchemy.orm import sessionmaker
+from PyQt6.QtCore import Qt, QObject, pyqtSignal
+from database import init_db, Session, queries
 from database.models import Document, Order, Client
 from utils.notifications import NotificationManager
+from utils.document_store import DocumentStore
+from utils.document_packet import PacketExporter, PacketCancelled
+from utils.query_runner import QueryRunner
+from utils.reference_cache import reference_cache, CLIENTS
+from utils.events import (
+    event_bus, ORDER_SAVED, ORDER_DELETED, DOCUMENT_ADDED, DOCUMENT_REMOVED, TABLES_CHANGED
+)
+from .table_model import LazyTableModel, StaleReloadMixin
+from .document_preview import DocumentPreviewDialog
+
+# Шкала индикатора выгрузки пакета (байты не помещаются в int индикатора)
+PROGRESS_STEPS = 1000
+
+
+class _PacketProgress(QObject):
+    """Ход выгрузки из рабочего потока в поток интерфейса"""
+    changed = pyqtSignal(object, object)
 
-class DocumentForm(QWidget):
+
+class DocumentForm(StaleReloadMixin, QWidget):
     def __init__(self):
         super().__init__()
         self.layout = QVBoxLayout()
@@ -31,10 +49,10 @@ class DocumentForm(QWidget):
         
         # Таблица документов
         self.table = QTableView()
-        self.model = QStandardItemModel()
-        self.model.setHorizontalHeaderLabels([
-            "ID", "Заказ", "Клиент", "Название", "Описание", "Путь"
-        ])
+        self.model = LazyTableModel(
+            ["ID", "Заказ", "Клиент", "Название", "Описание", "Путь"],
+            formatters={1: lambda order_id: f"Заказ #{order_id}"}
+        )
         self.table.setModel(self.model)
         
         # Кнопки действий
@@ -42,6 +60,7 @@ class DocumentForm(QWidget):
         self.view_button = QPushButton("Просмотреть")
         self.view_button.clicked.connect(self.view_document)
         self.download_button = QPushButton("Скачать")
+        self.download_button.clicked.connect(self.download_documents)
         self.delete_button = QPushButton("Удалить")
         self.delete_button.clicked.connect(self.delete_document)
         
@@ -56,55 +75,69 @@ class DocumentForm(QWidget):
         
         # Инициализация БД
         self.engine = init_db()
-        self.Session = sessionmaker(bind=self.engine)
+        self.Session = Session
+        self.runner = QueryRunner(self)
+        self.references = reference_cache()
+        self.references.changed.connect(self.on_references_changed)
         self.load_clients()
+        self.client_combo.currentIndexChanged.connect(self.load_orders)
+        self.load_documents()
+        
+        # Обновление списков по событиям других вкладок
+        # и других экземпляров приложения
+        bus = event_bus()
+        for topic in (DOCUMENT_ADDED, DOCUMENT_REMOVED, ORDER_DELETED):
+            bus.subscribe(topic, lambda payload: self.refresh())
+        for topic in (ORDER_SAVED, ORDER_DELETED):
+            bus.subscribe(topic, lambda payload: self.load_orders())
+        bus.subscribe(TABLES_CHANGED, self.on_tables_changed)
+    
+    def on_tables_changed(self, payload):
+        if 'orders' in payload['tables']:
+            self.load_orders()
+        if payload['tables'] & {'documents', 'orders'}:
+            self.refresh()
+    
+    def reload(self):
         self.load_documents()
     
     def load_clients(self):
-        session = self.Session()
-        clients = session.query(Client).order_by(Client.name).all()
-        self.client_combo.addItem("Все клиенты", 0)
-        for client in clients:
-            self.client_combo.addItem(client.name, client.id)
-        self.client_combo.currentIndexChanged.connect(self.load_orders)
+        self.references.fill_combo(self.client_combo, self.references.clients(), "Все клиенты")
+    
+    def on_references_changed(self, entity):
+        if entity == CLIENTS:
+            self.load_clients()
     
     def load_orders(self):
         client_id = self.client_combo.currentData()
         if not client_id:
             return
         
-        session = self.Session()
+        # Запрос в фоне: список обновляется и по событиям изменения заказов
+        self.runner.submit(
+            'orders',
+            lambda session: [
+                tuple(row) for row in
+                session.query(Order.id, Order.cargo_name).filter_by(client_id=client_id).order_by(Order.id)
+            ],
+            self.fill_orders
+        )
+    
+    def fill_orders(self, orders):
         self.order_combo.clear()
         self.order_combo.addItem("Все заказы", 0)
-        
-        orders = session.query(Order).filter_by(client_id=client_id).all()
-        for order in orders:
-            self.order_combo.addItem(f"Заказ #{order.id} - {order.cargo_name}", order.id)
+        for order_id, cargo_name in orders:
+            self.order_combo.addItem(f"Заказ #{order_id} - {cargo_name}", order_id)
     
     def load_documents(self):
-        session = self.Session()
-        
-        query = session.query(Document).join(Order).join(Client)
-        
         client_id = self.client_combo.currentData()
-        if client_id:
-            query = query.filter(Order.client_id == client_id)
-        
         order_id = self.order_combo.currentData()
-        if order_id:
-            query = query.filter(Document.order_id == order_id)
-        
-        documents = query.order_by(Document.id.desc()).all()
-        
-        self.model.setRowCount(0)
-        for row, document in enumerate(documents):
-            self.model.insertRow(row)
-            self.model.setItem(row, 0, QStandardItem(str(document.id)))
-            self.model.setItem(row, 1, QStandardItem(f"Заказ #{document.order_id}"))
-            self.model.setItem(row, 2, QStandardItem(document.order.client.name))
-            self.model.setItem(row, 3, QStandardItem(document.name))
-            self.model.setItem(row, 4, QStandardItem(document.description or ""))
-            self.model.setItem(row, 5, QStandardItem(document.file_path))
+        
+        self.model.set_source(
+            lambda session, last_row, limit: queries.document_page(
+                session, client_id, order_id, last_row, limit
+            )
+        )
     
     def view_document(self):
         selected = self.table.selectionModel().selectedRows()
@@ -112,17 +145,107 @@ class DocumentForm(QWidget):
             QMessageBox.warning(self, "Ошибка", "Выберите документ для просмотра")
             return
         
-        document_id = self.model.item(selected[0].row(), 0).text()
+        document_id = self.model.row(selected[0].row())[0]
         session = self.Session()
-        document = session.query(Document).get(int(document_id))
-        
-        if document:
-            # В реальном приложении здесь был бы код для открытия файла
-            QMessageBox.information(
-                self, 
-                "Просмотр документа", 
-                f"Документ: {document.name}\nПуть: {document.file_path}"
-            )
+        try:
+            # Диалогу передаются строки с нужными полями, а не объекты сессии
+            columns = (Document.id, Document.name, Document.description,
+                       Document.file_path, Document.content_hash)
+            order_id = session.query(Document.order_id).filter(
+                Document.id == document_id
+            ).scalar()
+            # Листать можно все документы того же заказа
+            query = session.query(*columns)
+            if order_id is not None:
+                query = query.filter(Document.order_id == order_id)
+            else:
+                query = query.filter(Document.id == document_id)
+            documents = query.order_by(Document.id).all()
+        finally:
+            session.close()
+        
+        if documents:
+            dialog = DocumentPreviewDialog(documents, document_id, self)
+            dialog.exec()
+    
+    def _packet_orders(self, session):
+        """Заказы для пакета: выбранный в фильтре заказ, заказы клиента или заказы выделенных документов"""
+        order_id = self.order_combo.currentData()
+        if order_id:
+            return [order_id]
+        client_id = self.client_combo.currentData()
+        if client_id:
+            return [
+                order_id for (order_id,) in session.query(Order.id).filter(
+                    Order.client_id == client_id,
+                    Order.id.in_(session.query(Document.order_id))
+                )
+            ]
+        rows = self.table.selectionModel().selectedRows()
+        return sorted({self.model.row(index.row())[1] for index in rows} - {None})
+    
+    def download_documents(self):
+        session = self.Session()
+        try:
+            order_ids = self._packet_orders(session)
+        finally:
+            session.close()
+        if not order_ids:
+            QMessageBox.warning(self, "Ошибка", "Выберите заказ, клиента или документы для выгрузки")
+            return
+        
+        default_name = f"Заказ_{order_ids[0]}.zip" if len(order_ids) == 1 else "Документы.zip"
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Сохранить пакет документов", default_name, "ZIP (*.zip)"
+        )
+        if not file_path:
+            return
+        
+        # Выгрузка идет в фоне, индикатор можно отменить
+        cancelled = threading.Event()
+        self.progress_dialog = QProgressDialog(
+            f"Выгрузка документов заказов: {len(order_ids)}", "Отмена", 0, PROGRESS_STEPS, self
+        )
+        self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        self.progress_dialog.setMinimumDuration(300)
+        self.progress_dialog.canceled.connect(cancelled.set)
+        self.progress_signal = _PacketProgress()
+        self.progress_signal.changed.connect(self._packet_progress)
+        exporter = PacketExporter(
+            progress=self.progress_signal.changed.emit, is_cancelled=cancelled.is_set
+        )
+        self.download_button.setEnabled(False)
+        self.runner.submit(
+            'packet',
+            lambda session: exporter.export(session, order_ids, file_path),
+            lambda manifest: self._packet_finished(file_path, manifest),
+            self._packet_failed
+        )
+    
+    def _packet_progress(self, done, total):
+        if self.progress_dialog.wasCanceled():
+            return
+        self.progress_dialog.setValue(done * PROGRESS_STEPS // total if total else 0)
+    
+    def _packet_done(self):
+        self.download_button.setEnabled(True)
+        self.progress_dialog.reset()
+    
+    def _packet_finished(self, file_path, manifest):
+        self._packet_done()
+        message = (
+            f"Пакет сохранен: {file_path}\n"
+            f"Заказов: {len(manifest['orders'])}, документов: {manifest['documents']}"
+        )
+        if manifest['missing']:
+            message += f"\nНе найдено файлов: {manifest['missing']} (см. manifest.json)"
+        QMessageBox.information(self, "Успех", message)
+    
+    def _packet_failed(self, error):
+        self._packet_done()
+        if isinstance(error, PacketCancelled):
+            return
+        QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить пакет документов: {str(error)}")
     
     def delete_document(self):
         selected = self.table.selectionModel().selectedRows()
@@ -130,7 +253,7 @@ class DocumentForm(QWidget):
             QMessageBox.warning(self, "Ошибка", "Выберите документ для удаления")
             return
         
-        document_id = self.model.item(selected[0].row(), 0).text()
+        document_id = self.model.row(selected[0].row())[0]
         
         reply = QMessageBox.question(
             self, 'Подтверждение удаления',
@@ -140,8 +263,10 @@ class DocumentForm(QWidget):
         
         if reply == QMessageBox.StandardButton.Yes:
             session = self.Session()
-            document = session.query(Document).get(int(document_id))
-            if document:
+            try:
+                document = session.query(Document).get(document_id)
+                if not document:
+                    return
                 # Создание уведомления перед удалением
                 notification_manager = NotificationManager()
                 notification_manager.create_notification(
@@ -150,6 +275,8 @@ class DocumentForm(QWidget):
                     related_id=document.order_id
                 )
                 
-                session.delete(document)
-                session.commit()
-                self.load_documents()
\ No newline at end of file
+                # Файл удаляется из хранилища, если на него не ссылаются другие документы
+                DocumentStore().delete(session, [document])
+            finally:
+                session.close()
+            event_bus().publish(DOCUMENT_REMOVED, document_id=document_id)
\ No newline at end of file
@@ -0,0 +1,149 @@
+from PyQt6.QtWidgets import (
+    QDialog, QHBoxLayout, QVBoxLayout, QListWidget, QListWidgetItem, QLabel, QPushButton, QSizePolicy
+)
+from PyQt6.QtCore import Qt, QSize, QUrl
+from PyQt6.QtGui import QIcon, QPixmap, QDesktopServices
+from utils.document_store import DocumentStore
+from utils.previews import preview_service, preview_key, THUMBNAIL, PREVIEW, SIZES
+
+# Размер миниатюр в списке документов
+THUMBNAIL_ICON_SIZE = 96
+
+
+class DocumentPreviewDialog(QDialog):
+    """Просмотр документов заказа: миниатюры слева, превью выбранного справа.
+
+    documents - строки с полями id, name, description, file_path и
+    content_hash (без сессии БД). Изображения берутся из кэша превью;
+    недостающие отрисовываются в фоновых потоках и подставляются по готовности.
+    """
+
+    def __init__(self, documents, current_id=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Просмотр документов")
+        self.resize(1100, 750)
+
+        self.service = preview_service()
+        self.store = DocumentStore()
+        # (id, название, описание, путь к файлу, ключ превью)
+        self.documents = [
+            (document.id, document.name, document.description,
+             self.store.locate(document), preview_key(document))
+            for document in documents
+        ]
+
+        self.layout = QHBoxLayout()
+        self.setLayout(self.layout)
+
+        # Список документов с миниатюрами
+        self.list = QListWidget()
+        self.list.setIconSize(QSize(THUMBNAIL_ICON_SIZE, THUMBNAIL_ICON_SIZE))
+        self.list.setFixedWidth(280)
+        self.list.currentRowChanged.connect(self.show_document)
+
+        # Превью и сведения о выбранном документе
+        self.preview_label = QLabel()
+        self.preview_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.preview_label.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Ignored)
+        self.preview_label.setMinimumSize(400, 400)
+        self.info_label = QLabel()
+        self.info_label.setWordWrap(True)
+        self.info_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        self.open_button = QPushButton("Открыть файл")
+        self.open_button.clicked.connect(self.open_file)
+        self.close_button = QPushButton("Закрыть")
+        self.close_button.clicked.connect(self.accept)
+
+        self.buttons_layout = QHBoxLayout()
+        self.buttons_layout.addStretch()
+        self.buttons_layout.addWidget(self.open_button)
+        self.buttons_layout.addWidget(self.close_button)
+
+        self.preview_layout = QVBoxLayout()
+        self.preview_layout.addWidget(self.preview_label, 1)
+        self.preview_layout.addWidget(self.info_label)
+        self.preview_layout.addLayout(self.buttons_layout)
+
+        self.layout.addWidget(self.list)
+        self.layout.addLayout(self.preview_layout, 1)
+
+        self._pixmap = None
+        self.service.ready.connect(self.on_preview_ready)
+        self.service.failed.connect(self.on_preview_failed)
+
+        current_row = 0
+        for row, (document_id, name, _, path, key) in enumerate(self.documents):
+            item = QListWidgetItem(name or f"Документ #{document_id}")
+            item.setSizeHint(QSize(0, THUMBNAIL_ICON_SIZE + 8))
+            self.list.addItem(item)
+            self._set_thumbnail(row)
+            self.service.request(key, path)
+            if document_id == current_id:
+                current_row = row
+        if self.documents:
+            self.list.setCurrentRow(current_row)
+
+    def done(self, result):
+        self.service.ready.disconnect(self.on_preview_ready)
+        self.service.failed.disconnect(self.on_preview_failed)
+        super().done(result)
+
+    def _set_thumbnail(self, row):
+        path = self.service.cached(self.documents[row][4], THUMBNAIL)
+        if path:
+            self.list.item(row).setIcon(QIcon(QPixmap(path)))
+
+    def _rows(self, key):
+        return [row for row, document in enumerate(self.documents) if document[4] == key]
+
+    def show_document(self, row):
+        if row < 0:
+            return
+        document_id, name, description, path, key = self.documents[row]
+        self.info_label.setText(
+            f"Документ: {name}\nОписание: {description or '-'}\nФайл: {path or '-'}"
+        )
+        cached = self.service.cached(key, PREVIEW)
+        if cached:
+            self._show_pixmap(QPixmap(cached))
+        elif self.service.error(key):
+            self._show_message(f"Превью недоступно: {self.service.error(key)}")
+        else:
+            self._show_message("Подготовка превью...")
+
+    def _show_pixmap(self, pixmap):
+        self._pixmap = pixmap
+        self._fit_pixmap()
+
+    def _show_message(self, text):
+        self._pixmap = None
+        self.preview_label.setPixmap(QPixmap())
+        self.preview_label.setText(text)
+
+    def _fit_pixmap(self):
+        pixmap = self._pixmap
+        if pixmap is None or pixmap.isNull():
+            return
+        size = self.preview_label.size().boundedTo(QSize(SIZES[PREVIEW], SIZES[PREVIEW]))
+        self.preview_label.setPixmap(pixmap.scaled(
+            size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation
+        ))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._fit_pixmap()
+
+    def on_preview_ready(self, key):
+        for row in self._rows(key):
+            self._set_thumbnail(row)
+            if row == self.list.currentRow():
+                self.show_document(row)
+
+    def on_preview_failed(self, key, error):
+        if self.list.currentRow() in self._rows(key):
+            self.show_document(self.list.currentRow())
+
+    def open_file(self):
+        row = self.list.currentRow()
+        if row >= 0 and self.documents[row][3]:
+            QDesktopServices.openUrl(QUrl.fromLocalFile(self.documents[row][3]))
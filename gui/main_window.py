@@ -1,47 +1,46 @@
-from PyQt6.QtWidgets import QMainWindow, QTabWidget, QStatusBar, QToolBar
+import importlib
+import logging
+import time
+from PyQt6.QtWidgets import QMainWindow, QTabWidget, QStatusBar, QToolBar, QWidget, QVBoxLayout
 from PyQt6.QtGui import QAction
-from .client_form import ClientForm
-from .carrier_form import CarrierForm
-from .order_form import OrderForm
-from .payment_form import PaymentForm
-from .document_form import DocumentForm
-from .report_form import ReportForm
-from .notification_widget import NotificationWidget
 from PyQt6.QtCore import QTimer
+from utils import startup
+from utils.notifications import NotificationManager
+from utils.events import event_bus, NOTIFICATIONS_CHANGED, TABLES_CHANGED
+from utils.change_watcher import ChangeWatcher
+
+logger = logging.getLogger(__name__)
+
+# Вкладки: (заголовок, атрибут окна, модуль, класс формы).
+# Модуль формы импортируется, а форма создается при первом открытии вкладки
+TABS = (
+    ("Клиенты", 'client_tab', '.client_form', 'ClientForm'),
+    ("Перевозчики", 'carrier_tab', '.carrier_form', 'CarrierForm'),
+    ("Заказы", 'order_tab', '.order_form', 'OrderForm'),
+    ("Платежи", 'payment_tab', '.payment_form', 'PaymentForm'),
+    ("Документы", 'document_tab', '.document_form', 'DocumentForm'),
+    ("Отчеты", 'report_tab', '.report_form', 'ReportForm'),
+)
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
+        startup.mark("модули главного окна загружены")
         self.setWindowTitle("MurphyLogistik")
         self.setGeometry(100, 100, 1200, 800)
         
-        # Создаем вкладки
+        # Создаем вкладки: пока форма не открыта, на вкладке пустой контейнер
         self.tabs = QTabWidget()
         self.setCentralWidget(self.tabs)
-        
-        # Вкладка клиентов
-        self.client_tab = ClientForm()
-        self.tabs.addTab(self.client_tab, "Клиенты")
-        
-        # Вкладка перевозчиков
-        self.carrier_tab = CarrierForm()
-        self.tabs.addTab(self.carrier_tab, "Перевозчики")
-        
-        # Вкладка заказов
-        self.order_tab = OrderForm()
-        self.tabs.addTab(self.order_tab, "Заказы")
-        
-        # Вкладка платежей
-        self.payment_tab = PaymentForm()
-        self.tabs.addTab(self.payment_tab, "Платежи")
-        
-        # Вкладка документов
-        self.document_tab = DocumentForm()
-        self.tabs.addTab(self.document_tab, "Документы")
-        
-        # Вкладка отчетов
-        self.report_tab = ReportForm()
-        self.tabs.addTab(self.report_tab, "Отчеты")
+        for title, attribute, _, _ in TABS:
+            container = QWidget()
+            container.setLayout(QVBoxLayout())
+            container.layout().setContentsMargins(0, 0, 0, 0)
+            self.tabs.addTab(container, title)
+            setattr(self, attribute, None)
+        self.tabs.currentChanged.connect(self.ensure_tab)
+        self.ensure_tab(self.tabs.currentIndex())
+        startup.mark("первая вкладка создана")
         
         # Панель инструментов
         self.toolbar = QToolBar("Панель инструментов")
@@ -52,26 +51,80 @@ class MainWindow(QMainWindow):
         self.notification_action.triggered.connect(self.show_notifications)
         self.toolbar.addAction(self.notification_action)
         
+        # Кнопка диагностики запросов
+        self.diagnostics_action = QAction("Диагностика", self)
+        self.diagnostics_action.triggered.connect(self.show_diagnostics)
+        self.toolbar.addAction(self.diagnostics_action)
+        
         # Статус бар
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
         
-        # Виджет уведомлений
-        self.notification_widget = NotificationWidget()
+        # Окна уведомлений и диагностики создаются при первом открытии
+        self.notification_widget = None
+        self.diagnostics_window = None
+        self.notification_manager = NotificationManager()
         
-        # Таймер для проверки новых уведомлений
-        self.notification_timer = QTimer()
-        self.notification_timer.timeout.connect(self.check_notifications)
-        self.notification_timer.start(30000)  # Проверка каждые 30 секунд
+        # Счетчик уведомлений обновляется по событию, без периодического опроса
+        bus = event_bus()
+        bus.subscribe(NOTIFICATIONS_CHANGED, lambda payload: self.check_notifications())
+        bus.subscribe(TABLES_CHANGED, self.on_tables_changed)
         self.check_notifications()  # Первоначальная проверка
+        
+        # Изменения, сделанные другими экземплярами приложения
+        self.change_watcher = ChangeWatcher(parent=self)
+        self.change_watcher.start()
+        self._painted = False
+        startup.mark("главное окно создано")
+    
+    def ensure_tab(self, index):
+        """Создание формы вкладки при первом открытии"""
+        if index < 0:
+            return
+        title, attribute, module, class_name = TABS[index]
+        if getattr(self, attribute) is not None:
+            return
+        started = time.perf_counter()
+        form_class = getattr(importlib.import_module(module, __package__), class_name)
+        form = form_class()
+        self.tabs.widget(index).layout().addWidget(form)
+        setattr(self, attribute, form)
+        logger.info("Вкладка %s создана за %.0f мс", title, (time.perf_counter() - started) * 1000)
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._painted:
+            self._painted = True
+            # Срабатывает после обработки первой отрисовки в цикле событий
+            QTimer.singleShot(0, lambda: startup.mark("первая отрисовка окна"))
     
     def show_notifications(self):
+        if self.notification_widget is None:
+            from .notification_widget import NotificationWidget
+            # Виджет загружает уведомления при создании
+            self.notification_widget = NotificationWidget()
+        else:
+            self.notification_widget.load_notifications()
         self.notification_widget.show()
         self.notification_widget.activateWindow()
-        self.notification_widget.load_notifications()
+    
+    def show_diagnostics(self):
+        if self.diagnostics_window is None:
+            from .diagnostics_window import DiagnosticsWindow
+            self.diagnostics_window = DiagnosticsWindow()
+        self.diagnostics_window.show()
+        self.diagnostics_window.activateWindow()
+    
+    def on_tables_changed(self, payload):
+        if 'notifications' in payload['tables']:
+            self.check_notifications()
+    
+    def closeEvent(self, event):
+        self.change_watcher.stop()
+        super().closeEvent(event)
     
     def check_notifications(self):
-        unread_count = self.notification_widget.notification_manager.get_unread_count()
+        unread_count = self.notification_manager.get_unread_count()
         if unread_count > 0:
             self.notification_action.setText(f"Уведомления ({unread_count})")
             self.status_bar.showMessage(f"У вас {unread_count} непрочитанных уведомлений")
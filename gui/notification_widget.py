@@ -1,8 +1,9 @@
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QListWidget, QPushButton, QHBoxLayout, QMessageBox
+    QWidget, QVBoxLayout, QListWidget, QListWidgetItem, QPushButton, QHBoxLayout, QMessageBox
 )
 from PyQt6.QtCore import Qt
 from utils.notifications import NotificationManager
+from utils.events import event_bus, NOTIFICATIONS_CHANGED, TABLES_CHANGED
 
 class NotificationWidget(QWidget):
     def __init__(self, parent=None):
@@ -38,6 +39,17 @@ class NotificationWidget(QWidget):
         
         # Загрузка уведомлений
         self.load_notifications()
+        event_bus().subscribe(NOTIFICATIONS_CHANGED, self.on_notifications_changed)
+        event_bus().subscribe(TABLES_CHANGED, self.on_tables_changed)
+    
+    def on_notifications_changed(self, payload):
+        # Скрытое окно обновится при следующем открытии
+        if self.isVisible():
+            self.load_notifications()
+    
+    def on_tables_changed(self, payload):
+        if 'notifications' in payload['tables']:
+            self.on_notifications_changed(payload)
     
     def load_notifications(self):
         self.notification_list.clear()
@@ -45,7 +57,8 @@ class NotificationWidget(QWidget):
         
         for notification in notifications:
             item_text = f"[{notification.created_at.strftime('%d.%m.%Y %H:%M')}] {notification.message}"
-            item = self.notification_list.addItem(item_text)
+            item = QListWidgetItem(item_text)
+            self.notification_list.addItem(item)
             item.setData(Qt.ItemDataRole.UserRole, notification.id)
             if not notification.is_read:
                 item.setBackground(Qt.GlobalColor.lightGray)
@@ -5,11 +5,14 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import QDate
 from PyQt6.QtGui import QStandardItemModel, QStandardItem
-from database import init_db
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import func
-from database.models import Order, Client, Carrier, Vehicle, Payment, Document
+from database import init_db, Session
+from database.models import Order, Payment, Document
 from utils.notifications import NotificationManager
+from utils.document_store import DocumentStore
+from utils.previews import preview_service, preview_key
+from utils.query_runner import QueryRunner
+from utils.reference_cache import reference_cache, CLIENTS, CARRIERS, VEHICLES
+from utils.events import event_bus, ORDER_SAVED, ORDER_DELETED, PAYMENT_ADDED, DOCUMENT_ADDED
 
 class OrderForm(QWidget):
     def __init__(self):
@@ -19,7 +22,8 @@ class OrderForm(QWidget):
         
         # Инициализация БД
         self.engine = init_db()
-        self.Session = sessionmaker(bind=self.engine)
+        self.Session = Session
+        self.runner = QueryRunner(self)
         
         # Вкладки
         self.tabs = QTabWidget()
@@ -178,33 +182,31 @@ class OrderForm(QWidget):
         self.tabs.addTab(self.payments_tab, "Платежи")
         self.tabs.addTab(self.documents_tab, "Документы")
         
-        # Загрузка данных
+        # Загрузка данных из общего кэша справочников
+        self.references = reference_cache()
+        self.references.changed.connect(self.on_references_changed)
         self.load_clients()
         self.load_carriers()
         self.current_order_id = None
     
     def load_clients(self):
-        session = self.Session()
-        clients = session.query(Client).order_by(Client.name).all()
-        self.client_combo.clear()
-        for client in clients:
-            self.client_combo.addItem(client.name, client.id)
+        self.references.fill_combo(self.client_combo, self.references.clients())
     
     def load_carriers(self):
-        session = self.Session()
-        carriers = session.query(Carrier).order_by(Carrier.company_name).all()
-        self.carrier_combo.clear()
-        for carrier in carriers:
-            self.carrier_combo.addItem(carrier.company_name, carrier.id)
+        self.references.fill_combo(self.carrier_combo, self.references.carriers())
     
     def load_carrier_data(self):
         carrier_id = self.carrier_combo.currentData()
         if carrier_id:
-            session = self.Session()
-            vehicles = session.query(Vehicle).filter_by(carrier_id=carrier_id).all()
-            self.vehicle_combo.clear()
-            for vehicle in vehicles:
-                self.vehicle_combo.addItem(f"{vehicle.plate_number} ({vehicle.model})", vehicle.id)
+            self.references.fill_combo(self.vehicle_combo, self.references.vehicles(carrier_id))
+    
+    def on_references_changed(self, entity):
+        if entity == CLIENTS:
+            self.load_clients()
+        elif entity == CARRIERS:
+            self.load_carriers()
+        elif entity == VEHICLES:
+            self.load_carrier_data()
     
     def load_client_data(self):
         # Можно добавить дополнительную логику при необходимости
@@ -212,56 +214,60 @@ class OrderForm(QWidget):
     
     def save_order(self):
         session = self.Session()
-        
-        if self.current_order_id:
-            # Редактирование существующего заказа
-            order = session.query(Order).get(self.current_order_id)
-            if order:
-                order.client_id = self.client_combo.currentData()
-                order.carrier_id = self.carrier_combo.currentData()
-                order.vehicle_id = self.vehicle_combo.currentData()
-                order.loading_address = self.loading_address.text()
-                order.unloading_address = self.unloading_address.text()
-                order.cargo_name = self.cargo_name.text()
-                order.packaging = self.packaging.text()
-                order.weight = float(self.weight.text()) if self.weight.text() else 0.0
-                order.loading_type = self.loading_type.currentText()
-                order.order_date = self.order_date.date().toPyDate()
-                order.loading_date = self.loading_date.date().toPyDate()
-                order.status = self.status_combo.currentText()
-                action = "обновлен"
-        else:
-            # Создание нового заказа
-            order = Order(
-                client_id=self.client_combo.currentData(),
-                carrier_id=self.carrier_combo.currentData(),
-                vehicle_id=self.vehicle_combo.currentData(),
-                loading_address=self.loading_address.text(),
-                unloading_address=self.unloading_address.text(),
-                cargo_name=self.cargo_name.text(),
-                packaging=self.packaging.text(),
-                weight=float(self.weight.text()) if self.weight.text() else 0.0,
-                loading_type=self.loading_type.currentText(),
-                order_date=self.order_date.date().toPyDate(),
-                loading_date=self.loading_date.date().toPyDate(),
-                status=self.status_combo.currentText()
-            )
-            session.add(order)
-            action = "создан"
-        
-        session.commit()
+        try:
+            if self.current_order_id:
+                # Редактирование существующего заказа
+                order = session.query(Order).get(self.current_order_id)
+                if order:
+                    order.client_id = self.client_combo.currentData()
+                    order.carrier_id = self.carrier_combo.currentData()
+                    order.vehicle_id = self.vehicle_combo.currentData()
+                    order.loading_address = self.loading_address.text()
+                    order.unloading_address = self.unloading_address.text()
+                    order.cargo_name = self.cargo_name.text()
+                    order.packaging = self.packaging.text()
+                    order.weight = float(self.weight.text()) if self.weight.text() else 0.0
+                    order.loading_type = self.loading_type.currentText()
+                    order.order_date = self.order_date.date().toPyDate()
+                    order.loading_date = self.loading_date.date().toPyDate()
+                    order.status = self.status_combo.currentText()
+                    action = "обновлен"
+            else:
+                # Создание нового заказа
+                order = Order(
+                    client_id=self.client_combo.currentData(),
+                    carrier_id=self.carrier_combo.currentData(),
+                    vehicle_id=self.vehicle_combo.currentData(),
+                    loading_address=self.loading_address.text(),
+                    unloading_address=self.unloading_address.text(),
+                    cargo_name=self.cargo_name.text(),
+                    packaging=self.packaging.text(),
+                    weight=float(self.weight.text()) if self.weight.text() else 0.0,
+                    loading_type=self.loading_type.currentText(),
+                    order_date=self.order_date.date().toPyDate(),
+                    loading_date=self.loading_date.date().toPyDate(),
+                    status=self.status_combo.currentText()
+                )
+                session.add(order)
+                action = "создан"
+            
+            session.commit()
+            order_id, cargo_name = order.id, order.cargo_name
+        finally:
+            session.close()
         
         if not self.current_order_id:
-            self.current_order_id = order.id
+            self.current_order_id = order_id
             self.delete_button.setEnabled(True)
         
         # Создание уведомления
         notification_manager = NotificationManager()
         notification_manager.create_notification(
-            message=f"Заказ #{order.id} {action}: {order.cargo_name}",
+            message=f"Заказ #{order_id} {action}: {cargo_name}",
             notification_type="order",
-            related_id=order.id
+            related_id=order_id
         )
+        event_bus().publish(ORDER_SAVED, order_id=order_id)
         
         self.load_payments()
         self.load_documents()
@@ -277,8 +283,10 @@ class OrderForm(QWidget):
             
             if reply == QMessageBox.StandardButton.Yes:
                 session = self.Session()
-                order = session.query(Order).get(self.current_order_id)
-                if order:
+                try:
+                    order = session.query(Order).get(self.current_order_id)
+                    if not order:
+                        return
                     # Создание уведомления перед удалением
                     notification_manager = NotificationManager()
                     notification_manager.create_notification(
@@ -287,9 +295,13 @@ class OrderForm(QWidget):
                         related_id=order.id
                     )
                     
+                    order_id = order.id
                     session.delete(order)
                     session.commit()
-                    self.clear_fields()
+                finally:
+                    session.close()
+                event_bus().publish(ORDER_DELETED, order_id=order_id)
+                self.clear_fields()
     
     def clear_fields(self):
         self.current_order_id = None
@@ -322,25 +334,31 @@ class OrderForm(QWidget):
             QMessageBox.warning(self, "Ошибка", "Введите корректную сумму")
             return
         
+        is_client_payment = self.payment_type.currentIndex() == 0
         session = self.Session()
-        payment = Payment(
-            order_id=self.current_order_id,
-            amount=amount,
-            payment_date=self.payment_date.date().toPyDate(),
-            is_client_payment=(self.payment_type.currentIndex() == 0),
-            description=self.payment_description.text()
-        )
-        session.add(payment)
-        session.commit()
+        try:
+            payment = Payment(
+                order_id=self.current_order_id,
+                amount=amount,
+                payment_date=self.payment_date.date().toPyDate(),
+                is_client_payment=is_client_payment,
+                description=self.payment_description.text()
+            )
+            session.add(payment)
+            session.commit()
+            payment_id = payment.id
+        finally:
+            session.close()
         
         # Создание уведомления
         notification_manager = NotificationManager()
-        payment_type = "от клиента" if payment.is_client_payment else "перевозчику"
+        payment_type = "от клиента" if is_client_payment else "перевозчику"
         notification_manager.create_notification(
             message=f"Платеж {amount:.2f} руб. ({payment_type}) по заказу #{self.current_order_id}",
             notification_type="payment",
             related_id=self.current_order_id
         )
+        event_bus().publish(PAYMENT_ADDED, order_id=self.current_order_id, payment_id=payment_id)
         
         self.payment_amount.clear()
         self.payment_description.clear()
@@ -352,7 +370,10 @@ class OrderForm(QWidget):
             return
         
         session = self.Session()
-        payments = session.query(Payment).filter_by(order_id=self.current_order_id).all()
+        try:
+            payments = session.query(Payment).filter_by(order_id=self.current_order_id).all()
+        finally:
+            session.close()
         
         self.payments_model.setRowCount(0)
         for row, payment in enumerate(payments):
@@ -366,18 +387,15 @@ class OrderForm(QWidget):
         if not self.current_order_id:
             return
         
+        # Итоги заказа поддерживаются триггерами при изменении платежей
         session = self.Session()
-        client_payments = session.query(func.sum(Payment.amount)).filter(
-            Payment.order_id == self.current_order_id,
-            Payment.is_client_payment == True
-        ).scalar() or 0
-        
-        carrier_payments = session.query(func.sum(Payment.amount)).filter(
-            Payment.order_id == self.current_order_id,
-            Payment.is_client_payment == False
-        ).scalar() or 0
+        try:
+            profit = session.query(Order.profit).filter(
+                Order.id == self.current_order_id
+            ).scalar() or 0
+        finally:
+            session.close()
         
-        profit = client_payments - carrier_payments
         self.profit_label.setText(f"Прибыль: {profit:.2f} руб.")
     
     def browse_document(self):
@@ -397,35 +415,70 @@ class OrderForm(QWidget):
             QMessageBox.warning(self, "Ошибка", "Выберите файл")
             return
         
-        session = self.Session()
-        document = Document(
-            order_id=self.current_order_id,
-            name=self.document_name.text(),
-            file_path=self.document_path.text(),
-            description=self.document_description.text()
+        order_id = self.current_order_id
+        source = self.document_path.text()
+        name = self.document_name.text()
+        description = self.document_description.text()
+        store = DocumentStore()
+        
+        def add(session):
+            # Копия файла в хранилище: документ не зависит от исходного файла
+            content_hash = store.add(session, source)
+            document = Document(
+                order_id=order_id,
+                name=name,
+                file_path=source,
+                description=description,
+                content_hash=content_hash
+            )
+            session.add(document)
+            session.expire_on_commit = False
+            session.commit()
+            return document
+        
+        # Копирование и fsync крупного файла идут в фоне
+        self.add_document_button.setEnabled(False)
+        self.runner.submit(
+            'document', add,
+            lambda document: self._document_added(document, store),
+            self._document_failed
         )
-        session.add(document)
-        session.commit()
+    
+    def _document_added(self, document, store):
+        self.add_document_button.setEnabled(True)
+        # Превью готовятся в фоне, чтобы просмотр документа открывался сразу
+        preview_service().request(preview_key(document), store.locate(document))
         
         # Создание уведомления
         notification_manager = NotificationManager()
         notification_manager.create_notification(
-            message=f"Документ '{document.name}' добавлен к заказу #{self.current_order_id}",
+            message=f"Документ '{document.name}' добавлен к заказу #{document.order_id}",
             notification_type="document",
-            related_id=self.current_order_id
+            related_id=document.order_id
         )
+        event_bus().publish(DOCUMENT_ADDED, order_id=document.order_id, document_id=document.id)
         
         self.document_name.clear()
         self.document_description.clear()
         self.document_path.clear()
         self.load_documents()
     
+    def _document_failed(self, error):
+        self.add_document_button.setEnabled(True)
+        if isinstance(error, OSError):
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить файл: {str(error)}")
+        else:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось добавить документ: {str(error)}")
+    
     def load_documents(self):
         if not self.current_order_id:
             return
         
         session = self.Session()
-        documents = session.query(Document).filter_by(order_id=self.current_order_id).all()
+        try:
+            documents = session.query(Document).filter_by(order_id=self.current_order_id).all()
+        finally:
+            session.close()
         
         self.documents_model.setRowCount(0)
         for row, document in enumerate(documents):
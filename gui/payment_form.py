@@ -3,14 +3,15 @@ from PyQt6.QtWidgets import (
     QGroupBox, QFormLayout, QDateEdit, QComboBox, QLabel, QMessageBox
 )
 from PyQt6.QtCore import QDate
-from PyQt6.QtGui import QStandardItemModel, QStandardItem
-from database import init_db
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import func
+from database import init_db, Session, queries
 from database.models import Payment, Order, Client
 from utils.notifications import NotificationManager
+from utils.reference_cache import reference_cache, CLIENTS
+from utils.query_runner import QueryRunner
+from utils.events import event_bus, ORDER_SAVED, ORDER_DELETED, PAYMENT_ADDED, TABLES_CHANGED
+from .table_model import LazyTableModel, StaleReloadMixin
 
-class PaymentForm(QWidget):
+class PaymentForm(StaleReloadMixin, QWidget):
     def __init__(self):
         super().__init__()
         self.layout = QVBoxLayout()
@@ -36,10 +37,14 @@ class PaymentForm(QWidget):
         
         # Таблица платежей
         self.table = QTableView()
-        self.model = QStandardItemModel()
-        self.model.setHorizontalHeaderLabels([
-            "ID", "Дата", "Заказ", "Клиент", "Сумма", "Тип", "Описание"
-        ])
+        self.model = LazyTableModel(
+            ["ID", "Дата", "Заказ", "Клиент", "Сумма", "Тип", "Описание"],
+            formatters={
+                2: lambda order_id: f"Заказ #{order_id}",
+                4: lambda amount: f"{amount:.2f} руб.",
+                5: lambda is_client: "От клиента" if is_client else "Перевозчику",
+            }
+        )
         self.table.setModel(self.model)
         
         # Итоги
@@ -53,45 +58,52 @@ class PaymentForm(QWidget):
         
         # Инициализация БД
         self.engine = init_db()
-        self.Session = sessionmaker(bind=self.engine)
+        self.Session = Session
+        self.runner = QueryRunner(self)
+        self.references = reference_cache()
+        self.references.changed.connect(self.on_references_changed)
         self.load_clients()
         self.load_payments()
+        
+        # Перезагрузка списка при изменении платежей в других вкладках
+        # и в других экземплярах приложения
+        bus = event_bus()
+        for topic in (PAYMENT_ADDED, ORDER_SAVED, ORDER_DELETED):
+            bus.subscribe(topic, lambda payload: self.refresh())
+        bus.subscribe(TABLES_CHANGED, self.on_tables_changed)
+    
+    def on_tables_changed(self, payload):
+        if payload['tables'] & {'payments', 'orders'}:
+            self.refresh()
+    
+    def reload(self):
+        self.load_payments()
     
     def load_clients(self):
-        session = self.Session()
-        clients = session.query(Client).order_by(Client.name).all()
-        self.client_combo.addItem("Все клиенты", 0)
-        for client in clients:
-            self.client_combo.addItem(client.name, client.id)
+        self.references.fill_combo(self.client_combo, self.references.clients(), "Все клиенты")
+    
+    def on_references_changed(self, entity):
+        if entity == CLIENTS:
+            self.load_clients()
     
     def load_payments(self):
-        session = self.Session()
-        
-        query = session.query(Payment).join(Order).join(Client)
-        
         client_id = self.client_combo.currentData()
-        if client_id:
-            query = query.filter(Order.client_id == client_id)
-        
         date_from = self.date_from.date().toPyDate()
         date_to = self.date_to.date().toPyDate()
-        query = query.filter(Payment.payment_date >= date_from, Payment.payment_date <= date_to)
-        
-        payments = query.order_by(Payment.payment_date.desc()).all()
         
-        self.model.setRowCount(0)
-        total = 0
-        
-        for row, payment in enumerate(payments):
-            self.model.insertRow(row)
-            self.model.setItem(row, 0, QStandardItem(str(payment.id)))
-            self.model.setItem(row, 1, QStandardItem(str(payment.payment_date)))
-            self.model.setItem(row, 2, QStandardItem(f"Заказ #{payment.order_id}"))
-            self.model.setItem(row, 3, QStandardItem(payment.order.client.name))
-            self.model.setItem(row, 4, QStandardItem(f"{payment.amount:.2f} руб."))
-            self.model.setItem(row, 5, QStandardItem("От клиента" if payment.is_client_payment else "Перевозчику"))
-            self.model.setItem(row, 6, QStandardItem(payment.description or ""))
-            
-            total += payment.amount if payment.is_client_payment else -payment.amount
+        self.model.set_source(
+            lambda session, last_row, limit: queries.payment_page(
+                session, client_id, date_from, date_to, last_row, limit
+            )
+        )
         
+        # Итог считается в БД, а не по загруженным строкам таблицы
+        self.summary_label.setText("Итоговая прибыль: ...")
+        self.runner.submit(
+            'total',
+            lambda session: queries.payment_total(session, client_id, date_from, date_to),
+            self._show_total
+        )
+    
+    def _show_total(self, total):
         self.summary_label.setText(f"Итоговая прибыль: {total:.2f} руб.")
\ No newline at end of file
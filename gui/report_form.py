@@ -1,18 +1,26 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableView, 
-    QGroupBox, QFormLayout, QDateEdit, QComboBox, QLabel, QFileDialog
+    QGroupBox, QFormLayout, QDateEdit, QComboBox, QLabel, QFileDialog,
+    QMessageBox
 )
 from PyQt6.QtCore import QDate
 from PyQt6.QtGui import QStandardItemModel, QStandardItem
-import openpyxl
-from openpyxl.styles import Font, Alignment
-from fpdf import FPDF
-import os
-from datetime import datetime
-from database import init_db
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import func, extract
-from database.models import Payment, Order, Client
+from database import init_db, Session, reports
+from utils import export
+from engine import Engine
+from utils.query_runner import QueryRunner
+from utils.reference_cache import reference_cache, CLIENTS
+
+# Отчеты из реестра database.reports по названию в списке
+REPORT_KEYS = {
+    "Прибыль по месяцам": 'monthly_profit',
+    "Прибыль по клиентам": 'client_profit',
+    "Активность перевозчиков": 'carrier_activity',
+    "Реестр платежей": 'payment_register',
+}
+
+# Число строк реестра платежей, показываемых на экране
+PREVIEW_ROWS = 1000
 
 class ReportForm(QWidget):
     def __init__(self):
@@ -26,11 +34,7 @@ class ReportForm(QWidget):
         self.filter_group.setLayout(self.filter_layout)
         
         self.report_type = QComboBox()
-        self.report_type.addItems([
-            "Прибыль по месяцам", 
-            "Прибыль по клиентам", 
-            "Активность перевозчиков"
-        ])
+        self.report_type.addItems(list(REPORT_KEYS))
         
         self.year_combo = QComboBox()
         current_year = QDate.currentDate().year()
@@ -74,19 +78,25 @@ class ReportForm(QWidget):
         
         # Инициализация БД
         self.engine = init_db()
-        self.Session = sessionmaker(bind=self.engine)
+        self.Session = Session
+        self.runner = QueryRunner(self)
+        self.report_engine = Engine()
+        self.references = reference_cache()
+        self.references.changed.connect(self.on_references_changed)
         self.load_clients()
+        self.current_report = None  # (ключ отчета, год, клиент) последнего формирования
     
     def load_clients(self):
-        session = self.Session()
-        clients = session.query(Client).order_by(Client.name).all()
-        self.client_combo.addItem("Все клиенты", 0)
-        for client in clients:
-            self.client_combo.addItem(client.name, client.id)
+        self.references.fill_combo(self.client_combo, self.references.clients(), "Все клиенты")
+    
+    def on_references_changed(self, entity):
+        if entity == CLIENTS:
+            self.load_clients()
     
     def generate_report(self):
         report_type = self.report_type.currentText()
         year = self.year_combo.currentData()
+        self.current_report = (REPORT_KEYS[report_type], year, self.client_combo.currentData())
         
         if report_type == "Прибыль по месяцам":
             self.generate_monthly_profit_report(year)
@@ -94,36 +104,26 @@ class ReportForm(QWidget):
             self.generate_client_profit_report(year)
         elif report_type == "Активность перевозчиков":
             self.generate_carrier_activity_report(year)
+        elif report_type == "Реестр платежей":
+            self.generate_payment_register_report(year)
+    
+    def _submit_report(self, query, show):
+        """Выполнение запроса отчета в фоне; новый запуск отменяет предыдущий"""
+        self.summary_label.setText("Формирование отчета...")
+        self.runner.submit('report', query, show, self._report_failed)
+    
+    def _report_failed(self, error):
+        self.summary_label.clear()
+        QMessageBox.critical(self, "Ошибка", f"Не удалось сформировать отчет: {str(error)}")
     
     def generate_monthly_profit_report(self, year):
-        session = self.Session()
-        
-        # Запрос для расчета прибыли по месяцам
-        results = session.query(
-            extract('month', Payment.payment_date).label('month'),
-            func.sum(func.case(
-                [(Payment.is_client_payment == True, Payment.amount)],
-                else_=0
-            )).label('income'),
-            func.sum(func.case(
-                [(Payment.is_client_payment == False, Payment.amount)],
-                else_=0
-            )).label('expense'),
-            (func.sum(func.case(
-                [(Payment.is_client_payment == True, Payment.amount)],
-                else_=0
-            )) - func.sum(func.case(
-                [(Payment.is_client_payment == False, Payment.amount)],
-                else_=0
-            ))).label('profit')
-        ).filter(
-            extract('year', Payment.payment_date) == year
-        ).group_by(
-            extract('month', Payment.payment_date)
-        ).order_by(
-            extract('month', Payment.payment_date)
-        ).all()
-        
+        client_id = self.client_combo.currentData()
+        self._submit_report(
+            lambda session: self.report_engine.monthly_profit(year, client_id, session).rows,
+            lambda results: self.show_monthly_profit_report(year, results)
+        )
+    
+    def show_monthly_profit_report(self, year, results):
         # Настройка модели таблицы
         self.model.clear()
         self.model.setHorizontalHeaderLabels([
@@ -153,47 +153,16 @@ class ReportForm(QWidget):
         )
     
     def get_month_name(self, month_num):
-        months = [
-            "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
-            "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
-        ]
-        return months[int(month_num) - 1] if 1 <= month_num <= 12 else str(month_num)
+        return reports.month_name(month_num)
     
     def generate_client_profit_report(self, year):
-        session = self.Session()
-        
-        # Запрос для расчета прибыли по клиентам
-        results = session.query(
-            Client.name,
-            func.sum(func.case(
-                [(Payment.is_client_payment == True, Payment.amount)],
-                else_=0
-            )).label('income'),
-            func.sum(func.case(
-                [(Payment.is_client_payment == False, Payment.amount)],
-                else_=0
-            )).label('expense'),
-            (func.sum(func.case(
-                [(Payment.is_client_payment == True, Payment.amount)],
-                else_=0
-            )) - func.sum(func.case(
-                [(Payment.is_client_payment == False, Payment.amount)],
-                else_=0
-            ))).label('profit')
-        ).join(Order).join(Payment).filter(
-            extract('year', Payment.payment_date) == year
-        ).group_by(
-            Client.name
-        ).order_by(
-            func.sum(func.case(
-                [(Payment.is_client_payment == True, Payment.amount)],
-                else_=0
-            )) - func.sum(func.case(
-                [(Payment.is_client_payment == False, Payment.amount)],
-                else_=0
-            )).desc()
-        ).all()
-        
+        client_id = self.client_combo.currentData()
+        self._submit_report(
+            lambda session: self.report_engine.client_profit(year, client_id, session).rows,
+            lambda results: self.show_client_profit_report(year, results)
+        )
+    
+    def show_client_profit_report(self, year, results):
         # Настройка модели таблицы
         self.model.clear()
         self.model.setHorizontalHeaderLabels([
@@ -223,22 +192,13 @@ class ReportForm(QWidget):
         )
     
     def generate_carrier_activity_report(self, year):
-        session = self.Session()
-        
-        # Запрос для расчета активности перевозчиков
-        results = session.query(
-            Carrier.company_name,
-            func.count(Order.id).label('order_count'),
-            func.sum(Payment.amount).filter(Payment.is_client_payment == False).label('total_payments')
-        ).join(Order).join(Payment).filter(
-            extract('year', Order.order_date) == year,
-            Payment.is_client_payment == False
-        ).group_by(
-            Carrier.company_name
-        ).order_by(
-            func.count(Order.id).desc()
-        ).all()
-        
+        client_id = self.client_combo.currentData()
+        self._submit_report(
+            lambda session: self.report_engine.carrier_activity(year, client_id, session).rows,
+            lambda results: self.show_carrier_activity_report(year, results)
+        )
+    
+    def show_carrier_activity_report(self, year, results):
         # Настройка модели таблицы
         self.model.clear()
         self.model.setHorizontalHeaderLabels([
@@ -263,6 +223,30 @@ class ReportForm(QWidget):
             f"Выплачено перевозчикам: {total_payments:.2f} руб."
         )
     
+    def generate_payment_register_report(self, year):
+        client_id = self.client_combo.currentData()
+        self._submit_report(
+            lambda session: reports.payment_register_query(session, year, client_id).limit(PREVIEW_ROWS).all(),
+            self.show_payment_register_report
+        )
+    
+    def show_payment_register_report(self, results):
+        columns = reports.REPORTS['payment_register'].columns
+        self.model.clear()
+        self.model.setHorizontalHeaderLabels([name for name, _ in columns])
+        
+        for row, values in enumerate(results):
+            self.model.insertRow(row)
+            for col, (_, kind) in enumerate(columns):
+                self.model.setItem(row, col, QStandardItem(export.cell_text(values[col], kind)))
+        
+        if len(results) == PREVIEW_ROWS:
+            self.summary_label.setText(
+                f"Показаны первые {PREVIEW_ROWS} платежей; при экспорте выгружается весь реестр"
+            )
+        else:
+            self.summary_label.setText(f"Платежей: {len(results)}")
+    
     def export_to_excel(self):
         if self.model.rowCount() == 0:
             QMessageBox.warning(self, "Ошибка", "Нет данных для экспорта")
@@ -275,49 +259,31 @@ class ReportForm(QWidget):
         if not file_path:
             return
         
-        try:
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = "Отчет"
-            
-            # Заголовки
-            headers = []
-            for col in range(self.model.columnCount()):
-                headers.append(self.model.headerData(col, 1))  # 1 - горизонтальная ориентация
-            
-            ws.append(headers)
-            
-            # Жирный шрифт для заголовков
-            for col in range(1, len(headers) + 1):
-                cell = ws.cell(row=1, column=col)
-                cell.font = Font(bold=True)
-                cell.alignment = Alignment(horizontal='center')
-            
-            # Данные
-            for row in range(self.model.rowCount()):
-                row_data = []
-                for col in range(self.model.columnCount()):
-                    item = self.model.item(row, col)
-                    row_data.append(item.text() if item else "")
-                ws.append(row_data)
-            
-            # Автоширина столбцов
-            for col in ws.columns:
-                max_length = 0
-                column = col[0].column_letter
-                for cell in col:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(cell.value)
-                    except:
-                        pass
-                adjusted_width = (max_length + 2)
-                ws.column_dimensions[column].width = adjusted_width
-            
-            wb.save(file_path)
-            QMessageBox.information(self, "Успех", "Отчет успешно экспортирован в Excel")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить файл: {str(e)}")
+        self._export(file_path, 'xlsx', "Отчет успешно экспортирован в Excel")
+    
+    def _export(self, file_path, file_format, success_message):
+        """Выгрузка отчета из БД в файл в фоне, минуя таблицу на экране"""
+        report_key, year, client_id = self.current_report
+        self.export_excel_button.setEnabled(False)
+        self.export_pdf_button.setEnabled(False)
+        self.runner.submit(
+            'export',
+            lambda session: self.report_engine.export(
+                report_key, file_path, file_format, year, client_id, session
+            ),
+            lambda count: self._export_finished(success_message),
+            self._export_failed
+        )
+    
+    def _export_finished(self, message):
+        self.export_excel_button.setEnabled(True)
+        self.export_pdf_button.setEnabled(True)
+        QMessageBox.information(self, "Успех", message)
+    
+    def _export_failed(self, error):
+        self.export_excel_button.setEnabled(True)
+        self.export_pdf_button.setEnabled(True)
+        QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить файл: {str(error)}")
     
     def export_to_pdf(self):
         if self.model.rowCount() == 0:
@@ -331,51 +297,4 @@ class ReportForm(QWidget):
         if not file_path:
             return
         
-        try:
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font("Arial", size=10)
-            
-            # Заголовок отчета
-            report_type = self.report_type.currentText()
-            year = self.year_combo.currentText()
-            pdf.set_font("Arial", 'B', 12)
-            pdf.cell(0, 10, f"Отчет: {report_type} за {year} год", 0, 1, 'C')
-            pdf.ln(5)
-            
-            # Заголовки таблицы
-            pdf.set_font("Arial", 'B', 10)
-            headers = []
-            col_width = 190 / self.model.columnCount()  # Равномерное распределение
-            
-            for col in range(self.model.columnCount()):
-                header = self.model.headerData(col, 1)  # 1 - горизонтальная ориентация
-                headers.append(header)
-                pdf.cell(col_width, 10, header, 1, 0, 'C')
-            
-            pdf.ln()
-            
-            # Данные таблицы
-            pdf.set_font("Arial", size=10)
-            for row in range(self.model.rowCount()):
-                for col in range(self.model.columnCount()):
-                    item = self.model.item(row, col)
-                    text = item.text() if item else ""
-                    pdf.cell(col_width, 10, text, 1, 0, 'C')
-                pdf.ln()
-            
-            # Итоговая информация
-            if self.summary_label.text():
-                pdf.ln(5)
-                pdf.set_font("Arial", 'B', 10)
-                pdf.cell(0, 10, self.summary_label.text(), 0, 1)
-            
-            # Дата создания
-            pdf.ln(10)
-            pdf.set_font("Arial", 'I', 8)
-            pdf.cell(0, 10, f"Создано: {datetime.now().strftime('%d.%m.%Y %H:%M')}", 0, 1, 'R')
-            
-            pdf.output(file_path)
-            QMessageBox.information(self, "Успех", "Отчет успешно экспортирован в PDF")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить файл: {str(e)}")
\ No newline at end of file
+        self._export(file_path, 'pdf', "Отчет успешно экспортирован в PDF")
@@ -0,0 +1,151 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer, pyqtSignal
+from utils.query_runner import QueryRunner
+
+# Задержка поиска после последнего нажатия клавиши, мс
+SEARCH_DELAY_MS = 250
+
+
+def debounced(parent, signal, slot, delay_ms=SEARCH_DELAY_MS):
+    """Вызов slot после паузы в сигналах signal (поиск после паузы в наборе,
+    а не на каждую клавишу). Возвращает таймер."""
+    timer = QTimer(parent)
+    timer.setSingleShot(True)
+    timer.setInterval(delay_ms)
+    timer.timeout.connect(slot)
+    signal.connect(timer.start)
+    return timer
+
+
+
+class StaleReloadMixin:
+    """Перезагрузка списка виджета по событиям: видимый виджет
+    перезагружается сразу, скрытая вкладка - при следующем показе.
+    Виджет определяет reload().
+    """
+
+    _stale = False
+
+    def reload(self):
+        raise NotImplementedError
+
+    def refresh(self):
+        """Перезагрузка списка; скрытая вкладка обновится при показе"""
+        if self.isVisible():
+            self.reload()
+        else:
+            self._stale = True
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._stale:
+            self._stale = False
+            self.reload()
+
+class LazyTableModel(QAbstractTableModel):
+    """Табличная модель с постраничной подгрузкой строк.
+
+    Строки хранятся компактными кортежами, текст ячеек формируется только
+    для видимых ячеек при отрисовке. Источник данных - функция
+    fetch_page(session, last_row, limit), которая возвращает следующую
+    страницу после строки last_row (None - первая страница) с
+    keyset-пагинацией. Страницы запрашиваются в фоновом потоке; смена
+    источника отменяет незавершенную загрузку.
+    """
+
+    # Загружена очередная страница (число строк в модели)
+    page_loaded = pyqtSignal(int)
+
+    def __init__(self, headers, formatters=None, page_size=200, parent=None):
+        super().__init__(parent)
+        self.headers = list(headers)
+        self.formatters = formatters or {}
+        self.page_size = page_size
+        self.runner = QueryRunner(self)
+        self._fetch_page = None
+        self._rows = []
+        self._exhausted = True
+        self._loading = False
+
+    def set_source(self, fetch_page):
+        """Смена источника данных: сброс модели и загрузка первой страницы"""
+        self.runner.cancel('page')
+        self.beginResetModel()
+        self._fetch_page = fetch_page
+        self._rows = []
+        self._exhausted = fetch_page is None
+        self._loading = False
+        self.endResetModel()
+        if self.canFetchMore():
+            self.fetchMore()
+
+    def clear(self):
+        self.set_source(None)
+
+    def row(self, row):
+        """Исходный кортеж строки"""
+        return self._rows[row]
+
+    def rows(self):
+        return self._rows
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self._rows[index.row()][index.column()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            formatter = self.formatters.get(index.column())
+            if formatter:
+                return formatter(value)
+            return "" if value is None else str(value)
+        if role == Qt.ItemDataRole.UserRole:
+            return value
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return section + 1
+
+    def is_loading(self):
+        return self._loading
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and not self._loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._loading = True
+        fetch_page = self._fetch_page
+        last_row = self._rows[-1] if self._rows else None
+        limit = self.page_size
+        self.runner.submit(
+            'page',
+            lambda session: fetch_page(session, last_row, limit),
+            self._append_page,
+            self._on_page_error
+        )
+
+    def _append_page(self, page):
+        self._loading = False
+        if len(page) < self.page_size:
+            self._exhausted = True
+        if page:
+            start = len(self._rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(page) - 1)
+            self._rows.extend(page)
+            self.endInsertRows()
+        self.page_loaded.emit(len(self._rows))
+
+    def _on_page_error(self, error):
+        # Ошибка уже записана в журнал; прекращаем подгрузку этого источника
+        self._loading = False
+        self._exhausted = True
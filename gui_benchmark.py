@@ -0,0 +1,294 @@
+"""Замеры отзывчивости интерфейса на offscreen-платформе Qt.
+
+Сценарий выполняет действия пользователя в главном окне (открытие
+вкладок, поиск клиентов, фильтр платежей и документов, формирование
+отчетов) и для каждого измеряет:
+
+- время до отрисованной таблицы: от действия до первой отрисовки
+  таблицы после завершения загрузки данных;
+- наибольшую задержку цикла событий: таймер-пульс срабатывает каждые
+  HEARTBEAT_MS, и опоздание пульса - время, на которое поток интерфейса
+  был занят (построение QStandardItem, раскладка таблицы, синхронные
+  запросы).
+
+Результаты пишутся в JSON того же вида, что у benchmark.py (медиана
+времени в поле median), поэтому сравниваются той же функцией.
+
+    python -m database.synthetic bench.db --tier 1m
+    python gui_benchmark.py bench.db -o gui.json [--compare old_gui.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from utils.config import DATABASE_URL_ENV
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import Qt, QObject, QTimer, QEventLoop, QEvent, QDate
+from benchmark import compare, git_commit
+
+# Период таймера-пульса, мс
+HEARTBEAT_MS = 5
+
+# Задержка цикла событий, которую пользователь замечает, мс
+STALL_THRESHOLD_MS = 50
+
+# Предельное время одного действия, с
+ACTION_TIMEOUT = 120
+
+DEFAULT_REPEAT = 3
+
+SEARCH_TEXTS = ("Транс", "Груз", "Север")
+
+
+class StallMonitor(QObject):
+    """Задержки цикла событий по опозданию таймера-пульса"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.setInterval(HEARTBEAT_MS)
+        self.timer.timeout.connect(self._beat)
+        self.reset()
+
+    def reset(self):
+        self.last = time.perf_counter()
+        self.max_stall = 0.0
+        self.stalls = 0
+
+    def _beat(self):
+        now = time.perf_counter()
+        stall = now - self.last - HEARTBEAT_MS / 1000
+        self.last = now
+        self.max_stall = max(self.max_stall, stall)
+        if stall * 1000 >= STALL_THRESHOLD_MS:
+            self.stalls += 1
+
+    def start(self):
+        self.reset()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        self._beat()
+
+
+class _PaintWatcher(QObject):
+    """Ожидание отрисовки виджета"""
+
+    def __init__(self, widget, callback):
+        super().__init__(widget)
+        self.widget = widget
+        self.callback = callback
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            self.widget.removeEventFilter(self)
+            # Колбэк после обработки события отрисовки
+            QTimer.singleShot(0, self.callback)
+        return False
+
+
+def run_action(monitor, trigger, done, view):
+    """Выполнение действия: (время до отрисованной таблицы, макс. задержка, число задержек)"""
+    loop = QEventLoop()
+    state = {'started': None, 'finished': None}
+    poll = QTimer()
+    poll.setInterval(1)
+
+    def finish():
+        state['finished'] = time.perf_counter()
+        loop.quit()
+
+    def check():
+        if done():
+            poll.stop()
+            _PaintWatcher(view.viewport(), finish)
+            view.viewport().update()
+
+    def start():
+        state['started'] = time.perf_counter()
+        trigger()
+        poll.start()
+
+    poll.timeout.connect(check)
+    QTimer.singleShot(ACTION_TIMEOUT * 1000, loop.quit)
+    monitor.start()
+    # Действие запускается из цикла событий, чтобы его блокировку увидел пульс
+    QTimer.singleShot(0, start)
+    loop.exec()
+    poll.stop()
+    monitor.stop()
+    if state['finished'] is None:
+        raise TimeoutError("Действие не завершилось за отведенное время")
+    return state['finished'] - state['started'], monitor.max_stall, monitor.stalls
+
+
+class _LazyView:
+    """Представление, которое появляется только после действия"""
+
+    def __init__(self, get_view):
+        self.get_view = get_view
+
+    def viewport(self):
+        return self.get_view().viewport()
+
+
+class GuiBenchmark:
+    """Сценарий действий пользователя в главном окне"""
+
+    def __init__(self, repeat=DEFAULT_REPEAT):
+        self.repeat = repeat
+        self.monitor = StallMonitor()
+        self.window = None
+        self.results = {}
+
+    def record(self, name, samples):
+        totals = [sample[0] for sample in samples]
+        self.results[name] = result = {
+            'first': totals[0],
+            'median': statistics.median(totals),
+            'max': max(totals),
+            'max_stall': max(sample[1] for sample in samples),
+            'stalls': sum(sample[2] for sample in samples),
+        }
+        print(f"{name:28} {result['median'] * 1000:9.1f} мс  задержка до "
+              f"{result['max_stall'] * 1000:.1f} мс ({result['stalls']} >= {STALL_THRESHOLD_MS} мс)",
+              file=sys.stderr)
+
+    def action(self, name, trigger, done, view, repeat=None):
+        samples = [run_action(self.monitor, trigger, done, view) for _ in range(repeat or self.repeat)]
+        self.record(name, samples)
+
+    def open_window(self):
+        from gui.main_window import MainWindow
+
+        def trigger():
+            self.window = MainWindow()
+            self.window.show()
+
+        def done():
+            return self.window is not None and not self.window.client_tab.model.is_loading()
+
+        samples = [run_action(self.monitor, trigger, done, _LazyView(lambda: self.window.client_tab.table))]
+        self.record('window.open', samples)
+
+    def open_tab(self, index, attribute, done):
+        window = self.window
+        samples = [run_action(
+            self.monitor, lambda: window.tabs.setCurrentIndex(index),
+            lambda: getattr(window, attribute) is not None and done(getattr(window, attribute)),
+            _LazyView(lambda: getattr(window, attribute).table)
+        )]
+        self.record(f'tab.{attribute}', samples)
+
+    def run_all(self):
+        from gui.main_window import TABS
+        from gui.report_form import REPORT_KEYS
+
+        self.open_window()
+        window = self.window
+        tab_index = {attribute: index for index, (_, attribute, _, _) in enumerate(TABS)}
+
+        def lazy_done(form):
+            return not form.model.is_loading()
+
+        # Клиенты: поиск с задержкой ввода и прокрутка до конца загруженных строк
+        clients = window.client_tab
+        texts = iter(SEARCH_TEXTS * self.repeat)
+        self.action(
+            'clients.search',
+            lambda: clients.search_input.setText(next(texts)),
+            lambda: not clients.search_timer.isActive() and lazy_done(clients),
+            clients.table
+        )
+        clients.search_input.clear()
+        clients.search_timer.stop()
+        clients.load_clients()
+        self.action('clients.scroll', clients.table.scrollToBottom, lambda: lazy_done(clients), clients.table)
+
+        # Платежи: фильтр за год
+        self.open_tab(tab_index['payment_tab'], 'payment_tab', lazy_done)
+        payments = window.payment_tab
+
+        def apply_payment_filter():
+            payments.date_from.setDate(QDate(QDate.currentDate().year(), 1, 1))
+            payments.apply_button.click()
+
+        self.action(
+            'payments.filter', apply_payment_filter,
+            lambda: lazy_done(payments) and not payments.runner.is_running('total'),
+            payments.table
+        )
+
+        # Документы: выбор клиента (загрузка его заказов) и применение фильтра
+        self.open_tab(tab_index['document_tab'], 'document_tab', lazy_done)
+        documents = window.document_tab
+
+        def apply_document_filter():
+            documents.client_combo.setCurrentIndex(1 if documents.client_combo.currentIndex() != 1 else 2)
+            documents.apply_button.click()
+
+        self.action('documents.filter', apply_document_filter, lambda: lazy_done(documents), documents.table)
+
+        # Отчеты: каждый отчет из списка формы
+        self.open_tab(tab_index['report_tab'], 'report_tab', lambda form: True)
+        reports = window.report_tab
+        for index in range(reports.report_type.count()):
+            reports.report_type.setCurrentIndex(index)
+            self.action(
+                f'reports.{REPORT_KEYS[reports.report_type.currentText()]}', reports.generate_button.click,
+                lambda: not reports.runner.is_running('report'), reports.table
+            )
+
+        window.close()
+        return self.results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры отзывчивости интерфейса MurphyLogistik")
+    parser.add_argument('database', help="файл БД SQLite (см. python -m database.synthetic)")
+    parser.add_argument('-o', '--output', help="файл результатов JSON (по умолчанию стандартный вывод)")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--compare', help="JSON прошлого прогона для сравнения")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.database):
+        parser.error(f"нет файла БД: {args.database}")
+    os.environ[DATABASE_URL_ENV] = f"sqlite:///{os.path.abspath(args.database)}"
+
+    app = QApplication(sys.argv[:1])
+    benchmark = GuiBenchmark(args.repeat)
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'platform': app.platformName(),
+            'database': os.path.abspath(args.database),
+            'repeat': args.repeat,
+            'heartbeat_ms': HEARTBEAT_MS,
+        },
+        'results': benchmark.run_all(),
+    }
+
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print(compare(results, json.load(f)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import gc
+import os
+import sys
+from datetime import date
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Тесты работают с in-memory БД и без дисплея
+os.environ['MURPHYLOGISTIK_DATABASE_URL'] = 'sqlite://'
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+@pytest.fixture
+def db():
+    """Новая in-memory БД со схемой последней версии"""
+    from database import init_db, dispose_engine
+
+    dispose_engine()
+    engine = init_db()
+    yield engine
+    dispose_engine()
+
+
+@pytest.fixture
+def file_db(tmp_path, monkeypatch):
+    """БД в файле с пулом соединений QueuePool, как у приложения"""
+    from database import init_db, dispose_engine
+
+    monkeypatch.setenv('MURPHYLOGISTIK_DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    dispose_engine()
+    engine = init_db()
+    yield engine
+    dispose_engine()
+
+
+@pytest.fixture
+def no_gc():
+    """Незакрытая сессия возвращает соединение в пул только при сборке мусора"""
+    gc.disable()
+    yield
+    gc.enable()
+
+
+@pytest.fixture
+def report_data(db):
+    """Два клиента, один перевозчик; заказы на границах года"""
+    from database import Session
+    from database.models import Client, Carrier, Order, Payment
+
+    session = Session()
+    first, second = Client(name="Первый"), Client(name="Второй")
+    carrier = Carrier(company_name="Перевозчик")
+    session.add_all([first, second, carrier])
+    session.flush()
+    for client, order_date, amount in (
+        (first, date(2024, 1, 1), 100.0),
+        (first, date(2024, 12, 31), 200.0),
+        (second, date(2024, 6, 15), 400.0),
+        (first, date(2025, 1, 1), 800.0),
+        (second, date(2023, 12, 31), 1600.0),
+    ):
+        order = Order(client_id=client.id, carrier_id=carrier.id, loading_address="А",
+                      unloading_address="Б", order_date=order_date)
+        session.add(order)
+        session.flush()
+        session.add(Payment(order_id=order.id, amount=amount, is_client_payment=False,
+                            payment_date=order_date))
+    session.commit()
+    yield session, first.id, second.id
+    session.close()
+
+
+@pytest.fixture(scope='session')
+def app():
+    """Общее для тестов приложение Qt (offscreen)"""
+    from PyQt6.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def widgets(app):
+    """Окна теста: после теста доставляются отложенные события и результаты
+    запросов, окна удаляются, кэш справочников сбрасывается"""
+    from PyQt6 import sip
+    from utils.query_runner import QueryRunner
+    from utils.reference_cache import reference_cache, CLIENTS, CARRIERS, VEHICLES
+
+    created = []
+    yield created
+    QueryRunner.pool().waitForDone()
+    app.processEvents()
+    for widget in created:
+        widget.close()
+        sip.delete(widget)
+    reference_cache().invalidate(CLIENTS, CARRIERS, VEHICLES)
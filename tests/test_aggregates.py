@@ -0,0 +1,69 @@
+from datetime import date
+
+from sqlalchemy import text
+
+from database import Session, aggregates
+from database.models import Client, Carrier, Order, Payment
+
+
+def ledger(connection):
+    """Строки ledger_monthly без обнуленных триггерами ключей"""
+    return sorted(
+        (year, month, client_id, carrier_id, bool(is_client), round(amount, 2), count)
+        for year, month, client_id, carrier_id, is_client, amount, count in connection.execute(text(
+            "SELECT year, month, client_id, carrier_id, is_client_payment, amount, payment_count "
+            "FROM ledger_monthly"
+        ))
+        if count != 0
+    )
+
+
+def test_triggers_match_full_rebuild(db):
+    session = Session()
+    first, second = Client(name="Первый"), Client(name="Второй")
+    carrier = Carrier(company_name="Перевозчик")
+    session.add_all([first, second, carrier])
+    session.flush()
+    orders = [
+        Order(client_id=client.id, carrier_id=carrier.id, loading_address="А",
+              unloading_address="Б", order_date=date(2024, 1, 10))
+        for client in (first, second, first)
+    ]
+    session.add_all(orders)
+    session.flush()
+
+    payments = [
+        Payment(order_id=orders[n % 3].id, amount=100.0 * (n + 1), is_client_payment=n % 2 == 0,
+                payment_date=date(2024, 1 + n % 3, 5))
+        for n in range(9)
+    ]
+    session.add_all(payments)
+    session.commit()
+
+    payments[0].amount = 155.5
+    payments[1].order_id = orders[2].id
+    payments[2].is_client_payment = not payments[2].is_client_payment
+    payments[3].payment_date = date(2023, 12, 31)
+    session.flush()
+    payments[4].amount, payments[4].order_id = 42.0, orders[0].id
+    session.delete(payments[5])
+    session.delete(payments[6])
+    orders[1].client_id = first.id
+    session.commit()
+
+    connection = session.connection()
+    assert aggregates.verify_order_balances(connection) == []
+    maintained = ledger(connection)
+    assert maintained
+    aggregates.rebuild_ledger(connection)
+    assert maintained == ledger(connection)
+    session.rollback()
+
+    # После удаления всех платежей итоги нулевые
+    session.query(Payment).delete()
+    session.commit()
+    connection = session.connection()
+    assert aggregates.verify_order_balances(connection) == []
+    assert ledger(connection) == []
+    assert {profit for profit, in session.query(Order.profit)} == {0}
+    session.close()
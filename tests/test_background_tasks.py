@@ -0,0 +1,101 @@
+import threading
+from datetime import date, timedelta
+
+from database import Session
+from database.models import Client, Order, Payment, Notification, JobState
+from utils.background_tasks import BackgroundTaskManager
+
+
+def add_order(session, loading_date=None, status="Создан"):
+    client = Client(name="Клиент")
+    order = Order(client=client, loading_address="А", unloading_address="Б",
+                  order_date=date.today(), loading_date=loading_date, status=status)
+    session.add(order)
+    session.flush()
+    return order
+
+
+def add_overdue_payment(session, order, days=10):
+    payment = Payment(order_id=order.id, amount=100.0, is_client_payment=True,
+                      payment_date=date.today() - timedelta(days=days))
+    session.add(payment)
+    session.flush()
+    return payment
+
+
+def notification_count(session):
+    return session.query(Notification).count()
+
+
+def test_cancelled_check_writes_nothing(db):
+    session = Session()
+    order = add_order(session, loading_date=date.today() + timedelta(days=1))
+    add_overdue_payment(session, order)
+    session.commit()
+
+    manager = BackgroundTaskManager(start=False)
+    cancelled = threading.Event()
+    cancelled.set()
+    manager.check_overdue_payments(cancelled)
+    manager.check_upcoming_orders(cancelled)
+    manager.Session.remove()
+
+    assert notification_count(session) == 0
+    assert session.query(JobState).count() == 0
+    session.close()
+
+
+def test_checks_notify_once(db):
+    session = Session()
+    order = add_order(session, loading_date=date.today() + timedelta(days=1))
+    add_overdue_payment(session, order)
+    session.commit()
+
+    manager = BackgroundTaskManager(start=False)
+    for _ in range(2):
+        manager.check_overdue_payments(threading.Event())
+        manager.check_upcoming_orders(threading.Event())
+        manager.Session.remove()
+
+    assert notification_count(session) == 2
+    session.close()
+
+
+def test_overdue_check_sees_edited_old_payment(db):
+    session = Session()
+    order = add_order(session)
+    payment = add_overdue_payment(session, order, days=0)
+    session.commit()
+
+    manager = BackgroundTaskManager(start=False)
+    manager.check_overdue_payments(threading.Event())
+    manager.Session.remove()
+    assert notification_count(session) == 0
+
+    # Старый платеж (id ниже водяного знака) перенесен на прошлую дату
+    payment.payment_date = date.today() - timedelta(days=30)
+    session.commit()
+    manager.check_overdue_payments(threading.Event())
+    manager.Session.remove()
+    assert notification_count(session) == 1
+    session.close()
+
+
+def test_upcoming_check_keeps_existing_notifications(db):
+    session = Session()
+    add_order(session, loading_date=date.today() + timedelta(days=1))
+    session.commit()
+
+    manager = BackgroundTaskManager(start=False)
+    manager.check_upcoming_orders(threading.Event())
+    manager.Session.remove()
+    notification = session.query(Notification).one()
+    notification.is_read = True
+    session.commit()
+
+    manager.check_upcoming_orders(threading.Event())
+    manager.Session.remove()
+    session.expire_all()
+    assert session.query(Notification).one().is_read is True
+    assert session.query(JobState).count() == 0
+    session.close()
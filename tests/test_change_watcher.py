@@ -0,0 +1,82 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+from database import Session
+from database.models import Client, Order, Payment
+from utils import change_watcher
+from utils.change_watcher import ChangeWatcher
+
+
+class Bus:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, topic, **payload):
+        self.published.append(payload['tables'])
+
+
+@pytest.fixture
+def watcher(app, file_db, monkeypatch):
+    bus = Bus()
+    monkeypatch.setattr(change_watcher, 'event_bus', lambda: bus)
+    watcher = ChangeWatcher()
+    assert watcher.start()
+    watcher.bus = bus
+    yield watcher
+    watcher.stop()
+
+
+def remote_connection(engine):
+    return sqlite3.connect(engine.url.database)
+
+
+def test_local_commits_are_not_reported(watcher):
+    session = Session()
+    client = Client(name="Клиент")
+    order = Order(client=client, loading_address="А", unloading_address="Б")
+    session.add(order)
+    session.commit()
+    # Триггер итогов обновляет orders при каждом платеже
+    session.add(Payment(order_id=order.id, amount=10.0, is_client_payment=True,
+                        payment_date=date.today()))
+    session.commit()
+    session.close()
+
+    watcher.poll()
+    assert watcher.bus.published == []
+
+
+def test_rolled_back_writes_are_not_counted(watcher, file_db):
+    session = Session()
+    session.add(Client(name="Отмена"))
+    session.flush()
+    session.rollback()
+    session.close()
+
+    remote = remote_connection(file_db)
+    remote.execute("INSERT INTO clients (name, is_active) VALUES ('Чужой', 1)")
+    remote.commit()
+    remote.close()
+
+    watcher.poll()
+    assert watcher.bus.published == [frozenset({'clients'})]
+
+
+def test_remote_commits_are_reported_beside_local(watcher, file_db):
+    session = Session()
+    session.add(Client(name="Свой"))
+    session.commit()
+    session.close()
+
+    remote = remote_connection(file_db)
+    remote.execute("INSERT INTO carriers (company_name, is_active) VALUES ('Чужой', 1)")
+    remote.execute("INSERT INTO clients (name, is_active) VALUES ('Чужой', 1)")
+    remote.commit()
+    remote.close()
+
+    watcher.poll()
+    assert watcher.bus.published == [frozenset({'carriers', 'clients'})]
+    watcher.poll()
+    assert len(watcher.bus.published) == 1
@@ -0,0 +1,89 @@
+import json
+import zipfile
+from datetime import date
+
+import pytest
+
+from database import Session
+from database.models import Client, Document, Order, Payment
+from utils import document_packet
+from utils.document_packet import PacketExporter, PacketCancelled, MANIFEST_NAME
+from utils.document_store import DocumentStore
+
+
+@pytest.fixture
+def packet_data(db, tmp_path):
+    """Заказ с документом в хранилище, документом без файла и платежом"""
+    store = DocumentStore(str(tmp_path / 'store'))
+    source = tmp_path / 'act.txt'
+    source.write_bytes('акт'.encode() * 1000)
+
+    session = Session()
+    order = Order(client=Client(name="Клиент"), loading_address="А", unloading_address="Б",
+                  order_date=date(2024, 3, 1))
+    session.add(order)
+    session.flush()
+    digest = store.add(session, str(source))
+    session.add_all([
+        Document(order_id=order.id, name="Акт", file_path=str(source), content_hash=digest),
+        Document(order_id=order.id, name="Старый скан", file_path=str(tmp_path / 'lost.pdf')),
+        Payment(order_id=order.id, amount=500.0, is_client_payment=True, payment_date=date(2024, 3, 5)),
+    ])
+    session.commit()
+    order_id = order.id
+    session.close()
+    return store, order_id, digest
+
+
+def test_export_writes_documents_payments_and_manifest(packet_data, tmp_path):
+    store, order_id, digest = packet_data
+    path = str(tmp_path / 'packet.zip')
+    session = Session()
+    manifest = PacketExporter(store=store).export(session, [order_id], path)
+    session.close()
+
+    folder = f"Заказ_{order_id}"
+    with zipfile.ZipFile(path) as archive:
+        assert sorted(archive.namelist()) == sorted(
+            [MANIFEST_NAME, f"{folder}/payments.csv", f"{folder}/Акт.txt"]
+        )
+        assert archive.read(f"{folder}/Акт.txt") == 'акт'.encode() * 1000
+        assert "500.00" in archive.read(f"{folder}/payments.csv").decode('utf-8-sig')
+        stored = json.loads(archive.read(MANIFEST_NAME))
+
+    assert stored == manifest
+    assert (manifest['documents'], manifest['missing']) == (1, 1)
+    documents = manifest['orders'][0]['documents']
+    assert documents[0]['file'] == f"{folder}/Акт.txt"
+    assert (documents[0]['sha256'], documents[0]['status']) == (digest, 'ok')
+    assert (documents[1]['file'], documents[1]['status']) == (None, 'missing')
+    assert manifest['orders'][0]['income_total'] == 500.0
+
+
+def test_cancelled_export_leaves_no_files(packet_data, tmp_path, monkeypatch):
+    store, order_id, _ = packet_data
+    monkeypatch.setattr(document_packet, 'CHUNK_SIZE', 512)
+    path = tmp_path / 'packet.zip'
+    exporter = PacketExporter(store=store)
+    # Отмена после первого записанного блока
+    exporter.is_cancelled = lambda: exporter.done_bytes > 0
+
+    session = Session()
+    with pytest.raises(PacketCancelled):
+        exporter.export(session, [order_id], str(path))
+    session.close()
+
+    assert 0 < exporter.done_bytes < exporter.total_bytes
+    assert not path.exists()
+    assert not (tmp_path / 'packet.zip.part').exists()
+
+
+def test_main_accepts_date_to_alone(packet_data, tmp_path, monkeypatch):
+    store, order_id, _ = packet_data
+    monkeypatch.setattr(document_packet, 'DocumentStore', lambda: store)
+    path = tmp_path / 'packet.zip'
+    document_packet.main([str(path), '--date-to', '2024-03-31'])
+
+    with zipfile.ZipFile(path) as archive:
+        manifest = json.loads(archive.read(MANIFEST_NAME))
+    assert [entry['order_id'] for entry in manifest['orders']] == [order_id]
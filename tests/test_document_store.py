@@ -0,0 +1,89 @@
+import os
+
+import pytest
+from sqlalchemy import text
+
+from database import Session
+from database.models import Document, Order
+from utils.document_store import DocumentStore
+
+
+@pytest.fixture
+def store(db, tmp_path):
+    return DocumentStore(str(tmp_path / 'store'))
+
+
+def scan(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def attach(session, store, source, count=1):
+    """Документы заказа с содержимым файла source"""
+    order = Order(loading_address="А", unloading_address="Б")
+    session.add(order)
+    session.flush()
+    digest = store.add(session, source)
+    documents = [
+        Document(order_id=order.id, name=f"Скан {n}", file_path=source, content_hash=digest)
+        for n in range(count)
+    ]
+    session.add_all(documents)
+    session.commit()
+    return digest, documents
+
+
+def ref_count(session, digest):
+    return session.execute(
+        text("SELECT ref_count FROM document_blobs WHERE sha256 = :sha256"), {'sha256': digest}
+    ).scalar()
+
+
+def test_identical_content_is_stored_once(store, tmp_path):
+    session = Session()
+    first, _ = attach(session, store, scan(tmp_path, 'a.pdf', 'скан'.encode() * 100))
+    second, _ = attach(session, store, scan(tmp_path, 'b.pdf', 'скан'.encode() * 100))
+
+    assert first == second
+    assert [digest for digest, _ in store._iter_files()] == [first]
+    assert ref_count(session, first) == 2
+    assert store.verify(session).is_ok()
+    session.close()
+
+
+def test_file_is_removed_with_last_reference(store, tmp_path):
+    session = Session()
+    digest, documents = attach(session, store, scan(tmp_path, 'a.pdf', 'содержимое'.encode()), count=2)
+    path = store.path_for(digest)
+
+    assert store.delete(session, documents[:1]) == 0
+    assert os.path.exists(path)
+    assert ref_count(session, digest) == 1
+
+    assert store.delete(session, documents[1:]) == 1
+    assert not os.path.exists(path)
+    assert ref_count(session, digest) is None
+    assert store.verify(session).is_ok()
+    session.close()
+
+
+def test_failed_commit_restores_trashed_file(store, tmp_path, monkeypatch):
+    session = Session()
+    digest, documents = attach(session, store, scan(tmp_path, 'a.pdf', 'содержимое'.encode()))
+    path = store.path_for(digest)
+
+    def fail():
+        raise RuntimeError("commit failed")
+
+    monkeypatch.setattr(session, 'commit', fail)
+    with pytest.raises(RuntimeError):
+        store.delete(session, documents)
+    monkeypatch.undo()
+
+    # Откат вернул и строку документа, и файл из корзины
+    assert os.path.exists(path)
+    assert session.query(Document).count() == 1
+    assert ref_count(session, digest) == 1
+    assert store.verify(session).is_ok()
+    session.close()
@@ -0,0 +1,40 @@
+import csv
+
+import pytest
+
+from engine import Engine, main
+
+
+# Строки отчетов за 2024 год по клиенту "Первый": выплаты 100 (январь) и 200 (декабрь),
+# заказ 2025 года и заказы клиента "Второй" в отчет не попадают
+FIRST_CLIENT_ROWS = {
+    'monthly_profit': [(1, 0, 100.0, -100.0), (12, 0, 200.0, -200.0)],
+    'client_profit': [("Первый", 0, 300.0, -300.0)],
+    'carrier_activity': [("Перевозчик", 2, 300.0)],
+}
+
+
+@pytest.mark.parametrize('key', sorted(FIRST_CLIENT_ROWS))
+def test_engine_methods_accept_client_id(report_data, key):
+    session, first_id, _ = report_data
+    engine = Engine()
+    result = getattr(engine, key)(2024, first_id, session=session)
+    assert [tuple(row) for row in result.rows] == FIRST_CLIENT_ROWS[key]
+    assert result.totals[-1] == sum(row[-1] for row in FIRST_CLIENT_ROWS[key])
+
+
+def test_carrier_activity_engine_filters_by_client(report_data):
+    session, first_id, _ = report_data
+    engine = Engine()
+    assert engine.carrier_activity(2024, session=session).rows == [("Перевозчик", 3, 700.0)]
+    assert engine.carrier_activity(2024, first_id, session=session).rows == [("Перевозчик", 2, 300.0)]
+
+
+def test_cli_client_id_filters_carrier_activity(report_data, tmp_path):
+    session, first_id, _ = report_data
+    output = tmp_path / "carriers.csv"
+    main(['report', 'carrier_activity', '--year', '2024', '--client-id', str(first_id),
+          '--format', 'csv', '-o', str(output)])
+    with open(output, encoding='utf-8-sig') as f:
+        rows = list(csv.reader(f, delimiter=';'))
+    assert rows[1][:2] == ["Перевозчик", "2"]
@@ -0,0 +1,67 @@
+import logging
+import threading
+
+from utils import events
+from utils.events import EventBus
+
+
+def test_publish_from_worker_thread_is_dispatched_in_gui_thread(app):
+    app.processEvents()
+    bus = EventBus()
+    calls = []
+    bus.subscribe('topic', lambda payload: calls.append((threading.get_ident(), payload)))
+
+    worker = threading.Thread(target=lambda: bus.publish('topic', value=1))
+    worker.start()
+    worker.join()
+    # Подписчик вызывается только из очереди событий потока интерфейса
+    assert calls == []
+    app.processEvents()
+    assert calls == [(threading.get_ident(), {'value': 1})]
+
+
+def test_dispatch_is_not_reentrant_and_survives_failing_subscriber(app, caplog):
+    app.processEvents()
+    bus = EventBus()
+    calls = []
+
+    def failing(payload):
+        raise RuntimeError("сбой")
+
+    def nested(payload):
+        calls.append(payload['n'])
+        if payload['n'] == 1:
+            bus.publish('topic', n=2)
+            # Вложенная публикация не вызывает подписчика сразу
+            assert calls == [1]
+
+    bus.subscribe('topic', failing)
+    bus.subscribe('topic', nested)
+    with caplog.at_level(logging.ERROR, logger=events.__name__):
+        bus.publish('topic', n=1)
+        app.processEvents()
+        app.processEvents()
+    assert calls == [1, 2]
+    assert len([record for record in caplog.records if record.name == events.__name__]) == 2
+
+    bus.unsubscribe('topic', nested)
+    bus.publish('topic', n=3)
+    app.processEvents()
+    assert calls == [1, 2]
+
+
+def test_bus_created_in_worker_thread_belongs_to_gui_thread(app, monkeypatch):
+    monkeypatch.setattr(events, '_bus', None)
+    created = []
+    worker = threading.Thread(target=lambda: created.append(events.event_bus()))
+    worker.start()
+    worker.join()
+
+    bus = created[0]
+    assert bus is events.event_bus()
+    assert bus.thread() is app.thread()
+    calls = []
+    bus.subscribe('topic', lambda payload: calls.append(threading.get_ident()))
+    bus.publish('topic')
+    app.processEvents()
+    assert calls == [threading.get_ident()]
@@ -0,0 +1,66 @@
+from PyQt6.QtWidgets import QMessageBox
+
+from database import Session
+from database.models import Client, Carrier, Document, Payment
+from utils import document_store
+from utils.query_runner import QueryRunner
+
+
+def test_forms_return_connections_to_pool(app, file_db, widgets, no_gc, tmp_path, monkeypatch):
+    from gui.carrier_form import CarrierForm
+    from gui.document_form import DocumentForm
+    from gui.order_form import OrderForm
+
+    monkeypatch.setattr(QMessageBox, 'question', lambda *args: QMessageBox.StandardButton.Yes)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(document_store, 'load_config',
+                        lambda: {'documents': {'store': str(tmp_path / 'store')}})
+    session = Session()
+    session.add_all([Client(name="Клиент"), Carrier(company_name="Перевозчик")])
+    session.commit()
+    session.close()
+
+    form = OrderForm()
+    widgets.append(form)
+    form.loading_address.setText("Москва")
+    form.unloading_address.setText("Тверь")
+    form.save_order()
+    order_id = form.current_order_id
+    form.payment_amount.setText("100")
+    form.add_payment()
+    source = tmp_path / 'scan.txt'
+    source.write_text("скан")
+    form.document_name.setText("Скан")
+    form.document_path.setText(str(source))
+    form.add_document()
+    assert not form.add_document_button.isEnabled()
+    QueryRunner.pool().waitForDone()
+    app.processEvents()
+    assert form.add_document_button.isEnabled()
+    assert form.document_path.text() == ""
+    form.load_payments()
+    form.load_documents()
+
+    carriers = CarrierForm()
+    widgets.append(carriers)
+    carriers.company_input.setText("Новый перевозчик")
+    carriers.save_carrier()
+    carriers.current_id = 1
+    carriers.delete_carrier()
+
+    documents = DocumentForm()
+    widgets.append(documents)
+    documents.load_orders()
+    app.processEvents()
+
+    session = Session()
+    assert session.query(Payment).filter_by(order_id=order_id).count() == 1
+    document = session.query(Document).filter_by(order_id=order_id).one()
+    assert (tmp_path / 'store').is_dir()
+    assert document_store.DocumentStore().locate(document).startswith(str(tmp_path))
+    assert [name for name, in session.query(Carrier.company_name)] == ["Новый перевозчик"]
+    session.close()
+
+    form.delete_order()
+    assert form.current_order_id is None
+    assert file_db.pool.checkedout() == 0
@@ -0,0 +1,130 @@
+import pytest
+from sqlalchemy import event
+
+from database import Session
+from database.models import Client, Carrier, Vehicle, Order, Payment
+from utils.importer import BulkImporter
+
+CLIENTS = [
+    "name;contact_person;phone;is_active",
+    "Первый;Иванов;+7 900 000-00-01;да",
+    "Второй;Петров;;нет",
+]
+
+ORDERS = [
+    "external_ref;client;carrier;vehicle;loading_address;unloading_address;weight;order_date",
+    "EXT-1; первый ;ООО Вектор;а001аа77;Москва;Тверь;1,5;15.01.2024",
+    "EXT-2;ВТОРОЙ;;;Москва;Казань;2;2024-01-16",
+    "EXT-1;Первый;;;Москва;Тверь;1;2024-01-17",
+    "EXT-3;Третий;;;Москва;Пермь;1;2024-01-18",
+]
+
+
+def write_csv(tmp_path, name, lines, delimiter=';'):
+    path = tmp_path / name
+    path.write_text('\n'.join(line.replace(';', delimiter) for line in lines) + '\n',
+                    encoding='utf-8-sig')
+    return str(path)
+
+
+@pytest.fixture
+def directory(db):
+    session = Session()
+    carrier = Carrier(company_name="ООО Вектор")
+    session.add(carrier)
+    session.flush()
+    session.add(Vehicle(carrier_id=carrier.id, plate_number="А001АА77", model="Газель"))
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.mark.parametrize('delimiter', [';', ','])
+def test_clients_with_either_delimiter(db, tmp_path, delimiter):
+    path = write_csv(tmp_path, 'clients.csv', CLIENTS, delimiter)
+    report = BulkImporter('clients').run(path)
+
+    assert (report.total, report.inserted, report.error_count) == (2, 2, 0)
+    session = Session()
+    rows = session.query(Client.name, Client.phone, Client.is_active).order_by(Client.name).all()
+    assert rows == [("Второй", None, False), ("Первый", "+7 900 000-00-01", True)]
+    session.close()
+
+
+def test_existing_keys_are_skipped(db, tmp_path):
+    path = write_csv(tmp_path, 'clients.csv', CLIENTS)
+    BulkImporter('clients').run(path)
+    report = BulkImporter('clients').run(path)
+
+    assert (report.inserted, report.duplicates) == (0, 2)
+    session = Session()
+    assert session.query(Client).count() == 2
+    session.close()
+
+
+def test_orders_resolve_natural_keys(directory, tmp_path):
+    BulkImporter('clients').run(write_csv(tmp_path, 'clients.csv', CLIENTS))
+    report = BulkImporter('orders').run(write_csv(tmp_path, 'orders.csv', ORDERS))
+
+    # EXT-1 повторяется в файле, клиента "Третий" нет в справочнике
+    assert (report.total, report.inserted, report.duplicates, report.error_count) == (4, 2, 1, 1)
+    assert report.errors == [(5, "не найдено: client = Третий")]
+
+    session = directory
+    orders = {order.external_ref: order for order in session.query(Order)}
+    assert sorted(orders) == ['EXT-1', 'EXT-2']
+    first = orders['EXT-1']
+    assert first.client.name == "Первый"
+    assert first.carrier.company_name == "ООО Вектор"
+    assert first.vehicle.plate_number == "А001АА77"
+    assert first.weight == 1.5
+    assert first.status == "Создан"
+    assert orders['EXT-2'].client.name == "Второй"
+    assert orders['EXT-2'].carrier_id is None
+
+
+def test_payments_reference_orders_by_key_or_id(directory, tmp_path):
+    BulkImporter('clients').run(write_csv(tmp_path, 'clients.csv', CLIENTS))
+    BulkImporter('orders').run(write_csv(tmp_path, 'orders.csv', ORDERS[:3]))
+    order_id = directory.query(Order.id).filter(Order.external_ref == 'EXT-2').scalar()
+
+    report = BulkImporter('payments').run(write_csv(tmp_path, 'payments.csv', [
+        "order;amount;is_client_payment;payment_date",
+        "ext-1;1 000,50;от клиента;01.02.2024",
+        f"{order_id};300;перевозчику;2024-02-02",
+        "EXT-9;100;да;2024-02-03",
+    ]))
+
+    assert (report.inserted, report.error_count) == (2, 1)
+    assert report.errors == [(4, "не найдено: order = EXT-9")]
+    payments = directory.query(Order.external_ref, Payment.amount, Payment.is_client_payment).join(
+        Order, Order.id == Payment.order_id
+    ).order_by(Payment.id).all()
+    assert payments == [('EXT-1', 1000.5, True), ('EXT-2', 300.0, False)]
+
+
+def test_chunked_executemany(db, tmp_path):
+    lines = ["name"] + [f"Клиент {n}" for n in range(5)]
+    path = write_csv(tmp_path, 'clients.csv', lines)
+    batches = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('INSERT INTO clients'):
+            batches.append(len(parameters) if executemany else 1)
+
+    event.listen(db, 'before_cursor_execute', before_cursor_execute)
+    try:
+        report = BulkImporter('clients', chunk_size=2).run(path)
+    finally:
+        event.remove(db, 'before_cursor_execute', before_cursor_execute)
+
+    assert report.inserted == 5
+    assert batches == [2, 2, 1]
+
+
+def test_dry_run_writes_nothing(directory, tmp_path):
+    report = BulkImporter('clients').run(write_csv(tmp_path, 'clients.csv', CLIENTS), dry_run=True)
+
+    assert report.inserted == 2
+    assert "будет добавлено 2" in report.summary()
+    assert directory.query(Client).count() == 0
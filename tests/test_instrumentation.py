@@ -0,0 +1,83 @@
+import logging
+import sys
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from database import instrumentation
+from database.instrumentation import QueryStats, caller_label, instrument, percentile, query_stats
+from utils import config
+
+
+@pytest.fixture
+def slow_logger():
+    """Журнал медленных запросов без обработчика, созданного движком тестов"""
+    slow = logging.getLogger(instrumentation.__name__ + '.slow')
+    saved = slow.handlers[:]
+    slow.handlers.clear()
+    yield slow
+    for handler in slow.handlers:
+        handler.close()
+    slow.handlers[:] = saved
+
+
+def test_percentile_nearest_rank():
+    values = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert percentile(values, 0.5) == 5
+    assert percentile(values, 0.95) == 10
+    assert percentile([7], 0.5) == 7
+    assert percentile([], 0.5) is None
+
+
+def test_query_stats_by_method():
+    stats = QueryStats()
+    for duration in (0.1, 0.2, 0.3):
+        stats.record('fast', duration / 10, 2)
+    stats.record('slow', 1.0, -1)
+
+    slow, fast = stats.snapshot()
+    assert (slow['method'], slow['count'], slow['rows']) == ('slow', 1, 0)
+    assert (fast['method'], fast['count'], fast['rows']) == ('fast', 3, 6)
+    assert fast['max'] == pytest.approx(0.03)
+    assert fast['total'] == pytest.approx(0.06)
+    stats.reset()
+    assert stats.snapshot() == []
+
+
+class Form:
+    def load_rows(self):
+        # Лямбда выполняется как в фоновом потоке, вне load_rows
+        return lambda: self.helper()
+
+    def helper(self):
+        return caller_label(sys._getframe())
+
+
+def test_caller_label_prefers_load_methods():
+    assert Form().helper() == 'Form.helper'
+    assert Form().load_rows()() == 'Form.load_rows'
+
+
+def test_slow_queries_logged_next_to_application(slow_logger, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'APP_DIR', tmp_path / 'app')
+    (tmp_path / 'app').mkdir()
+    (tmp_path / 'cwd').mkdir()
+    monkeypatch.chdir(tmp_path / 'cwd')
+    query_stats().reset()
+
+    engine = create_engine('sqlite://')
+    instrument(engine, slow_query_ms=0, log='slow.log')
+    with engine.connect() as connection:
+        connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+        connection.execute(text("SELECT name FROM items WHERE id = 1")).fetchall()
+    engine.dispose()
+    for handler in slow_logger.handlers:
+        handler.flush()
+
+    log = (tmp_path / 'app' / 'slow.log').read_text(encoding='utf-8')
+    assert "SELECT name FROM items WHERE id = 1" in log
+    assert "SEARCH items USING INTEGER PRIMARY KEY" in log
+    assert list((tmp_path / 'cwd').iterdir()) == []
+    (stats,) = query_stats().snapshot()
+    assert stats['method'] == f"{__name__}.test_slow_queries_logged_next_to_application"
+    assert stats['count'] == 2
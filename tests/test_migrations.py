@@ -0,0 +1,106 @@
+import sqlite3
+
+from sqlalchemy import create_engine, text
+
+from database import aggregates
+from database.migrations import LATEST_VERSION, migrate
+
+# Схема первой версии приложения, до появления schema_migrations
+BASELINE_SCHEMA = """
+CREATE TABLE clients (
+    id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, contact_person VARCHAR(100),
+    phone VARCHAR(20), email VARCHAR(100), address VARCHAR(200), is_active BOOLEAN,
+    PRIMARY KEY (id)
+);
+CREATE TABLE carriers (
+    id INTEGER NOT NULL, company_name VARCHAR(100) NOT NULL, contact_person VARCHAR(100),
+    phone VARCHAR(20), email VARCHAR(100), is_active BOOLEAN,
+    PRIMARY KEY (id)
+);
+CREATE TABLE notifications (
+    id INTEGER NOT NULL, user_id INTEGER, message VARCHAR(255) NOT NULL, is_read BOOLEAN,
+    created_at DATETIME, related_id INTEGER, notification_type VARCHAR(50),
+    PRIMARY KEY (id)
+);
+CREATE TABLE vehicles (
+    id INTEGER NOT NULL, plate_number VARCHAR(20) NOT NULL, model VARCHAR(50),
+    capacity FLOAT, carrier_id INTEGER,
+    PRIMARY KEY (id), FOREIGN KEY(carrier_id) REFERENCES carriers (id)
+);
+CREATE TABLE drivers (
+    id INTEGER NOT NULL, full_name VARCHAR(100) NOT NULL, license_number VARCHAR(50),
+    phone VARCHAR(20), vehicle_id INTEGER,
+    PRIMARY KEY (id), FOREIGN KEY(vehicle_id) REFERENCES vehicles (id)
+);
+CREATE TABLE orders (
+    id INTEGER NOT NULL, client_id INTEGER, carrier_id INTEGER, vehicle_id INTEGER,
+    loading_address VARCHAR(200) NOT NULL, unloading_address VARCHAR(200) NOT NULL,
+    cargo_name VARCHAR(100), packaging VARCHAR(50), weight FLOAT, loading_type VARCHAR(50),
+    order_date DATE, loading_date DATE, status VARCHAR(20),
+    PRIMARY KEY (id),
+    FOREIGN KEY(client_id) REFERENCES clients (id),
+    FOREIGN KEY(carrier_id) REFERENCES carriers (id),
+    FOREIGN KEY(vehicle_id) REFERENCES vehicles (id)
+);
+CREATE TABLE payments (
+    id INTEGER NOT NULL, order_id INTEGER, amount FLOAT NOT NULL, payment_date DATE,
+    is_client_payment BOOLEAN, description VARCHAR,
+    PRIMARY KEY (id), FOREIGN KEY(order_id) REFERENCES orders (id)
+);
+CREATE TABLE documents (
+    id INTEGER NOT NULL, order_id INTEGER, name VARCHAR(100), file_path VARCHAR(200),
+    description TEXT,
+    PRIMARY KEY (id), FOREIGN KEY(order_id) REFERENCES orders (id)
+);
+"""
+
+
+def baseline_database(path):
+    connection = sqlite3.connect(path)
+    connection.executescript(BASELINE_SCHEMA)
+    connection.executemany("INSERT INTO clients (id, name, is_active) VALUES (?, ?, 1)",
+                           [(1, "Первый"), (2, "Второй")])
+    connection.execute("INSERT INTO carriers (id, company_name, is_active) VALUES (1, 'Перевозчик', 1)")
+    connection.executemany(
+        "INSERT INTO orders (id, client_id, carrier_id, loading_address, unloading_address, "
+        "order_date, status) VALUES (?, ?, ?, 'А', 'Б', '2024-01-10', 'new')",
+        [(1, 1, 1), (2, 2, 1), (3, 1, None), (4, 2, 1)]
+    )
+    connection.executemany(
+        "INSERT INTO payments (order_id, amount, payment_date, is_client_payment) VALUES (?, ?, ?, ?)",
+        [(1, 1000.0, '2024-01-15', 1), (1, 600.0, '2024-01-20', 0),
+         (2, 250.5, '2024-02-01', 1), (2, 300.0, None, 0),
+         (3, 90.0, '2023-12-31', 1), (None, 40.0, '2024-03-01', 1)]
+    )
+    connection.commit()
+    connection.close()
+
+
+def test_baseline_database_upgrades_with_consistent_balances(tmp_path):
+    path = tmp_path / 'baseline.db'
+    baseline_database(str(path))
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        assert migrate(engine) == LATEST_VERSION
+
+        with engine.connect() as connection:
+            assert aggregates.verify_order_balances(connection) == []
+            balances = connection.execute(text(
+                "SELECT id, income_total, expense_total, profit FROM orders ORDER BY id"
+            )).fetchall()
+            assert [tuple(row) for row in balances] == [
+                (1, 1000.0, 600.0, 400.0),
+                (2, 250.5, 300.0, -49.5),
+                (3, 90.0, 0.0, 90.0),
+                (4, 0.0, 0.0, 0.0),
+            ]
+            clients = connection.execute(text(
+                "SELECT client_id, SUM(amount), SUM(payment_count) FROM ledger_monthly "
+                "GROUP BY client_id ORDER BY client_id"
+            )).fetchall()
+            assert [tuple(row) for row in clients] == [(0, 40.0, 1), (1, 1690.0, 3), (2, 550.5, 2)]
+
+        # Повторный запуск ничего не меняет
+        assert migrate(engine) == LATEST_VERSION
+    finally:
+        engine.dispose()
@@ -0,0 +1,86 @@
+from datetime import datetime
+
+from database import Session
+from database.models import Notification
+from utils import notifications
+from utils.notifications import NotificationManager, dedupe_key
+
+
+def test_dedupe_key_upsert_keeps_one_row(db):
+    manager = NotificationManager()
+    key = dedupe_key("payment_overdue", 1, "2024-01-01")
+
+    first = manager.create_notification("Первый текст", "payment_overdue", 1, dedupe_key=key)
+    assert first is not None and first.message == "Первый текст"
+
+    session = Session()
+    created_at = datetime(2024, 1, 1, 12, 0)
+    session.query(Notification).filter(Notification.id == first.id).update(
+        {Notification.is_read: True, Notification.created_at: created_at}
+    )
+    session.commit()
+    session.close()
+
+    second = manager.create_notification("Новый текст", "payment_overdue", 1, dedupe_key=key)
+    assert second.id == first.id
+    assert second.message == "Новый текст"
+
+    session = Session()
+    rows = session.query(Notification).filter(Notification.dedupe_key == key).all()
+    assert len(rows) == 1
+    assert rows[0].message == "Новый текст"
+    assert rows[0].is_read is True
+    assert rows[0].created_at == created_at
+    session.close()
+
+
+def test_batch_upsert_deduplicates(db):
+    manager = NotificationManager()
+    items = [
+        {'message': f"Заказ {n}", 'notification_type': "order_upcoming", 'related_id': n,
+         'dedupe_key': dedupe_key("order_upcoming", n, "2024-01-02")}
+        for n in range(5)
+    ]
+    manager.create_notifications(items, batch_size=2)
+    manager.create_notifications(items, batch_size=2)
+
+    session = Session()
+    assert session.query(Notification).count() == 5
+    session.close()
+
+
+def test_manager_returns_connections_to_pool(file_db, no_gc):
+    manager = NotificationManager()
+    notification = manager.create_notification("Текст", "order", 1)
+    for _ in range(20):
+        manager.get_unread_notifications()
+        manager.get_unread_count()
+    manager.mark_as_read(notification.id)
+    manager.clear_all()
+    assert file_db.pool.checkedout() == 0
+
+
+def test_upsert_without_on_conflict(db, monkeypatch):
+    monkeypatch.setattr(notifications, '_UPSERT_INSERTS', {})
+    manager = NotificationManager()
+    key = dedupe_key("payment_overdue", 1, "2024-01-01")
+    first = manager.create_notification("Первый текст", "payment_overdue", 1, dedupe_key=key)
+    manager.mark_as_read(first.id)
+
+    items = [
+        {'message': "Новый текст", 'notification_type': "payment_overdue", 'related_id': 1,
+         'dedupe_key': key},
+        {'message': "Без ключа", 'notification_type': "order"},
+        {'message': "Заказ 2", 'notification_type': "order_upcoming", 'related_id': 2,
+         'dedupe_key': dedupe_key("order_upcoming", 2, "2024-01-02")},
+        {'message': "Заказ 2, повтор", 'notification_type': "order_upcoming", 'related_id': 2,
+         'dedupe_key': dedupe_key("order_upcoming", 2, "2024-01-02")},
+    ]
+    assert manager.create_notifications(items) == 4
+
+    session = Session()
+    rows = {row.message: row for row in session.query(Notification)}
+    assert sorted(rows) == ["Без ключа", "Заказ 2, повтор", "Новый текст"]
+    assert rows["Новый текст"].id == first.id
+    assert rows["Новый текст"].is_read is True
+    session.close()
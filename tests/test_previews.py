@@ -0,0 +1,110 @@
+import logging
+import os
+import sys
+
+import pytest
+from PyQt6.QtGui import QImage, QColor
+
+from utils import previews
+from utils.previews import PreviewCache, PREVIEW, THUMBNAIL
+
+
+def image(color):
+    result = QImage(64, 64, QImage.Format.Format_RGB32)
+    result.fill(QColor(color))
+    return result
+
+
+def write_entry(root, key, size, mtime):
+    path = os.path.join(root, f"{key}.{PREVIEW}.jpg")
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_cache_evicts_least_recently_used_by_mtime(app, tmp_path):
+    root = str(tmp_path)
+    old = write_entry(root, 'old', 1000, 1000)
+    used = write_entry(root, 'used', 1000, 2000)
+    recent = write_entry(root, 'recent', 1000, 3000)
+
+    cache = PreviewCache(root, max_bytes=3000)
+    assert cache.size() == 3000
+    # Чтение делает файл недавно использованным
+    assert cache.get('used', PREVIEW) == used
+
+    path = cache.put('new', PREVIEW, image('red'))
+    new_size = os.path.getsize(path)
+    assert new_size <= 1000
+
+    # Вытеснен только самый давний файл, лимит соблюден
+    assert not os.path.exists(old)
+    assert os.path.exists(used) and os.path.exists(recent) and os.path.exists(path)
+    assert cache.size() == 2000 + new_size <= cache.max_bytes
+
+    # Следующим вытесняется recent: used был прочитан позже
+    cache.max_bytes = 2000 + new_size
+    cache.put('new', THUMBNAIL, image('blue'))
+    assert not os.path.exists(recent)
+    assert os.path.exists(used)
+    assert cache.size() <= cache.max_bytes
+
+
+def test_cache_order_survives_restart(app, tmp_path):
+    root = str(tmp_path)
+    first = write_entry(root, 'first', 1000, 1000)
+    second = write_entry(root, 'second', 1000, 2000)
+    assert PreviewCache(root, max_bytes=2000).get('first', PREVIEW) == first
+
+    # Новый экземпляр восстанавливает порядок по времени изменения файлов
+    cache = PreviewCache(root, max_bytes=2000)
+    path = cache.put('third', PREVIEW, image('green'))
+    assert os.path.exists(first) and os.path.exists(path)
+    assert not os.path.exists(second)
+    assert cache.get('second', PREVIEW) is None
+
+
+def test_missing_qtpdf_logged_once(monkeypatch, caplog, tmp_path):
+    monkeypatch.setitem(sys.modules, 'PyQt6.QtPdf', None)
+    monkeypatch.setattr(previews, '_qtpdf', [])
+    path = tmp_path / 'doc.pdf'
+    path.write_bytes(b'%PDF-1.4\n')
+
+    with caplog.at_level(logging.WARNING, logger=previews.__name__):
+        for _ in range(2):
+            with pytest.raises(ValueError, match="QtPdf"):
+                previews.render_first_page(str(path), 100)
+    assert len(caplog.records) == 1
+
+
+def test_failed_preview_is_retried_after_file_changes(app, tmp_path):
+    service = previews.PreviewService()
+    service.cache = PreviewCache(str(tmp_path / 'cache'), max_bytes=10 ** 6)
+    failed = []
+    service.failed.connect(lambda key, error: failed.append(key))
+    path = tmp_path / 'scan.png'
+
+    def request():
+        service.request('scan', str(path))
+        service.pool.waitForDone()
+        app.processEvents()
+
+    # Файла еще нет
+    request()
+    assert failed == ['scan'] and service.error('scan')
+
+    # Не изображение: отрисовка не удалась, повторный запрос ее не повторяет
+    path.write_bytes(b'not an image')
+    os.utime(path, (1000, 1000))
+    request()
+    request()
+    assert failed == ['scan', 'scan']
+
+    # Файл заменен: ошибка сброшена, превью построено
+    assert image('red').save(str(path), 'PNG')
+    os.utime(path, (2000, 2000))
+    request()
+    assert failed == ['scan', 'scan']
+    assert service.error('scan') is None
+    assert service.cached('scan', PREVIEW)
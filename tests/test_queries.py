@@ -0,0 +1,78 @@
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from database import queries, search
+from database.models import Document, Order
+
+
+@contextmanager
+def count_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.fixture
+def data(db, report_data):
+    session, first_id, second_id = report_data
+    for order in session.query(Order).order_by(Order.id):
+        session.add_all([
+            Document(order_id=order.id, name=f"Акт {order.id}", file_path=f"act{order.id}.pdf"),
+            Document(order_id=order.id, name=f"Счет {order.id}", file_path=f"bill{order.id}.pdf"),
+        ])
+    session.commit()
+    # Наличие FTS-индексов проверяется один раз, до подсчета запросов
+    search.fts_available(session)
+    return db, session, first_id
+
+
+def _pages(fetch, limit):
+    """Все страницы выборки: [(строки, число запросов)]"""
+    pages = []
+    last_row = None
+    while True:
+        rows, statements = fetch(last_row, limit)
+        pages.append((rows, statements))
+        if len(rows) < limit:
+            return pages
+        last_row = rows[-1]
+
+
+@pytest.mark.parametrize('name, fetch', [
+    ('client_page', lambda s, last, limit: queries.client_page(s, "", "Все", last, limit)),
+    ('client_search', lambda s, last, limit: queries.client_page(s, "Перв", "Все", last, limit)),
+    ('carrier_page', lambda s, last, limit: queries.carrier_page(s, "", last, limit)),
+    ('payment_page', lambda s, last, limit: queries.payment_page(
+        s, None, date(2020, 1, 1), date(2030, 1, 1), last, limit)),
+    ('document_page', lambda s, last, limit: queries.document_page(s, None, None, last, limit)),
+])
+def test_one_statement_per_page(data, name, fetch):
+    engine, session, _ = data
+
+    def counted(last_row, limit):
+        with count_statements(engine) as statements:
+            rows = fetch(session, last_row, limit)
+        return rows, len(statements)
+
+    pages = _pages(counted, 2)
+    assert all(count == 1 for _, count in pages), name
+    rows = [row for page, _ in pages for row in page]
+    assert len({row[0] for row in rows}) == len(rows)
+
+
+def test_payment_total_single_statement(data):
+    engine, session, first_id = data
+    with count_statements(engine) as statements:
+        total = queries.payment_total(session, first_id, date(2024, 1, 1), date(2024, 12, 31))
+    assert len(statements) == 1
+    assert total == -300.0
@@ -0,0 +1,115 @@
+import logging
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from utils import query_runner
+from utils.document_packet import PacketCancelled
+from utils.query_runner import QueryRunner
+
+
+def wait(app):
+    QueryRunner.pool().waitForDone()
+    app.processEvents()
+
+
+def test_cancellation_is_not_logged_as_error(app, db, caplog):
+    runner = QueryRunner()
+    errors = []
+
+    def cancelled(session):
+        raise PacketCancelled()
+
+    with caplog.at_level(logging.DEBUG, logger=query_runner.__name__):
+        runner.submit('packet', cancelled, errors.append, errors.append)
+        wait(app)
+    assert [type(error) for error in errors] == [PacketCancelled]
+    levels = [record.levelno for record in caplog.records if record.name == query_runner.__name__]
+    assert levels == [logging.DEBUG]
+
+
+def block_pool():
+    """Занять все потоки пула: следующие задачи остаются в очереди.
+
+    Возвращает событие, освобождающее потоки, и исполнитель блокирующих задач.
+    """
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def blocker(session):
+        started.release()
+        release.wait(10)
+
+    blockers = QueryRunner()
+    for n in range(query_runner.MAX_QUERY_THREADS):
+        blockers.submit(n, blocker, lambda result: None)
+    for _ in range(query_runner.MAX_QUERY_THREADS):
+        assert started.acquire(timeout=5)
+    return release, blockers
+
+
+def test_queued_job_is_replaced_by_same_key(app, db):
+    runner = QueryRunner()
+    calls, results = [], []
+    release, _blockers = block_pool()
+    try:
+        first = runner.submit('page', lambda session: calls.append(1) or 1, results.append)
+        runner.submit('page', lambda session: calls.append(2) or 2, results.append)
+        assert first.cancelled
+        assert first not in runner._alive
+    finally:
+        release.set()
+    wait(app)
+    # Первая задача снята с очереди и не выполнялась
+    assert calls == [2]
+    assert results == [2]
+    assert not runner.is_running('page')
+
+
+def test_cancel_takes_queued_job_from_pool(app, db):
+    runner = QueryRunner()
+    calls, results = [], []
+    release, _blockers = block_pool()
+    try:
+        runner.submit('page', lambda session: calls.append(1), results.append)
+        runner.cancel('page')
+        assert not runner.is_running('page')
+        assert not runner._alive
+    finally:
+        release.set()
+    wait(app)
+    assert calls == [] and results == []
+
+
+def test_cancel_interrupts_running_sqlite_query(app, file_db):
+    runner = QueryRunner()
+    started = threading.Event()
+    errors, results = [], []
+
+    def slow(session):
+        started.set()
+        try:
+            return session.execute(text(
+                "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+                "SELECT COUNT(*) FROM n"
+            )).scalar()
+        except OperationalError as e:
+            errors.append(e)
+            raise
+
+    task = runner.submit('slow', slow, results.append, results.append)
+    assert started.wait(5)
+    runner.cancel('slow')
+    # interrupt() до начала выполнения запроса ничего не прерывает: повторяем
+    deadline = time.monotonic() + 10
+    while not QueryRunner.pool().waitForDone(50):
+        assert time.monotonic() < deadline
+        task.cancel()
+    app.processEvents()
+
+    assert errors and 'interrupt' in str(errors[0])
+    # Результат и ошибка отмененного запроса не доставляются
+    assert results == []
+    assert file_db.pool.checkedout() == 0
@@ -0,0 +1,32 @@
+from database import Session
+from database.models import Client, Carrier
+from utils.events import event_bus, CLIENT_CHANGED, CARRIER_CHANGED
+from utils.reference_cache import ReferenceCache, CLIENTS, CARRIERS, VEHICLES
+
+
+def test_client_changed_invalidates_clients(app, db):
+    # События предыдущих тестов доставляются до подписки
+    app.processEvents()
+    cache = ReferenceCache()
+    changed = []
+    cache.changed.connect(changed.append)
+    assert cache.clients() == []
+    assert cache.carriers() == []
+
+    session = Session()
+    session.add_all([Client(name="Новый клиент"), Carrier(company_name="Новый перевозчик")])
+    session.commit()
+    session.close()
+    # До события данные берутся из памяти
+    assert cache.clients() == []
+
+    event_bus().publish(CLIENT_CHANGED, client_id=1)
+    app.processEvents()
+    assert changed == [CLIENTS]
+    assert cache.clients() == [(1, "Новый клиент")]
+    assert cache.carriers() == []
+
+    event_bus().publish(CARRIER_CHANGED, carrier_id=1)
+    app.processEvents()
+    assert changed == [CLIENTS, CARRIERS, VEHICLES]
+    assert cache.carriers() == [(1, "Новый перевозчик")]
@@ -0,0 +1,69 @@
+from datetime import date
+
+import pytest
+
+from database import reports
+from database.models import Payment
+from utils.export import Totals
+
+
+def test_carrier_activity_year_range(report_data):
+    session, _, _ = report_data
+    assert reports.carrier_activity(session, 2024) == [("Перевозчик", 3, 700.0)]
+
+
+def test_carrier_activity_client_filter(report_data):
+    session, first_id, second_id = report_data
+    assert reports.carrier_activity(session, 2024, first_id) == [("Перевозчик", 2, 300.0)]
+    assert reports.carrier_activity(session, 2024, second_id) == [("Перевозчик", 1, 400.0)]
+
+
+# Строки отчетов за 2024 год по каждому клиенту (см. фикстуру report_data)
+CLIENT_ROWS = {
+    'monthly_profit': (
+        [(1, 0, 100.0, -100.0), (12, 0, 200.0, -200.0)],
+        [(6, 0, 400.0, -400.0)],
+    ),
+    'client_profit': (
+        [("Первый", 0, 300.0, -300.0)],
+        [("Второй", 0, 400.0, -400.0)],
+    ),
+    'carrier_activity': (
+        [("Перевозчик", 2, 300.0)],
+        [("Перевозчик", 1, 400.0)],
+    ),
+    'payment_register': (
+        [(date(2024, 1, 1), 1, "Первый", "Перевозчик", "Перевозчику", None, 100.0),
+         (date(2024, 12, 31), 2, "Первый", "Перевозчик", "Перевозчику", None, 200.0)],
+        [(date(2024, 6, 15), 3, "Второй", "Перевозчик", "Перевозчику", None, 400.0)],
+    ),
+}
+
+
+def test_every_report_has_client_rows():
+    assert set(CLIENT_ROWS) == set(reports.REPORTS)
+
+
+@pytest.mark.parametrize('key', sorted(CLIENT_ROWS))
+def test_every_report_applies_client_filter(report_data, key):
+    session, first_id, second_id = report_data
+    query = reports.REPORTS[key].query
+    first_rows, second_rows = CLIENT_ROWS[key]
+    assert [tuple(row) for row in query(session, 2024, first_id)] == first_rows
+    assert [tuple(row) for row in query(session, 2024, second_id)] == second_rows
+    # Без фильтра - оба клиента, сумма последней колонки складывается
+    assert sum(row[-1] for row in query(session, 2024)) == sum(
+        row[-1] for row in first_rows + second_rows
+    )
+
+
+def test_payment_register_totals_directions_separately(report_data):
+    session, first_id, _ = report_data
+    session.add(Payment(order_id=1, amount=1000.0, is_client_payment=True,
+                        payment_date=date(2024, 2, 1)))
+    session.commit()
+
+    totals = Totals(reports.REPORTS['payment_register'].columns)
+    for row in reports.payment_register_query(session, 2024, first_id):
+        totals.add(row)
+    assert totals.row()[-2:] == [1000.0, 300.0]
@@ -0,0 +1,141 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from utils.scheduler import CronSchedule, Scheduler
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class MemoryState:
+    def __init__(self, last_runs):
+        self.last_runs = dict(last_runs)
+
+    def load(self):
+        return dict(self.last_runs)
+
+    def save(self, name, started):
+        self.last_runs[name] = started
+
+
+def test_cron_next_after_step_and_strictly_after():
+    schedule = CronSchedule("*/15 * * * *")
+    assert schedule.next_after(datetime(2024, 5, 1, 10, 7, 30)) == datetime(2024, 5, 1, 10, 15)
+    assert schedule.next_after(datetime(2024, 5, 1, 10, 15)) == datetime(2024, 5, 1, 10, 30)
+    assert schedule.next_after(datetime(2024, 5, 1, 23, 50)) == datetime(2024, 5, 2, 0, 0)
+
+
+def test_cron_next_after_month_and_weekday():
+    assert CronSchedule("0 0 1 * *").next_after(datetime(2024, 1, 31, 12, 0)) == datetime(2024, 2, 1)
+    # 2024-05-01 - среда, ближайший понедельник - 6 мая
+    assert CronSchedule("0 9 * * 1").next_after(datetime(2024, 5, 1, 9, 0)) == datetime(2024, 5, 6, 9, 0)
+    # Воскресенье задается и 0, и 7
+    assert CronSchedule("0 9 * * 7").next_after(datetime(2024, 5, 1)) == datetime(2024, 5, 5, 9, 0)
+
+
+def test_cron_day_of_month_or_weekday():
+    # Ограничены оба поля: подходит 10-е число или пятница (3 мая)
+    schedule = CronSchedule("0 8 10 * 5")
+    assert schedule.next_after(datetime(2024, 5, 1)) == datetime(2024, 5, 3, 8, 0)
+    assert schedule.next_after(datetime(2024, 5, 8)) == datetime(2024, 5, 10, 8, 0)
+
+
+def test_cron_step_from_star_uses_and_with_weekday():
+    # */2 в поле дня начинается с '*': нужны и нечетный день, и понедельник
+    schedule = CronSchedule("0 9 */2 * 1")
+    assert schedule.next_after(datetime(2024, 1, 1, 10, 0)) == datetime(2024, 1, 15, 9, 0)
+    schedule = CronSchedule("0 9 1 * */2")
+    assert schedule.next_after(datetime(2024, 1, 2)) == datetime(2024, 2, 1, 9, 0)
+
+
+def test_cron_rejects_invalid_expression():
+    for expression in ("* * * *", "60 * * * *", "*/0 * * * *"):
+        try:
+            CronSchedule(expression)
+        except ValueError:
+            continue
+        raise AssertionError(f"Ожидалась ошибка для {expression}")
+
+
+def test_missed_runs_caught_up_once():
+    calls = []
+    # Приложение было закрыто три интервала подряд
+    state = MemoryState({'hourly': datetime.now() - timedelta(hours=3)})
+    scheduler = Scheduler(state=state)
+    job = scheduler.add_job('hourly', lambda cancel_event: calls.append(datetime.now()), interval=3600)
+    scheduler.start()
+    try:
+        assert wait_for(lambda: job.runs == 1)
+        time.sleep(0.2)
+        assert len(calls) == 1
+        assert job.next_run > datetime.now() + timedelta(minutes=59)
+        assert state.last_runs['hourly'] > datetime.now() - timedelta(minutes=1)
+    finally:
+        scheduler.stop()
+
+
+def test_overlapping_run_is_skipped():
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow(cancel_event):
+        started.set()
+        release.wait(5)
+
+    scheduler = Scheduler()
+    job = scheduler.add_job('slow', slow, interval=3600)
+    scheduler.start()
+    try:
+        assert started.wait(5)
+        scheduler.run_now('slow')
+        assert wait_for(lambda: job.skipped == 1)
+        assert job.runs == 0
+    finally:
+        release.set()
+        scheduler.stop()
+    assert job.runs == 1
+    assert job.metrics()['skipped'] == 1
+
+
+def test_timeout_sets_cancel_event_and_counts():
+    received = []
+
+    def long_job(cancel_event):
+        received.append(cancel_event.wait(5))
+
+    scheduler = Scheduler()
+    job = scheduler.add_job('long', long_job, interval=3600, timeout=0.1)
+    scheduler.start()
+    try:
+        assert wait_for(lambda: job.runs == 1)
+    finally:
+        scheduler.stop()
+    metrics = job.metrics()
+    assert received == [True]
+    assert metrics['timeouts'] == 1
+    assert metrics['runs'] == 1
+    assert metrics['failures'] == 0
+    assert metrics['last_duration'] < 5
+
+
+def test_stop_waits_for_running_job():
+    finished = threading.Event()
+
+    def job_fn(cancel_event):
+        cancel_event.wait(5)
+        time.sleep(0.1)
+        finished.set()
+
+    scheduler = Scheduler()
+    job = scheduler.add_job('job', job_fn, interval=3600)
+    scheduler.start()
+    assert wait_for(job.is_running)
+    scheduler.stop(timeout=5)
+    assert finished.is_set()
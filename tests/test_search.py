@@ -0,0 +1,42 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session as OrmSession
+
+from database import Session, search
+from database.migrations import LATEST_VERSION, migrate
+from database.models import Base
+
+
+def test_fts_availability_is_cached_per_engine(db):
+    session = Session()
+    assert search.fts_available(session) is True
+    session.close()
+
+    # БД без FTS5-индексов (например, открытая без миграций) проверяется отдельно
+    plain = create_engine('sqlite://')
+    Base.metadata.create_all(plain)
+    with OrmSession(plain) as other:
+        assert search.fts_available(other) is False
+        assert search.use_fts(other, "Первый") is False
+
+    session = Session()
+    assert search.fts_available(session) is True
+    session.close()
+
+
+def test_missing_search_indexes_are_installed_on_migrate(db):
+    # Миграция 5 записана, но индексы не создались (SQLite без FTS5 на тот момент)
+    with db.begin() as connection:
+        for index, _ in search.FTS_INDEXES.values():
+            for action in ('insert', 'delete', 'update'):
+                connection.exec_driver_sql(f"DROP TRIGGER trg_{index}_{action}")
+            connection.exec_driver_sql(f"DROP TABLE {index}")
+        connection.exec_driver_sql("INSERT INTO clients (name, is_active) VALUES ('Первый клиент', 1)")
+    session = Session()
+    assert search.fts_available(session) is False
+    session.close()
+
+    assert migrate(db) == LATEST_VERSION
+    session = Session()
+    assert search.fts_available(session) is True
+    assert search.search_clients(session, "вый кли") == [(1, "Первый клиент")]
+    session.close()
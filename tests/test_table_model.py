@@ -0,0 +1,53 @@
+import time
+
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtWidgets import QWidget
+
+from gui.table_model import debounced, StaleReloadMixin
+
+
+class Source(QObject):
+    changed = pyqtSignal(str)
+
+
+def test_debounced_calls_slot_once_after_pause(app):
+    source = Source()
+    calls = []
+    timer = debounced(source, source.changed, lambda: calls.append(1), delay_ms=50)
+
+    for text in ("П", "Пе", "Пер"):
+        source.changed.emit(text)
+        app.processEvents()
+    assert timer.isActive() and calls == []
+
+    deadline = time.monotonic() + 2
+    while not calls and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    assert calls == [1]
+
+
+class ListWidget(StaleReloadMixin, QWidget):
+    def __init__(self):
+        super().__init__()
+        self.reloads = 0
+
+    def reload(self):
+        self.reloads += 1
+
+
+def test_hidden_widget_reloads_once_when_shown(app):
+    widget = ListWidget()
+    widget.refresh()
+    widget.refresh()
+    assert widget.reloads == 0
+
+    widget.show()
+    assert widget.reloads == 1
+    widget.refresh()
+    assert widget.reloads == 2
+
+    widget.hide()
+    widget.show()
+    assert widget.reloads == 2
+    widget.close()
@@ -1,68 +1,226 @@
-import threading
-import time
-from datetime import datetime, timedelta
-from database import init_db
-from sqlalchemy.orm import sessionmaker
-from database.models import Order, Payment
-from utils.notifications import NotificationManager
+import json
+from datetime import date, datetime, timedelta
+from sqlalchemy import func
+from database import init_db, Session, ScopedSession
+from database.changes import change_counters
+from database.models import Order, Payment, Notification, JobState
+from utils.notifications import NotificationManager, NOTIFICATION_BATCH_SIZE, dedupe_key
+from utils.scheduler import Scheduler
+
+# Интервал проверок просроченных платежей и ближайших погрузок, с
+CHECK_INTERVAL = 3600
+CHECK_JITTER = 60
+CHECK_TIMEOUT = 600
+
+# Префикс строк job_state со временем последнего запуска задачи планировщика
+SCHEDULER_STATE_PREFIX = 'scheduler:'
+
+
+def _cancelled(cancel_event):
+    return cancel_event is not None and cancel_event.is_set()
+
+
+class JobStateStore:
+    """Время последних запусков задач планировщика в таблице job_state"""
+
+    def load(self):
+        session = Session()
+        try:
+            rows = session.query(JobState.name, JobState.value).filter(
+                JobState.name.startswith(SCHEDULER_STATE_PREFIX)
+            ).all()
+        finally:
+            session.close()
+        return {
+            name[len(SCHEDULER_STATE_PREFIX):]: datetime.fromisoformat(json.loads(value))
+            for name, value in rows
+        }
+
+    def save(self, name, started):
+        # Отдельная строка на задачу: задачи завершаются в разных потоках
+        session = Session()
+        try:
+            session.merge(JobState(
+                name=SCHEDULER_STATE_PREFIX + name,
+                value=json.dumps(started.isoformat())
+            ))
+            session.commit()
+        finally:
+            session.close()
+
 
 class BackgroundTaskManager:
-    def __init__(self):
+    def __init__(self, start=True):
+        # start=False - без запуска планировщика (проверки вызываются напрямую)
         self.engine = init_db()
-        self.Session = sessionmaker(bind=self.engine)
-        self.running = True
-        self.thread = threading.Thread(target=self.run)
-        self.thread.daemon = True
-        self.thread.start()
+        self.Session = ScopedSession
+        self.scheduler = Scheduler(state=JobStateStore())
+        self.add_job('payment_overdue', self.check_overdue_payments,
+                     interval=CHECK_INTERVAL, jitter=CHECK_JITTER, timeout=CHECK_TIMEOUT)
+        self.add_job('order_upcoming', self.check_upcoming_orders,
+                     interval=CHECK_INTERVAL, jitter=CHECK_JITTER, timeout=CHECK_TIMEOUT)
+        if start:
+            self.scheduler.start()
     
-    def run(self):
-        while self.running:
+    def add_job(self, name, check, **schedule):
+        """Подключение периодической задачи к работающему планировщику.
+        
+        check(cancel_event) выполняется в рабочем потоке с сессией self.Session,
+        которая освобождается после каждого запуска; cancel_event
+        устанавливается по таймауту и при остановке. Параметры расписания -
+        как у Scheduler.add_job (interval или cron, jitter, timeout).
+        """
+        def run(cancel_event):
             try:
-                self.check_overdue_payments()
-                self.check_upcoming_orders()
-                time.sleep(3600)  # Проверка каждый час
-            except Exception as e:
-                print(f"Ошибка в фоновой задаче: {str(e)}")
+                check(cancel_event)
+            finally:
+                # Освобождаем сессию потока, чтобы соединение вернулось в пул
+                self.Session.remove()
+        return self.scheduler.add_job(name, run, **schedule)
     
-    def check_overdue_payments(self):
+    def metrics(self):
+        return self.scheduler.metrics()
+    
+    def _load_state(self, session, name):
+        state = session.query(JobState).get(name)
+        return json.loads(state.value) if state else {}
+    
+    def _notify(self, notifications, cancel_event):
+        """Запись уведомлений пачками с проверкой отмены перед каждой.
+        
+        Возвращает False, если задача отменена: состояние задачи тогда не
+        сохраняется, и следующий запуск повторит проверку (уже записанные
+        уведомления не продублируются благодаря ключу дедупликации).
+        """
+        manager = NotificationManager()
+        for start in range(0, len(notifications), NOTIFICATION_BATCH_SIZE):
+            if _cancelled(cancel_event):
+                return False
+            manager.create_notifications(notifications[start:start + NOTIFICATION_BATCH_SIZE])
+        return not _cancelled(cancel_event)
+    
+    def _save_state(self, session, name, value):
+        state = session.query(JobState).get(name)
+        if state is None:
+            state = JobState(name=name)
+            session.add(state)
+        state.value = json.dumps(value)
+        session.commit()
+    
+    def _payment_changes(self, session):
+        """Счетчик изменений таблицы payments (table_changes есть только в SQLite)"""
+        if session.get_bind().dialect.name != 'sqlite':
+            return None
+        return change_counters(session.connection()).get('payments')
+    
+    def check_overdue_payments(self, cancel_event=None):
         session = self.Session()
-        overdue_date = datetime.now().date() - timedelta(days=3)
+        today = datetime.now().date()
+        overdue_date = today - timedelta(days=3)
+        state = self._load_state(session, 'payment_overdue')
+        # Граница id и счетчик изменений фиксируются до выборки:
+        # более новые платежи попадут в следующий запуск
+        max_id = session.query(func.max(Payment.id)).scalar() or 0
+        changes = self._payment_changes(session)
         
-        # Платежи от клиентов, которые просрочены
-        overdue_payments = session.query(Payment).filter(
-            Payment.is_client_payment == True,
-            Payment.payment_date < overdue_date,
-            Payment.order.has(Order.status.notin_(["Завершен", "Отменен"]))
-        ).all()
+        # Платежи по незавершенным заказам
+        query = session.query(
+            Payment.id, Payment.order_id, Payment.amount, Payment.payment_date,
+            Payment.is_client_payment
+        ).join(Order, Order.id == Payment.order_id).filter(
+            Order.status.notin_(["Завершен", "Отменен"])
+        )
+        # Водяной знак (граница дат и id) не видит правок старых платежей
+        # (дата, тип) и возврата заказа в работу. Полная проверка
+        # выполняется при первом запуске за день, без счетчика изменений
+        # и если изменений платежей больше, чем добавлено новых строк,
+        # то есть платежи с прошлого запуска изменялись или удалялись.
+        incremental = (
+            state.get('scanned') == today.isoformat()
+            and changes is not None and state.get('changes') is not None
+            and changes - state['changes'] <= session.query(func.count(Payment.id)).filter(
+                Payment.id > state['last_id'], Payment.id <= max_id
+            ).scalar()
+        )
+        if incremental:
+            # Только платежи, ставшие просроченными с прошлого запуска
+            # (по индексу типа и даты), и добавленные после него (по диапазону id)
+            became_due = query.filter(
+                Payment.is_client_payment == True,
+                Payment.payment_date >= date.fromisoformat(state['due_before']),
+                Payment.payment_date < overdue_date
+            ).all()
+            added = [
+                payment for payment in
+                query.filter(Payment.id > state['last_id'], Payment.id <= max_id)
+                if payment.is_client_payment
+                and payment.payment_date is not None and payment.payment_date < overdue_date
+            ]
+            overdue_payments = list({payment.id: payment for payment in became_due + added}.values())
+            scanned = state['scanned']
+        else:
+            overdue_payments = query.filter(
+                Payment.is_client_payment == True,
+                Payment.payment_date < overdue_date,
+                Payment.id <= max_id
+            ).all()
+            scanned = today.isoformat()
         
-        notification_manager = NotificationManager()
-        for payment in overdue_payments:
-            message = f"Просрочен платеж по заказу #{payment.order_id} ({payment.amount} руб.)"
-            notification_manager.create_notification(
-                message=message,
-                notification_type="payment",
-                related_id=payment.order_id
-            )
+        # Одно уведомление на платеж: повторные проверки его не дублируют
+        if not self._notify([
+            {
+                'message': f"Просрочен платеж по заказу #{payment.order_id} ({payment.amount} руб.)",
+                'notification_type': "payment",
+                'related_id': payment.order_id,
+                'dedupe_key': dedupe_key("payment_overdue", payment.id, payment.payment_date),
+            }
+            for payment in overdue_payments
+        ], cancel_event):
+            return
+        self._save_state(session, 'payment_overdue', {
+            'due_before': overdue_date.isoformat(),
+            'last_id': max_id,
+            'changes': changes,
+            'scanned': scanned,
+        })
+    
+    def _existing_keys(self, session, keys):
+        """Ключи дедупликации, для которых уведомления уже есть"""
+        keys = list(keys)
+        existing = set()
+        for start in range(0, len(keys), NOTIFICATION_BATCH_SIZE):
+            existing.update(key for key, in session.query(Notification.dedupe_key).filter(
+                Notification.dedupe_key.in_(keys[start:start + NOTIFICATION_BATCH_SIZE])
+            ))
+        return existing
     
-    def check_upcoming_orders(self):
+    def check_upcoming_orders(self, cancel_event=None):
         session = self.Session()
         tomorrow = datetime.now().date() + timedelta(days=1)
         
-        # Заказы на завтра
-        upcoming_orders = session.query(Order).filter(
-            Order.loading_date == tomorrow,
-            Order.status.in_(["Создан", "В обработке"])
-        ).all()
-        
-        notification_manager = NotificationManager()
-        for order in upcoming_orders:
-            message = f"На завтра запланирована погрузка по заказу #{order.id}"
-            notification_manager.create_notification(
-                message=message,
-                notification_type="order",
-                related_id=order.id
+        # Заказы на завтра: по индексу (дата погрузки, статус) читаются только id;
+        # уведомления создаются только для заказов, по которым их еще нет
+        keys = {
+            dedupe_key("order_upcoming", order_id, tomorrow): order_id
+            for order_id, in session.query(Order.id).filter(
+                Order.loading_date == tomorrow,
+                Order.status.in_(["Создан", "В обработке"])
             )
+        }
+        existing = self._existing_keys(session, keys)
+        # Транзакция чтения завершается до записи уведомлений
+        session.rollback()
+        
+        self._notify([
+            {
+                'message': f"На завтра запланирована погрузка по заказу #{order_id}",
+                'notification_type': "order",
+                'related_id': order_id,
+                'dedupe_key': key,
+            }
+            for key, order_id in sorted(keys.items(), key=lambda item: item[1])
+            if key not in existing
+        ], cancel_event)
     
     def stop(self):
-        self.running = False
-        self.thread.join()
\ No newline at end of file
+        self.scheduler.stop()
\ No newline at end of file
@@ -0,0 +1,73 @@
+import logging
+from PyQt6.QtCore import QObject, QTimer
+from database import get_engine
+from database.changes import data_version, change_counters, LocalChangeTracker
+from utils.events import event_bus, TABLES_CHANGED
+
+logger = logging.getLogger(__name__)
+
+# Интервал проверки PRAGMA data_version, мс
+CHANGE_POLL_MS = 1000
+
+
+class ChangeWatcher(QObject):
+    """Обнаружение изменений БД, сделанных другими экземплярами приложения.
+
+    На отдельном соединении периодически читается PRAGMA data_version -
+    без обращения к таблицам. Только если номер изменился, читаются
+    счетчики table_changes и на шину публикуется событие tables.changed
+    со списком таблиц, изменившихся сверх изменений самого процесса (о них
+    формы уже узнали из доменных событий).
+    """
+
+    def __init__(self, interval=CHANGE_POLL_MS, parent=None):
+        super().__init__(parent)
+        self._connection = None
+        self._version = None
+        self._counters = {}
+        self._local = None
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.poll)
+
+    def start(self):
+        """Запуск наблюдения; False, если БД не SQLite"""
+        engine = get_engine()
+        if engine.dialect.name != 'sqlite':
+            logger.info("Отслеживание изменений БД доступно только для SQLite")
+            return False
+        # Соединение в режиме автофиксации: чтения не держат снимок БД открытым
+        self._connection = engine.connect()
+        self._local = LocalChangeTracker(engine)
+        self._version = data_version(self._connection)
+        self._counters = change_counters(self._connection)
+        self.timer.start()
+        return True
+
+    def stop(self):
+        self.timer.stop()
+        if self._local is not None:
+            self._local.close()
+            self._local = None
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def poll(self):
+        try:
+            version = data_version(self._connection)
+            if version == self._version:
+                return
+            self._version = version
+            counters = change_counters(self._connection)
+        except Exception:
+            logger.exception("Ошибка проверки изменений БД")
+            return
+
+        tables = frozenset(
+            table for table, count in counters.items()
+            if self._local.take(table, count - self._counters.get(table, 0)) > 0
+        )
+        self._counters = counters
+        if tables:
+            event_bus().publish(TABLES_CHANGED, tables=tables)
@@ -2,9 +2,20 @@ import json
 import os
 from pathlib import Path
 
+# Переменная окружения, заменяющая адрес БД из config.json
+# (генератор тестовых данных, замеры производительности)
+DATABASE_URL_ENV = 'MURPHYLOGISTIK_DATABASE_URL'
+
+# Каталог приложения: от него считаются относительные пути из config.json
+APP_DIR = Path(__file__).parent.parent
+
+def app_path(path):
+    """Абсолютный путь для пути из конфигурации, не зависящий от текущего каталога"""
+    return str(APP_DIR / path)
+
 def load_config():
     """Загрузка конфигурации приложения"""
-    config_path = Path(__file__).parent.parent / 'config.json'
+    config_path = APP_DIR / 'config.json'
     
     if not config_path.exists():
         raise FileNotFoundError("Config file not found")
@@ -18,4 +29,7 @@ def load_config():
         if key not in config:
             raise ValueError(f"Missing required config key: {key}")
     
+    if os.environ.get(DATABASE_URL_ENV):
+        config['database']['url'] = os.environ[DATABASE_URL_ENV]
+    
     return config
\ No newline at end of file
@@ -0,0 +1,292 @@
+"""Выгрузка пакета документов заказов в ZIP для бухгалтерии.
+
+Для каждого заказа в архив попадают все его документы (из хранилища
+документов, для старых документов - по исходному пути) и сводка
+платежей payments.csv, в корне архива - manifest.json с перечнем
+файлов, их размерами и SHA-256. Файлы копируются в архив блоками по
+CHUNK_SIZE, поэтому пакет любого размера не читается в память целиком;
+уже сжатые форматы (PDF, JPEG, PNG, ZIP) записываются без сжатия.
+Архив пишется во временный файл и переименовывается после успешного
+завершения.
+
+Запуск: python -m utils.document_packet packet.zip
+    {--order ID ... | [--client ID] [--date-from ГГГГ-ММ-ДД] [--date-to ГГГГ-ММ-ДД]}
+"""
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from datetime import datetime
+from database import init_db, Session
+from database.models import Order, Client, Payment, Document
+from utils.document_store import DocumentStore, CHUNK_SIZE
+from utils.query_runner import QueryCancelled
+
+# Заказов в одном запросе документов и платежей
+ORDER_BATCH_SIZE = 500
+
+MANIFEST_NAME = 'manifest.json'
+PAYMENTS_NAME = 'payments.csv'
+
+# Сигнатуры форматов, которые уже сжаты: повторное сжатие только тратит время
+_COMPRESSED_SIGNATURES = (
+    b'%PDF',
+    b'\xff\xd8\xff',  # JPEG
+    b'\x89PNG',
+    b'PK\x03\x04',  # ZIP, DOCX, XLSX
+    b'\x1f\x8b',  # GZIP
+    b'Rar!',
+    b'7z\xbc\xaf',
+)
+
+_UNSAFE_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+
+class PacketCancelled(QueryCancelled):
+    """Выгрузка прервана пользователем"""
+
+
+def _compression(path):
+    with open(path, 'rb') as f:
+        head = f.read(8)
+    if head.startswith(_COMPRESSED_SIGNATURES):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _safe_name(name):
+    return _UNSAFE_CHARS.sub('_', name).strip(' .') or '_'
+
+
+def _archive_name(document, used):
+    """Имя файла документа в папке заказа: название и расширение исходного файла, без повторов"""
+    base = _safe_name(document.name or f"Документ {document.id}")
+    _, extension = os.path.splitext(document.file_path or '')
+    if extension and not base.lower().endswith(extension.lower()):
+        base += extension
+    name = base
+    stem, extension = os.path.splitext(base)
+    number = 2
+    while name.lower() in used:
+        name = f"{stem} ({number}){extension}"
+        number += 1
+    used.add(name.lower())
+    return name
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class PacketExporter:
+    """Запись пакета документов заказов в ZIP.
+
+    progress(записано байт, всего байт) вызывается после каждого блока,
+    is_cancelled() проверяется там же; оба вызываются в потоке выгрузки.
+    """
+
+    def __init__(self, store=None, progress=None, is_cancelled=None):
+        self.store = store or DocumentStore()
+        self.progress = progress
+        self.is_cancelled = is_cancelled
+        self.done_bytes = 0
+        self.total_bytes = 0
+
+    def _documents(self, session, order_ids):
+        return session.query(
+            Document.id, Document.order_id, Document.name, Document.description,
+            Document.file_path, Document.content_hash
+        ).filter(Document.order_id.in_(order_ids)).order_by(Document.order_id, Document.id).all()
+
+    def _size(self, document):
+        path = self.store.locate(document)
+        try:
+            return os.path.getsize(path) if path else 0
+        except OSError:
+            return 0
+
+    def _report(self):
+        if self.is_cancelled is not None and self.is_cancelled():
+            raise PacketCancelled()
+        if self.progress is not None:
+            self.progress(self.done_bytes, self.total_bytes)
+
+    def _write_file(self, archive, source, arcname, expected_hash):
+        """Потоковая запись файла в архив. Возвращает (размер, sha256, состояние)"""
+        info = zipfile.ZipInfo.from_file(source, arcname)
+        info.compress_type = _compression(source)
+        digest = hashlib.sha256()
+        size = 0
+        # file_size заранее: zipfile сам включит ZIP64 для файлов больше 2 ГБ
+        with open(source, 'rb') as src, archive.open(info, 'w') as dst:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                dst.write(chunk)
+                size += len(chunk)
+                self.done_bytes += len(chunk)
+                self._report()
+        digest = digest.hexdigest()
+        status = 'ok' if expected_hash in (None, digest) else 'hash_mismatch'
+        return size, digest, status
+
+    def _write_payments(self, archive, folder, order, payments):
+        with archive.open(f"{folder}/{PAYMENTS_NAME}", 'w') as raw:
+            # utf-8-sig и ';' - файл сразу открывается в Excel
+            with io.TextIOWrapper(raw, encoding='utf-8-sig', newline='') as f:
+                writer = csv.writer(f, delimiter=';')
+                writer.writerow(["Дата", "Направление", "Сумма", "Описание"])
+                for payment in payments:
+                    writer.writerow([
+                        payment.payment_date.isoformat() if payment.payment_date else '',
+                        "От клиента" if payment.is_client_payment else "Перевозчику",
+                        f"{payment.amount:.2f}",
+                        payment.description or '',
+                    ])
+                writer.writerow([])
+                writer.writerow(["Доход", '', f"{order.income_total:.2f}", ''])
+                writer.writerow(["Расход", '', f"{order.expense_total:.2f}", ''])
+                writer.writerow(["Прибыль", '', f"{order.profit:.2f}", ''])
+
+    def export(self, session, order_ids, path):
+        """Выгрузка пакета заказов order_ids в файл path. Возвращает манифест"""
+        order_ids = sorted(set(order_ids))
+        # Общий объем для индикатора хода выгрузки
+        self.done_bytes = 0
+        self.total_bytes = sum(
+            self._size(document)
+            for batch in _chunks(order_ids, ORDER_BATCH_SIZE)
+            for document in self._documents(session, batch)
+        )
+        self._report()
+
+        manifest = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'orders': [],
+            'documents': 0,
+            'missing': 0,
+            'bytes': 0,
+        }
+        temp_path = path + '.part'
+        try:
+            with zipfile.ZipFile(temp_path, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+                for batch in _chunks(order_ids, ORDER_BATCH_SIZE):
+                    self._export_batch(session, archive, batch, manifest)
+                archive.writestr(MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=2))
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return manifest
+
+    def _export_batch(self, session, archive, order_ids, manifest):
+        orders = session.query(
+            Order.id, Order.cargo_name, Order.order_date, Order.external_ref,
+            Order.income_total, Order.expense_total, Order.profit, Client.name.label('client_name')
+        ).outerjoin(Client, Client.id == Order.client_id).filter(
+            Order.id.in_(order_ids)
+        ).order_by(Order.id).all()
+        documents = {}
+        for document in self._documents(session, order_ids):
+            documents.setdefault(document.order_id, []).append(document)
+        payments = {}
+        for payment in session.query(
+            Payment.order_id, Payment.payment_date, Payment.is_client_payment,
+            Payment.amount, Payment.description
+        ).filter(Payment.order_id.in_(order_ids)).order_by(Payment.order_id, Payment.payment_date, Payment.id):
+            payments.setdefault(payment.order_id, []).append(payment)
+
+        for order in orders:
+            folder = f"Заказ_{order.id}"
+            entry = {
+                'order_id': order.id,
+                'external_ref': order.external_ref,
+                'client': order.client_name,
+                'cargo': order.cargo_name,
+                'order_date': order.order_date.isoformat() if order.order_date else None,
+                'income_total': order.income_total,
+                'expense_total': order.expense_total,
+                'profit': order.profit,
+                'payments': f"{folder}/{PAYMENTS_NAME}",
+                'documents': [],
+            }
+            self._write_payments(archive, folder, order, payments.get(order.id, []))
+            used = {PAYMENTS_NAME}
+            for document in documents.get(order.id, []):
+                arcname = f"{folder}/{_archive_name(document, used)}"
+                item = {
+                    'document_id': document.id,
+                    'name': document.name,
+                    'description': document.description,
+                    'file': arcname,
+                }
+                source = self.store.locate(document)
+                if source and os.path.isfile(source):
+                    item['size'], item['sha256'], item['status'] = self._write_file(
+                        archive, source, arcname, document.content_hash
+                    )
+                    manifest['documents'] += 1
+                    manifest['bytes'] += item['size']
+                else:
+                    item.update(file=None, status='missing')
+                    manifest['missing'] += 1
+                entry['documents'].append(item)
+            manifest['orders'].append(entry)
+
+
+def _date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Выгрузка пакета документов заказов в ZIP")
+    parser.add_argument('output', help="файл ZIP")
+    parser.add_argument('--order', type=int, action='append', default=[], help="номер заказа (можно несколько)")
+    parser.add_argument('--client', type=int, help="все заказы клиента")
+    parser.add_argument('--date-from', type=_date, help="дата заказа от (ГГГГ-ММ-ДД)")
+    parser.add_argument('--date-to', type=_date, help="дата заказа по (ГГГГ-ММ-ДД)")
+    args = parser.parse_args(argv)
+    if not args.order and args.client is None and args.date_from is None and args.date_to is None:
+        parser.error("укажите --order, --client или период")
+
+    init_db()
+    session = Session()
+    try:
+        order_ids = list(args.order)
+        if args.client is not None or args.date_from or args.date_to:
+            query = session.query(Order.id)
+            if args.client is not None:
+                query = query.filter(Order.client_id == args.client)
+            if args.date_from:
+                query = query.filter(Order.order_date >= args.date_from)
+            if args.date_to:
+                query = query.filter(Order.order_date <= args.date_to)
+            order_ids.extend(order_id for (order_id,) in query)
+
+        started = time.perf_counter()
+
+        def progress(done, total):
+            if total:
+                print(f"\r{done * 100 // total:3d}%", end='', file=sys.stderr)
+
+        manifest = PacketExporter(progress=progress).export(session, order_ids, args.output)
+        print(file=sys.stderr)
+        print(f"Заказов: {len(manifest['orders'])}, документов: {manifest['documents']}, "
+              f"нет файлов: {manifest['missing']}, {manifest['bytes'] / 1024 / 1024:.1f} МБ "
+              f"за {time.perf_counter() - started:.1f} с")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""Хранилище документов с адресацией по содержимому.
+
+Файл, приложенный к заказу, копируется в каталог хранилища под именем
+SHA-256 своего содержимого: <корень>/ab/cd/abcd.... Один и тот же скан,
+приложенный к разным заказам, хранится один раз, а перемещение или
+удаление исходного файла документ не ломает. Хеш считается во время
+копирования блоками по CHUNK_SIZE, файл целиком в память не читается.
+
+На содержимое ссылаются документы (documents.content_hash), счетчик
+ссылок document_blobs.ref_count ведут триггеры (database/blobs.py).
+Файл удаляется вместе со строкой document_blobs, когда ссылок не
+осталось. Добавление и удаление выполняются под блокировкой записи
+SQLite: добавление сначала записывает строку содержимого и только потом
+проверяет файл, а удаление убирает файл до фиксации (в корзину, чтобы
+вернуть его при откате), поэтому параллельные добавление и удаление
+одного содержимого не оставляют документ без файла.
+
+Обслуживание: python -m utils.document_store {verify, collect, adopt}
+"""
+import argparse
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from sqlalchemy import text, bindparam
+from database import init_db, Session, blobs
+from database.models import Document
+from utils.config import load_config, app_path
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_STORE_DIR = 'document_store'
+
+# Размер блока при копировании и хешировании
+CHUNK_SIZE = 1024 * 1024
+
+# Файлы без строки в БД моложе этого срока не удаляются: их добавление
+# может быть еще не зафиксировано, с
+ORPHAN_GRACE_SECONDS = 3600
+
+# Хешей в одном запросе сверки лишних файлов
+COLLECT_BATCH_SIZE = 500
+
+_TMP_DIR = 'tmp'
+_TRASH_DIR = 'trash'
+
+
+def file_digest(path, chunk_size=CHUNK_SIZE):
+    """SHA-256 (hex) и размер файла, чтение блоками"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _is_digest(name):
+    return len(name) == 64 and all(char in '0123456789abcdef' for char in name)
+
+
+class StoreReport:
+    """Итоги проверки хранилища"""
+
+    def __init__(self):
+        self.checked = 0
+        self.missing = []  # содержимое без файла
+        self.corrupted = []  # размер или хеш файла не совпадают
+        self.orphans = []  # файлы без строки в БД
+        self.ref_mismatches = []  # (sha256, сохраненный счетчик, фактический)
+        self.dangling = []  # (id документа, content_hash) без строки содержимого
+
+    def is_ok(self):
+        return not (self.missing or self.corrupted or self.ref_mismatches or self.dangling)
+
+    def summary(self):
+        return (
+            f"Проверено файлов: {self.checked}, отсутствует {len(self.missing)}, "
+            f"повреждено {len(self.corrupted)}, лишних файлов {len(self.orphans)}, "
+            f"неверных счетчиков {len(self.ref_mismatches)}, "
+            f"документов без содержимого {len(self.dangling)}"
+        )
+
+
+class DocumentStore:
+    """Каталог содержимого документов (по умолчанию - documents.store в config.json).
+
+    Относительный путь считается от каталога приложения, а не от текущего.
+    """
+
+    def __init__(self, root=None):
+        if root is None:
+            root = load_config().get('documents', {}).get('store', DOCUMENT_STORE_DIR)
+        self.root = app_path(root)
+
+    def path_for(self, digest):
+        """Путь файла содержимого: два уровня каталогов по первым символам хеша"""
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def locate(self, document):
+        """Файл документа: из хранилища, а для документов до хранилища - исходный путь"""
+        if document.content_hash:
+            return self.path_for(document.content_hash)
+        return document.file_path
+
+    def _copy_to_temp(self, source):
+        """Копия файла во временный файл хранилища: (путь, sha256, размер)"""
+        tmp_dir = os.path.join(self.root, _TMP_DIR)
+        os.makedirs(tmp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with open(source, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+                while True:
+                    chunk = src.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    dst.write(chunk)
+                    size += len(chunk)
+                dst.flush()
+                os.fsync(dst.fileno())
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return temp_path, digest.hexdigest(), size
+
+    def add(self, session, source):
+        """Копирование файла в хранилище в транзакции session. Возвращает sha256.
+
+        Документ с этим content_hash добавляется в той же транзакции:
+        триггер увеличит счетчик ссылок при вставке.
+        """
+        temp_path, digest, size = self._copy_to_temp(source)
+        try:
+            # Запись строки берет блокировку записи до фиксации транзакции:
+            # с этого момента удалить содержимое параллельно нельзя
+            session.execute(
+                text("INSERT INTO document_blobs (sha256, size, ref_count, created_at) "
+                     "VALUES (:sha256, :size, 0, :created_at) ON CONFLICT (sha256) DO NOTHING"),
+                {'sha256': digest, 'size': size, 'created_at': datetime.now()}
+            )
+            target = self.path_for(digest)
+            if os.path.exists(target):
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(temp_path, target)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return digest
+
+    def _detach(self, session, digests=None):
+        """Удаление строк содержимого без ссылок и перенос их файлов в корзину.
+
+        digests=None - все содержимое без ссылок. Возвращает [(файл, корзина)].
+        """
+        statement = "DELETE FROM document_blobs WHERE ref_count <= 0"
+        if digests is None:
+            rows = session.execute(text(statement + " RETURNING sha256"))
+        else:
+            if not digests:
+                return []
+            rows = session.execute(
+                text(statement + " AND sha256 IN :digests RETURNING sha256")
+                .bindparams(bindparam('digests', expanding=True)),
+                {'digests': list(digests)}
+            )
+        trash_dir = os.path.join(self.root, _TRASH_DIR)
+        moved = []
+        for (digest,) in rows.fetchall():
+            target = self.path_for(digest)
+            if not os.path.exists(target):
+                continue
+            os.makedirs(trash_dir, exist_ok=True)
+            trash = os.path.join(trash_dir, digest)
+            os.replace(target, trash)
+            moved.append((target, trash))
+        return moved
+
+    def _commit_detached(self, session, moved):
+        """Фиксация удаления: при ошибке файлы возвращаются из корзины"""
+        try:
+            session.commit()
+        except BaseException:
+            session.rollback()
+            for target, trash in moved:
+                os.replace(trash, target)
+            raise
+        for _, trash in moved:
+            try:
+                os.remove(trash)
+            except OSError:
+                logger.exception("Не удалось удалить файл %s", trash)
+
+    def delete(self, session, documents):
+        """Удаление документов и содержимого, на которое больше нет ссылок, с фиксацией"""
+        digests = {document.content_hash for document in documents if document.content_hash}
+        for document in documents:
+            session.delete(document)
+        # Триггеры уменьшают счетчики при выполнении DELETE
+        session.flush()
+        moved = self._detach(session, digests)
+        self._commit_detached(session, moved)
+        return len(moved)
+
+    def _iter_files(self):
+        """Файлы содержимого: (sha256, путь)"""
+        for first in sorted(os.listdir(self.root)) if os.path.isdir(self.root) else ():
+            first_dir = os.path.join(self.root, first)
+            if len(first) != 2 or not os.path.isdir(first_dir):
+                continue
+            for second in sorted(os.listdir(first_dir)):
+                second_dir = os.path.join(first_dir, second)
+                if not os.path.isdir(second_dir):
+                    continue
+                for name in os.listdir(second_dir):
+                    if _is_digest(name):
+                        yield name, os.path.join(second_dir, name)
+
+    def _stale(self, path, now):
+        try:
+            return now - os.path.getmtime(path) > ORPHAN_GRACE_SECONDS
+        except OSError:
+            return False
+
+    def collect(self, session):
+        """Удаление содержимого без ссылок, лишних и недописанных файлов.
+
+        Обход каталогов выполняется без блокировки; лишние файлы сверяются
+        с БД и удаляются уже под блокировкой записи, взятой удалением строк.
+        Возвращает (удалено содержимого, удалено лишних файлов).
+        """
+        now = time.time()
+        candidates = {
+            digest: path for digest, path in self._iter_files() if self._stale(path, now)
+        }
+        moved = self._detach(session)
+        orphans = set(candidates)
+        names = list(candidates)
+        for start in range(0, len(names), COLLECT_BATCH_SIZE):
+            orphans.difference_update(digest for (digest,) in session.execute(
+                text("SELECT sha256 FROM document_blobs WHERE sha256 IN :digests")
+                .bindparams(bindparam('digests', expanding=True)),
+                {'digests': names[start:start + COLLECT_BATCH_SIZE]}
+            ))
+        for digest in orphans:
+            os.remove(candidates[digest])
+        self._commit_detached(session, moved)
+
+        tmp_dir = os.path.join(self.root, _TMP_DIR)
+        if os.path.isdir(tmp_dir):
+            for name in os.listdir(tmp_dir):
+                path = os.path.join(tmp_dir, name)
+                if self._stale(path, now):
+                    os.remove(path)
+        return len(moved), len(orphans)
+
+    def verify(self, session, full=False):
+        """Проверка хранилища: файлы по строкам содержимого и счетчики ссылок.
+
+        full=True - пересчет хешей всех файлов (чтение всего хранилища).
+        """
+        report = StoreReport()
+        known = set()
+        rows = session.execute(text("SELECT sha256, size FROM document_blobs ORDER BY sha256"))
+        for digest, size in rows:
+            known.add(digest)
+            path = self.path_for(digest)
+            report.checked += 1
+            if not os.path.exists(path):
+                report.missing.append(digest)
+            elif os.path.getsize(path) != size or (full and file_digest(path)[0] != digest):
+                report.corrupted.append(digest)
+        report.orphans = [path for digest, path in self._iter_files() if digest not in known]
+        connection = session.connection()
+        report.ref_mismatches = blobs.verify_ref_counts(connection)
+        report.dangling = blobs.dangling_documents(connection)
+        session.rollback()
+        return report
+
+    def adopt(self, session):
+        """Перенос в хранилище документов, добавленных до него (только путь к файлу).
+
+        Возвращает (перенесено, файлов не найдено).
+        """
+        documents = session.query(Document.id, Document.file_path).filter(
+            Document.content_hash.is_(None), Document.file_path.isnot(None)
+        ).all()
+        adopted = missing = 0
+        for document_id, file_path in documents:
+            if not os.path.isfile(file_path):
+                missing += 1
+                continue
+            digest = self.add(session, file_path)
+            session.query(Document).filter(Document.id == document_id).update(
+                {Document.content_hash: digest}, synchronize_session=False
+            )
+            session.commit()
+            adopted += 1
+        return adopted, missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Обслуживание хранилища документов")
+    parser.add_argument('command', choices=['verify', 'collect', 'adopt'])
+    parser.add_argument('--full', action='store_true', help="verify: пересчитать хеши всех файлов")
+    parser.add_argument('--root', help="каталог хранилища (по умолчанию из config.json)")
+    args = parser.parse_args(argv)
+
+    init_db()
+    store = DocumentStore(os.path.abspath(args.root) if args.root else None)
+    session = Session()
+    try:
+        if args.command == 'verify':
+            report = store.verify(session, full=args.full)
+            for digest in report.missing:
+                print(f"Нет файла: {digest}")
+            for digest in report.corrupted:
+                print(f"Поврежден: {digest}")
+            for path in report.orphans:
+                print(f"Лишний файл: {path}")
+            for digest, stored, actual in report.ref_mismatches:
+                print(f"Счетчик {digest}: сохранено {stored}, документов {actual}")
+            for document_id, digest in report.dangling:
+                print(f"Документ #{document_id}: нет содержимого {digest}")
+            print(report.summary())
+            return 0 if report.is_ok() else 1
+        elif args.command == 'collect':
+            released, orphans = store.collect(session)
+            print(f"Удалено содержимого без ссылок: {released}, лишних файлов: {orphans}")
+        elif args.command == 'adopt':
+            adopted, missing = store.adopt(session)
+            print(f"Перенесено документов: {adopted}, файлов не найдено: {missing}")
+    finally:
+        session.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
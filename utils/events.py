@@ -0,0 +1,74 @@
+import logging
+import threading
+from PyQt6.QtCore import Qt, QObject, QCoreApplication, pyqtSignal, pyqtSlot
+
+logger = logging.getLogger(__name__)
+
+# Доменные события
+CLIENT_CHANGED = 'client.changed'
+CARRIER_CHANGED = 'carrier.changed'
+ORDER_SAVED = 'order.saved'
+ORDER_DELETED = 'order.deleted'
+PAYMENT_ADDED = 'payment.added'
+DOCUMENT_ADDED = 'document.added'
+DOCUMENT_REMOVED = 'document.removed'
+NOTIFICATIONS_CHANGED = 'notifications.changed'
+
+# Изменения таблиц другими процессами (payload: tables - имена таблиц)
+TABLES_CHANGED = 'tables.changed'
+
+
+class EventBus(QObject):
+    """Шина доменных событий внутри процесса (publish/subscribe).
+
+    Подписчики вызываются в потоке шины (потоке интерфейса) через очередь
+    событий Qt - и для публикаций из фоновых потоков, и из обработчиков
+    самого интерфейса, поэтому публикация не вызывает повторного входа в
+    код, который сейчас выполняется.
+    """
+
+    _event = pyqtSignal(str, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._subscribers = {}
+        self._event.connect(self._dispatch, Qt.ConnectionType.QueuedConnection)
+
+    def subscribe(self, topic, callback):
+        self._subscribers.setdefault(topic, []).append(callback)
+
+    def unsubscribe(self, topic, callback):
+        callbacks = self._subscribers.get(topic, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def publish(self, topic, **payload):
+        self._event.emit(topic, payload)
+
+    # Слот Qt, а не простой метод: иначе PyQt создает прокси в потоке, где
+    # создана шина, и он не переезжает вместе с ней в поток интерфейса
+    @pyqtSlot(str, object)
+    def _dispatch(self, topic, payload):
+        for callback in list(self._subscribers.get(topic, [])):
+            try:
+                callback(payload)
+            except Exception:
+                logger.exception("Ошибка обработчика события %s", topic)
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def event_bus():
+    """Общая шина событий процесса"""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                bus = EventBus()
+                app = QCoreApplication.instance()
+                if app is not None:
+                    bus.moveToThread(app.thread())
+                _bus = bus
+    return _bus
@@ -0,0 +1,243 @@
+"""Потоковая выгрузка отчетов в файлы.
+
+Строки читаются из запроса пачками (yield_per) и сразу пишутся в файл,
+поэтому исходные строки не накапливаются в памяти (FPDF держит до
+сохранения только содержимое страниц). Ширины колонок считаются по
+первым WIDTH_SAMPLE_ROWS строкам в том же проходе: они нужны до записи
+данных.
+
+openpyxl и FPDF импортируются при первой выгрузке в соответствующий
+формат: модуль используется формой отчетов, и библиотеки не должны
+замедлять запуск приложения.
+"""
+import csv
+import json
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import chain, islice
+from database import reports
+from database.reports import MONEY, COUNT, DATE, MONTH
+
+# Размер пачки строк, читаемых из курсора
+EXPORT_BATCH_SIZE = 2000
+
+# Число строк, по которым оцениваются ширины колонок
+WIDTH_SAMPLE_ROWS = 1000
+
+# Ширина колонки Excel, символов
+MAX_COLUMN_WIDTH = 60
+
+MONEY_FORMAT = '#,##0.00 "руб."'
+DATE_FORMAT = 'DD.MM.YYYY'
+
+
+def stream_query(query, batch_size=EXPORT_BATCH_SIZE):
+    """Строки запроса пачками, без загрузки всего результата в память"""
+    return query.execution_options(stream_results=True).yield_per(batch_size)
+
+
+def cell_text(value, kind):
+    """Текст значения для отображения (PDF, оценка ширины колонок)"""
+    if value is None:
+        return ""
+    if kind == MONEY:
+        return f"{value:.2f} руб."
+    if kind == MONTH:
+        return reports.month_name(value)
+    if kind == DATE:
+        return value.strftime('%d.%m.%Y')
+    return str(value)
+
+
+def sample_rows(rows, size=WIDTH_SAMPLE_ROWS):
+    """Первые size строк и итератор по всем строкам, включая их"""
+    rows = iter(rows)
+    sample = list(islice(rows, size))
+    return sample, chain(sample, rows)
+
+
+def text_widths(columns, sample):
+    """Наибольшая длина текста в каждой колонке (заголовок и выборка строк)"""
+    widths = [len(header) for header, _ in columns]
+    for row in sample:
+        for index, (_, kind) in enumerate(columns):
+            widths[index] = max(widths[index], len(cell_text(row[index], kind)))
+    return widths
+
+
+class Totals:
+    """Итоги по колонкам MONEY и COUNT, накапливаемые при выгрузке"""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.values = [0 if kind in (MONEY, COUNT) else None for _, kind in columns]
+
+    def add(self, row):
+        for index, total in enumerate(self.values):
+            if total is not None and row[index] is not None:
+                self.values[index] = total + row[index]
+
+    def row(self):
+        values = list(self.values)
+        values[0] = "Итого"
+        return values
+
+
+def export_xlsx(path, columns, rows, title="Отчет"):
+    """Запись отчета в xlsx в режиме write-only. Возвращает число строк"""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment
+    from openpyxl.utils import get_column_letter
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title[:31])
+    sample, rows = sample_rows(rows)
+
+    for index, width in enumerate(text_widths(columns, sample), 1):
+        sheet.column_dimensions[get_column_letter(index)].width = min(width + 2, MAX_COLUMN_WIDTH)
+
+    bold = Font(bold=True)
+    header = []
+    for name, _ in columns:
+        cell = WriteOnlyCell(sheet, value=name)
+        cell.font = bold
+        cell.alignment = Alignment(horizontal='center')
+        header.append(cell)
+    sheet.append(header)
+
+    # Ячейки с форматом переиспользуются: строка записывается сразу при append
+    formats = {MONEY: MONEY_FORMAT, DATE: DATE_FORMAT}
+    styled = {}
+    for index, (_, kind) in enumerate(columns):
+        if kind in formats:
+            styled[index] = WriteOnlyCell(sheet)
+            styled[index].number_format = formats[kind]
+    months = [index for index, (_, kind) in enumerate(columns) if kind == MONTH]
+
+    totals = Totals(columns)
+    count = 0
+    for row in rows:
+        totals.add(row)
+        values = list(row)
+        for index in months:
+            values[index] = reports.month_name(values[index])
+        for index, cell in styled.items():
+            if values[index] is not None:
+                cell.value = values[index]
+                values[index] = cell
+        sheet.append(values)
+        count += 1
+
+    total_row = []
+    for index, value in enumerate(totals.row()):
+        cell = WriteOnlyCell(sheet, value=value)
+        cell.font = bold
+        if columns[index][1] == MONEY:
+            cell.number_format = MONEY_FORMAT
+        total_row.append(cell)
+    sheet.append(total_row)
+
+    workbook.save(path)
+    return count
+
+
+def export_pdf(path, columns, rows, title="Отчет"):
+    """Запись отчета в PDF с повторяющимся заголовком таблицы. Возвращает число строк"""
+    from utils.pdf_report import ReportPDF, PDF_FONT_SIZE, PDF_ROW_HEIGHT
+
+    pdf = ReportPDF(title, columns)
+    sample, rows = sample_rows(rows)
+    pdf.fit_widths(sample)
+    pdf.add_page()
+    pdf.set_font(pdf.font_name, '', PDF_FONT_SIZE)
+
+    totals = Totals(columns)
+    count = 0
+    for row in rows:
+        totals.add(row)
+        pdf.row(row)
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            pdf.compact_font_subsets()
+
+    pdf.set_font(pdf.font_name, 'B', PDF_FONT_SIZE)
+    pdf.row(totals.row())
+    pdf.ln(4)
+    pdf.set_font(pdf.font_name, '', PDF_FONT_SIZE)
+    pdf.cell(0, PDF_ROW_HEIGHT, f"Создано: {datetime.now().strftime('%d.%m.%Y %H:%M')}", 0, 1, 'R')
+
+    pdf.output(path, 'F')
+    return count
+
+
+@contextmanager
+def _text_output(path, encoding='utf-8'):
+    """Текстовый файл для записи; '-' - стандартный вывод"""
+    if path == '-':
+        yield sys.stdout
+    else:
+        with open(path, 'w', newline='', encoding=encoding) as output:
+            yield output
+
+
+def plain_value(value, kind):
+    """Значение для текстовых форматов: числа и даты ISO без оформления"""
+    if value is None:
+        return None
+    if kind == MONEY:
+        return round(value, 2)
+    if kind == MONTH:
+        return reports.month_name(value)
+    if kind == DATE:
+        return value.isoformat()
+    return value
+
+
+def export_csv(path, columns, rows, title="Отчет"):
+    """Запись отчета в CSV (разделитель ';', UTF-8 с BOM для Excel). Возвращает число строк"""
+    with _text_output(path, 'utf-8-sig') as output:
+        writer = csv.writer(output, delimiter=';')
+        writer.writerow([name for name, _ in columns])
+        count = 0
+        for row in rows:
+            writer.writerow([
+                plain_value(value, kind) for value, (_, kind) in zip(row, columns)
+            ])
+            count += 1
+    return count
+
+
+def export_jsonl(path, columns, rows, title="Отчет"):
+    """Запись отчета в JSON Lines: объект на строку с ключами из запроса. Возвращает число строк"""
+    with _text_output(path) as output:
+        count = 0
+        for row in rows:
+            keys = row._fields if hasattr(row, '_fields') else [name for name, _ in columns]
+            output.write(json.dumps({
+                key: plain_value(value, kind)
+                for key, value, (_, kind) in zip(keys, row, columns)
+            }, ensure_ascii=False))
+            output.write('\n')
+            count += 1
+    return count
+
+
+EXPORTERS = {
+    'xlsx': export_xlsx,
+    'pdf': export_pdf,
+    'csv': export_csv,
+    'jsonl': export_jsonl,
+}
+
+# Форматы, которые можно писать в стандартный вывод
+TEXT_FORMATS = ('csv', 'jsonl')
+
+
+def export_report(session, report_key, path, file_format, year, client_id=None):
+    """Выгрузка отчета из реестра database.reports в файл. Возвращает число строк"""
+    report = reports.REPORTS[report_key]
+    query = report.query(session, year, client_id)
+    title = f"{report.title} за {year} год"
+    return EXPORTERS[file_format](path, report.columns, stream_query(query), title=title)
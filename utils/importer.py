@@ -0,0 +1,346 @@
+"""Массовый импорт справочников, заказов и платежей из CSV и XLSX.
+
+Файл читается потоково, строка за строкой. Первая строка - заголовки,
+названия колонок совпадают с полями моделей; связи задаются естественными
+ключами: клиент - по названию, перевозчик - по названию компании,
+транспорт - по госномеру, заказ - по внешнему номеру external_ref
+(или по числовому order_id). Строки проверяются, ошибочные и уже
+существующие пропускаются, остальные вставляются пачками executemany
+в одной транзакции. В режиме проверки (dry run) БД не изменяется.
+
+Запуск: python -m utils.importer orders orders.xlsx [--dry-run]
+"""
+import argparse
+import csv
+import logging
+import os
+import sys
+from collections import namedtuple
+from datetime import date, datetime
+from database import init_db, Session
+from database.models import Client, Carrier, Vehicle, Order, Payment
+from utils.events import event_bus, TABLES_CHANGED
+from utils.notifications import NotificationManager
+
+logger = logging.getLogger(__name__)
+
+# Строк в одном executemany
+IMPORT_CHUNK_SIZE = 1000
+
+# Сколько ошибок хранится в отчете (считаются все)
+MAX_REPORTED_ERRORS = 100
+
+_TRUE = {'1', 'да', 'true', 'yes', 'от клиента', 'доход'}
+_FALSE = {'0', 'нет', 'false', 'no', 'перевозчику', 'расход'}
+
+
+def _text(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _number(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    value = str(value).strip().replace('\xa0', '').replace(' ', '').replace(',', '.')
+    return float(value) if value else None
+
+
+def _date(value):
+    if value is None or isinstance(value, date):
+        return value.date() if isinstance(value, datetime) else value
+    value = str(value).strip()
+    if not value:
+        return None
+    for pattern in ('%Y-%m-%d', '%d.%m.%Y'):
+        try:
+            return datetime.strptime(value, pattern).date()
+        except ValueError:
+            pass
+    raise ValueError(f"некорректная дата: {value}")
+
+
+def _flag(value):
+    if value is None or isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    if not text:
+        return None
+    raise ValueError(f"некорректное значение: {value}")
+
+
+def natural_key(value):
+    """Нормализованный естественный ключ: без крайних пробелов и регистра"""
+    return value.strip().casefold() if isinstance(value, str) else value
+
+
+# Поле файла: колонка модели, разбор значения, обязательность, значение по умолчанию
+Field = namedtuple('Field', 'column parse required default')
+# Ссылка: колонка файла, колонка внешнего ключа, модель и ее естественный ключ,
+# обязательность и допустимость числового id вместо ключа
+Reference = namedtuple('Reference', 'name column model key required by_id')
+# Сущность импорта: модель, естественный ключ (None - без проверки дублей), поля, ссылки
+Entity = namedtuple('Entity', 'title model key fields references')
+
+
+def _field(column, parse=_text, required=False, default=None):
+    return Field(column, parse, required, default)
+
+
+ENTITIES = {
+    'clients': Entity("Клиенты", Client, 'name', (
+        _field('name', required=True),
+        _field('contact_person'),
+        _field('phone'),
+        _field('email'),
+        _field('address'),
+        _field('is_active', _flag, default=True),
+    ), ()),
+    'carriers': Entity("Перевозчики", Carrier, 'company_name', (
+        _field('company_name', required=True),
+        _field('contact_person'),
+        _field('phone'),
+        _field('email'),
+        _field('is_active', _flag, default=True),
+    ), ()),
+    'vehicles': Entity("Транспорт", Vehicle, 'plate_number', (
+        _field('plate_number', required=True),
+        _field('model'),
+        _field('capacity', _number),
+    ), (
+        Reference('carrier', 'carrier_id', Carrier, 'company_name', False, False),
+    )),
+    'orders': Entity("Заказы", Order, 'external_ref', (
+        _field('external_ref', required=True),
+        _field('loading_address', required=True),
+        _field('unloading_address', required=True),
+        _field('cargo_name'),
+        _field('packaging'),
+        _field('weight', _number),
+        _field('loading_type'),
+        _field('order_date', _date),
+        _field('loading_date', _date),
+        _field('status', default='Создан'),
+    ), (
+        Reference('client', 'client_id', Client, 'name', True, False),
+        Reference('carrier', 'carrier_id', Carrier, 'company_name', False, False),
+        Reference('vehicle', 'vehicle_id', Vehicle, 'plate_number', False, False),
+    )),
+    # У платежа нет естественного ключа: повторный импорт файла добавит их снова
+    'payments': Entity("Платежи", Payment, None, (
+        _field('amount', _number, required=True),
+        _field('payment_date', _date),
+        _field('is_client_payment', _flag, required=True),
+        _field('description'),
+    ), (
+        # Заказы, созданные в приложении, не имеют внешнего номера: указывается id
+        Reference('order', 'order_id', Order, 'external_ref', True, True),
+    )),
+}
+
+
+def read_csv(path):
+    """Строки CSV-файла словарями; разделитель ';' или ','"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        sample = f.readline()
+        f.seek(0)
+        delimiter = ';' if sample.count(';') >= sample.count(',') else ','
+        yield from csv.DictReader(f, delimiter=delimiter)
+
+
+def read_xlsx(path):
+    """Строки первого листа книги словарями (книга читается потоково)"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [_text(name) for name in next(rows, ())]
+        for values in rows:
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+READERS = {'.csv': read_csv, '.xlsx': read_xlsx}
+
+
+def read_rows(path):
+    """Строки файла с заголовками в нижнем регистре"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in READERS:
+        raise ValueError(f"Неподдерживаемый формат файла: {extension}")
+    for row in READERS[extension](path):
+        yield {natural_key(name): value for name, value in row.items() if name}
+
+
+class ImportReport:
+    """Итоги импорта: прочитано, добавлено, пропущено дублей и ошибки по строкам"""
+
+    def __init__(self, entity, dry_run):
+        self.entity = entity
+        self.dry_run = dry_run
+        self.total = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def summary(self):
+        action = "будет добавлено" if self.dry_run else "добавлено"
+        return (
+            f"Импорт ({ENTITIES[self.entity].title.lower()}): прочитано строк {self.total}, "
+            f"{action} {self.inserted}, уже существует {self.duplicates}, "
+            f"с ошибками {self.error_count}"
+        )
+
+
+class BulkImporter:
+    """Импорт файла в таблицу одной сущности.
+
+    Справочники для разрешения ссылок и ключи существующих записей
+    загружаются один раз до чтения файла: две колонки на таблицу, без
+    запросов на каждую строку.
+    """
+
+    def __init__(self, entity, chunk_size=IMPORT_CHUNK_SIZE):
+        if entity not in ENTITIES:
+            raise ValueError(f"Неизвестная сущность: {entity}")
+        self.entity = entity
+        self.spec = ENTITIES[entity]
+        self.chunk_size = chunk_size
+        self.engine = init_db()
+
+    def _key_map(self, session, reference):
+        """{естественный ключ: id}; при повторах ключа берется первая запись.
+
+        Для ссылок by_id в словарь добавляются и строковые id записей.
+        """
+        model = reference.model
+        rows = session.query(getattr(model, reference.key), model.id).order_by(model.id.desc())
+        keys = {}
+        for value, id in rows:
+            if reference.by_id:
+                keys.setdefault(str(id), id)
+            if value is not None:
+                keys[natural_key(value)] = id
+        return keys
+
+    def _existing_keys(self, session):
+        column = getattr(self.spec.model, self.spec.key)
+        return {
+            natural_key(value)
+            for value, in session.query(column).filter(column.isnot(None))
+        }
+
+    def _parse(self, row, references):
+        """Запись для вставки из строки файла; ValueError с причиной при ошибке"""
+        record = {}
+        for field in self.spec.fields:
+            try:
+                value = field.parse(row.get(field.column))
+            except ValueError as e:
+                raise ValueError(f"{field.column}: {e}")
+            if value is None:
+                if field.required:
+                    raise ValueError(f"не заполнено поле {field.column}")
+                value = field.default
+            record[field.column] = value
+
+        for reference in self.spec.references:
+            value = _text(row.get(reference.name))
+            target = references[reference.name].get(natural_key(value)) if value else None
+            if target is None and (value or reference.required):
+                raise ValueError(f"не найдено: {reference.name} = {value or '(пусто)'}")
+            record[reference.column] = target
+        return record
+
+    def run(self, path, dry_run=False):
+        """Импорт файла; возвращает ImportReport"""
+        report = ImportReport(self.entity, dry_run)
+        table = self.spec.model.__table__
+        session = Session()
+        try:
+            references = {
+                reference.name: self._key_map(session, reference)
+                for reference in self.spec.references
+            }
+            existing = self._existing_keys(session) if self.spec.key else set()
+
+            chunk = []
+            for line, row in enumerate(read_rows(path), start=2):
+                report.total += 1
+                try:
+                    record = self._parse(row, references)
+                except ValueError as e:
+                    report.add_error(line, str(e))
+                    continue
+
+                if self.spec.key:
+                    key = natural_key(record[self.spec.key])
+                    if key in existing:
+                        report.duplicates += 1
+                        continue
+                    existing.add(key)
+
+                report.inserted += 1
+                if dry_run:
+                    continue
+                chunk.append(record)
+                if len(chunk) >= self.chunk_size:
+                    session.execute(table.insert(), chunk)
+                    chunk = []
+
+            if chunk:
+                session.execute(table.insert(), chunk)
+            if not dry_run:
+                session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+        if not dry_run and report.inserted:
+            self._announce(report)
+        return report
+
+    def _announce(self, report):
+        """Одно итоговое уведомление и событие об изменении таблицы"""
+        try:
+            NotificationManager().create_notification(report.summary(), "import")
+        except Exception:
+            logger.exception("Не удалось создать уведомление об импорте")
+        event_bus().publish(TABLES_CHANGED, tables=frozenset({self.spec.model.__tablename__}))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Массовый импорт данных из CSV/XLSX")
+    parser.add_argument('entity', choices=sorted(ENTITIES))
+    parser.add_argument('path', help="файл .csv или .xlsx")
+    parser.add_argument('--dry-run', action='store_true', help="только проверка, без записи в БД")
+    parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    report = BulkImporter(args.entity, args.chunk_size).run(args.path, args.dry_run)
+    print(report.summary())
+    for line, message in report.errors:
+        print(f"  строка {line}: {message}")
+    if report.error_count > len(report.errors):
+        print(f"  ... и еще {report.error_count - len(report.errors)}")
+    return 1 if report.error_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,26 @@
 import logging
 import sys
+from datetime import datetime
 from PyQt6.QtWidgets import QMessageBox
-from database import init_db
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from database import init_db, Session
 from database.models import Notification
+from utils.events import event_bus, NOTIFICATIONS_CHANGED
+
+# Размер пачки для многострочного INSERT
+NOTIFICATION_BATCH_SIZE = 500
+
+# INSERT ... ON CONFLICT по диалекту БД; для остальных - выборка ключей и UPDATE/INSERT
+_UPSERT_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def dedupe_key(notification_type, related_id, period):
+    """Ключ дедупликации: одно уведомление на тип, объект и период"""
+    return f"{notification_type}:{related_id}:{period}"
 
 def setup_error_handler():
     """Настройка обработчика ошибок для приложения"""
@@ -30,53 +47,183 @@ class NotificationManager:
     """Менеджер уведомлений для работы с БД"""
     def __init__(self):
         self.engine = init_db()
-        self.Session = sessionmaker(bind=self.engine)
+        self.Session = Session
     
-    def create_notification(self, message, notification_type, related_id=0, user_id=0):
+    def create_notification(self, message, notification_type, related_id=0, user_id=0,
+                            dedupe_key=None):
         """Создание нового уведомления"""
-        session = self.Session()
-        notification = Notification(
-            user_id=user_id,
-            message=message,
-            notification_type=notification_type,
-            related_id=related_id
+        if dedupe_key is not None:
+            return self._create_deduplicated(
+                message, notification_type, related_id, user_id, dedupe_key
+            )
+        
+        session = self.Session(expire_on_commit=False)
+        try:
+            notification = Notification(
+                user_id=user_id,
+                message=message,
+                notification_type=notification_type,
+                related_id=related_id
+            )
+            session.add(notification)
+            session.commit()
+        finally:
+            session.close()
+        event_bus().publish(NOTIFICATIONS_CHANGED)
+        return notification
+    
+    def _upsert(self, session, rows):
+        """INSERT ... ON CONFLICT (dedupe_key) DO UPDATE текста уведомления"""
+        dialect = session.get_bind().dialect.name
+        if dialect not in _UPSERT_INSERTS:
+            self._upsert_by_select(session, rows)
+            return
+        statement = _UPSERT_INSERTS[dialect](Notification).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Notification.dedupe_key],
+            set_={'message': statement.excluded.message}
         )
-        session.add(notification)
-        session.commit()
+        session.execute(statement)
+    
+    def _upsert_by_select(self, session, rows):
+        """Дедупликация без ON CONFLICT: обновление найденных ключей, вставка остальных.
+        
+        Параллельная вставка того же ключа между выборкой и INSERT
+        завершится ошибкой уникального индекса, а не дублем.
+        """
+        keys = {row['dedupe_key'] for row in rows if row['dedupe_key'] is not None}
+        existing = dict(
+            session.query(Notification.dedupe_key, Notification.id).filter(
+                Notification.dedupe_key.in_(keys)
+            )
+        ) if keys else {}
+        updates = {}
+        inserts = []
+        new_rows = {}
+        for row in rows:
+            key = row['dedupe_key']
+            if key is None:
+                inserts.append(row)
+            elif key in existing:
+                updates[key] = {'id': existing[key], 'message': row['message']}
+            elif key in new_rows:
+                new_rows[key]['message'] = row['message']
+            else:
+                new_rows[key] = dict(row)
+                inserts.append(new_rows[key])
+        if updates:
+            session.bulk_update_mappings(Notification, list(updates.values()))
+        if inserts:
+            session.execute(insert(Notification), inserts)
+    
+    def _create_deduplicated(self, message, notification_type, related_id, user_id, key):
+        """Уведомление с ключом дедупликации: новое или существующее с обновленным текстом"""
+        session = self.Session(expire_on_commit=False)
+        try:
+            self._upsert(session, [{
+                'user_id': user_id,
+                'message': message,
+                'is_read': False,
+                'created_at': datetime.now(),
+                'related_id': related_id,
+                'notification_type': notification_type,
+                'dedupe_key': key,
+            }])
+            notification = session.query(Notification).filter(
+                Notification.dedupe_key == key
+            ).one()
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        event_bus().publish(NOTIFICATIONS_CHANGED)
         return notification
     
+    def create_notifications(self, notifications, batch_size=NOTIFICATION_BATCH_SIZE):
+        """Массовое создание уведомлений одной транзакцией.
+        
+        notifications - словари с ключами message, notification_type и
+        необязательными related_id, user_id, dedupe_key. Уведомление с уже
+        существующим dedupe_key не дублируется: обновляется только его текст,
+        статус прочтения и время создания сохраняются (INSERT ... ON CONFLICT
+        для SQLite и PostgreSQL, для прочих БД - выборка существующих ключей).
+        Возвращает число обработанных записей.
+        """
+        now = datetime.now()
+        rows = [
+            {
+                'user_id': item.get('user_id', 0),
+                'message': item['message'],
+                'is_read': False,
+                'created_at': now,
+                'related_id': item.get('related_id', 0),
+                'notification_type': item['notification_type'],
+                'dedupe_key': item.get('dedupe_key'),
+            }
+            for item in notifications
+        ]
+        if not rows:
+            return 0
+        
+        session = self.Session()
+        try:
+            for start in range(0, len(rows), batch_size):
+                self._upsert(session, rows[start:start + batch_size])
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        event_bus().publish(NOTIFICATIONS_CHANGED)
+        return len(rows)
+    
     def get_unread_notifications(self, user_id=0):
         """Получение непрочитанных уведомлений"""
         session = self.Session()
-        notifications = session.query(Notification).filter(
-            Notification.user_id == user_id,
-            Notification.is_read == False
-        ).order_by(Notification.created_at.desc()).all()
-        return notifications
+        try:
+            return session.query(Notification).filter(
+                Notification.user_id == user_id,
+                Notification.is_read == False
+            ).order_by(Notification.created_at.desc()).all()
+        finally:
+            session.close()
     
     def get_unread_count(self, user_id=0):
         """Получение количества непрочитанных уведомлений"""
         session = self.Session()
-        count = session.query(Notification).filter(
-            Notification.user_id == user_id,
-            Notification.is_read == False
-        ).count()
-        return count
+        try:
+            return session.query(Notification).filter(
+                Notification.user_id == user_id,
+                Notification.is_read == False
+            ).count()
+        finally:
+            session.close()
     
     def mark_as_read(self, notification_id):
         """Пометить уведомление как прочитанное"""
         session = self.Session()
-        notification = session.query(Notification).get(notification_id)
-        if notification:
+        try:
+            notification = session.query(Notification).get(notification_id)
+            if not notification:
+                return False
             notification.is_read = True
             session.commit()
-            return True
-        return False
+        finally:
+            session.close()
+        event_bus().publish(NOTIFICATIONS_CHANGED)
+        return True
     
     def clear_all(self, user_id=0):
         """Удалить все уведомления пользователя"""
         session = self.Session()
-        session.query(Notification).filter(
-            Notification.user_id == user_id
-        ).delete()
-        session.commit()
\ No newline at end of file
+        try:
+            session.query(Notification).filter(
+                Notification.user_id == user_id
+            ).delete()
+            session.commit()
+        finally:
+            session.close()
+        event_bus().publish(NOTIFICATIONS_CHANGED)
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""PDF-отчет на FPDF с кириллическим TTF-шрифтом.
+
+Импортируется из utils.export при первой выгрузке в PDF.
+"""
+import logging
+import os
+from functools import lru_cache
+from pathlib import Path
+import fpdf
+from fpdf import FPDF
+from database.reports import TEXT, MONEY, COUNT, INTEGER
+from utils.export import cell_text
+
+logger = logging.getLogger(__name__)
+
+# TTF-шрифты с кириллицей (семейство, обычный, жирный); берется первый найденный
+PDF_FONTS = (
+    ('DejaVu', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+     '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'),
+    ('Arial', 'C:/Windows/Fonts/arial.ttf', 'C:/Windows/Fonts/arialbd.ttf'),
+    ('Liberation', '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',
+     '/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf'),
+)
+
+# Кэш разобранных метрик шрифтов FPDF
+PDF_FONT_CACHE_DIR = Path(__file__).parent.parent / 'cache' / 'fonts'
+
+PDF_FONT_SIZE = 8
+
+# Колонки, выравниваемые в PDF по правому краю
+NUMERIC = (MONEY, COUNT, INTEGER)
+PDF_ROW_HEIGHT = 6
+
+
+@lru_cache(maxsize=None)
+def _pdf_font():
+    """Семейство и файлы шрифта для PDF (None - встроенный Arial без кириллицы).
+
+    Метрики TTF разбираются один раз и кэшируются FPDF на диске.
+    """
+    for family, regular, bold in PDF_FONTS:
+        if os.path.exists(regular) and os.path.exists(bold):
+            PDF_FONT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            fpdf.set_global('FPDF_CACHE_MODE', 2)
+            fpdf.set_global('FPDF_CACHE_DIR', str(PDF_FONT_CACHE_DIR))
+            return family, regular, bold
+    logger.warning("Не найден TTF-шрифт с кириллицей, используется встроенный Arial")
+    return None
+
+
+class ReportPDF(FPDF):
+    """PDF-отчет: заголовок таблицы повторяется на каждой странице"""
+
+    def __init__(self, title, columns):
+        super().__init__()
+        self.report_title = title
+        self.columns = columns
+        self.widths = None
+        font = _pdf_font()
+        if font:
+            family, regular, bold = font
+            self.add_font(family, '', regular, uni=True)
+            self.add_font(family, 'B', bold, uni=True)
+            self.font_name = family
+        else:
+            self.font_name = 'Arial'
+        self.alias_nb_pages()
+        self.set_auto_page_break(True, margin=15)
+
+    def fit_widths(self, sample):
+        """Ширины колонок по выборке строк, растянутые на ширину страницы"""
+        padding = 2 * self.c_margin + 1
+        self.set_font(self.font_name, 'B', PDF_FONT_SIZE)
+        widths = [self.get_string_width(name) + padding for name, _ in self.columns]
+        self.set_font(self.font_name, '', PDF_FONT_SIZE)
+        for row in sample:
+            for index, (_, kind) in enumerate(self.columns):
+                text = cell_text(row[index], kind)
+                widths[index] = max(widths[index], self.get_string_width(text) + padding)
+        available = self.w - self.l_margin - self.r_margin
+        scale = available / sum(widths)
+        self.widths = [width * scale for width in widths]
+
+    def header(self):
+        self.set_font(self.font_name, 'B', 12 if self.page_no() == 1 else PDF_FONT_SIZE)
+        self.cell(0, 10 if self.page_no() == 1 else PDF_ROW_HEIGHT, self.report_title, 0, 1, 'C')
+        if self.widths:
+            self.set_font(self.font_name, 'B', PDF_FONT_SIZE)
+            for (name, _), width in zip(self.columns, self.widths):
+                self.cell(width, PDF_ROW_HEIGHT + 1, name, 1, 0, 'C')
+            self.ln()
+
+    def footer(self):
+        self.set_y(-12)
+        self.set_font(self.font_name, '', PDF_FONT_SIZE)
+        self.cell(0, 8, f"Страница {self.page_no()} из {{nb}}", 0, 0, 'C')
+
+    def compact_font_subsets(self):
+        """Удаление повторов из списков использованных символов TTF-шрифтов.
+
+        FPDF дописывает символы в список при каждом выводе ячейки: без
+        сжатия список растет с числом строк, а запись ширин шрифта при
+        сохранении становится квадратичной.
+        """
+        for font in self.fonts.values():
+            if font.get('type') == 'TTF':
+                font['subset'] = sorted(set(font['subset']))
+
+    def _putfonts(self):
+        self.compact_font_subsets()
+        super()._putfonts()
+
+    def _fit_text(self, text, width):
+        """Обрезка текста, не помещающегося в колонку"""
+        limit = width - 2 * self.c_margin
+        if self.get_string_width(text) <= limit:
+            return text
+        while text and self.get_string_width(text + "...") > limit:
+            text = text[:-1]
+        return text + "..."
+
+    def row(self, values):
+        for (_, kind), value, width in zip(self.columns, values, self.widths):
+            text = value if isinstance(value, str) else cell_text(value, kind)
+            if kind == TEXT:
+                text = self._fit_text(text, width)
+            self.cell(width, PDF_ROW_HEIGHT, text, 1, 0, 'R' if kind in NUMERIC else 'L')
+        self.ln()
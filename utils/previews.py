@@ -0,0 +1,309 @@
+"""Миниатюры и уменьшенные копии документов для быстрого просмотра.
+
+Первая страница PDF (модуль QtPdf; если его нет в сборке PyQt6, для PDF
+показывается "превью недоступно") или изображение отрисовывается в пуле
+рабочих потоков один раз: сразу в размере превью, миниатюра получается
+уменьшением превью. Изображения читаются QImageReader с уменьшением при
+декодировании, поэтому большой скан целиком в память не распаковывается.
+Поток интерфейса только читает из кэша готовые небольшие JPEG.
+
+Кэш лежит на диске (секция previews config.json) и ограничен по размеру:
+при превышении удаляются давно не открывавшиеся файлы (LRU, порядок
+хранится во времени изменения файла и переживает перезапуск).
+Ключ кэша - хеш содержимого документа в хранилище.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QSize, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader, QPainter
+from utils.config import load_config
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_CACHE_DIR = os.path.join('cache', 'previews')
+PREVIEW_CACHE_MB = 256
+
+# Рабочих потоков отрисовки
+MAX_PREVIEW_THREADS = 2
+
+# Виды изображений и их наибольшая сторона, px
+THUMBNAIL = 'thumb'
+PREVIEW = 'preview'
+SIZES = {THUMBNAIL: 160, PREVIEW: 1200}
+
+JPEG_QUALITY = 85
+
+
+def preview_key(document):
+    """Ключ кэша документа: хеш содержимого, для документов вне хранилища - хеш пути"""
+    if document.content_hash:
+        return document.content_hash
+    return 'path-' + hashlib.sha1((document.file_path or '').encode('utf-8')).hexdigest()
+
+
+def _is_pdf(path):
+    with open(path, 'rb') as f:
+        return f.read(5) == b'%PDF-'
+
+
+PDF_UNAVAILABLE = "Просмотр PDF недоступен: не установлен модуль PyQt6.QtPdf"
+
+_qtpdf_lock = threading.Lock()
+_qtpdf = []  # [класс QPdfDocument или None] после первой попытки импорта
+
+
+def _pdf_document_class():
+    """QPdfDocument или None, если QtPdf нет в сборке PyQt6 (сообщение в журнал - один раз)"""
+    with _qtpdf_lock:
+        if not _qtpdf:
+            try:
+                from PyQt6.QtPdf import QPdfDocument
+            except ImportError:
+                logger.warning("%s, превью PDF отключены", PDF_UNAVAILABLE)
+                QPdfDocument = None
+            _qtpdf.append(QPdfDocument)
+        return _qtpdf[0]
+
+
+def _render_pdf(path, box):
+    QPdfDocument = _pdf_document_class()
+    if QPdfDocument is None:
+        raise ValueError(PDF_UNAVAILABLE)
+
+    document = QPdfDocument(None)
+    try:
+        if document.load(path) != QPdfDocument.Error.None_ or document.pageCount() == 0:
+            return None
+        size = document.pagePointSize(0).toSize().scaled(box, Qt.AspectRatioMode.KeepAspectRatio)
+        return document.render(0, size)
+    finally:
+        document.close()
+
+
+def _render_image(path, box):
+    reader = QImageReader(path)
+    reader.setDecideFormatFromContent(True)
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if size.isValid() and (size.width() > box.width() or size.height() > box.height()):
+        # Уменьшение при декодировании (для JPEG - без распаковки полного размера)
+        reader.setScaledSize(size.scaled(box, Qt.AspectRatioMode.KeepAspectRatio))
+    image = reader.read()
+    return None if image.isNull() else image
+
+
+def _on_white(image):
+    """Прозрачный фон страницы PDF заменяется белым (JPEG без альфа-канала)"""
+    if not image.hasAlphaChannel():
+        return image
+    result = QImage(image.size(), QImage.Format.Format_RGB32)
+    result.fill(Qt.GlobalColor.white)
+    painter = QPainter(result)
+    painter.drawImage(0, 0, image)
+    painter.end()
+    return result
+
+
+def render_first_page(path, max_side):
+    """Первая страница PDF или изображение, вписанные в квадрат max_side. None - формат не поддерживается"""
+    box = QSize(max_side, max_side)
+    image = _render_pdf(path, box) if _is_pdf(path) else _render_image(path, box)
+    if image is None or image.isNull():
+        return None
+    if image.width() > max_side or image.height() > max_side:
+        image = image.scaled(box, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+    return _on_white(image)
+
+
+def _mtime(path):
+    """Время изменения файла; None, если файла нет"""
+    try:
+        return os.path.getmtime(path) if path else None
+    except OSError:
+        return None
+
+
+class PreviewCache:
+    """Файлы превью на диске с вытеснением давно не использованных (потокобезопасный)"""
+
+    def __init__(self, root, max_bytes):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = None  # имя файла -> размер, от давних к недавним
+        self._total = 0
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        entries = []
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith('.jpg'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name, stat.st_size))
+        entries.sort()
+        self._index = OrderedDict((name, size) for _, name, size in entries)
+        self._total = sum(self._index.values())
+
+    def _name(self, key, kind):
+        return f"{key}.{kind}.jpg"
+
+    def get(self, key, kind):
+        """Путь файла из кэша или None; файл становится недавно использованным"""
+        name = self._name(key, kind)
+        path = os.path.join(self.root, name)
+        with self._lock:
+            self._load_index()
+            if name not in self._index:
+                return None
+            try:
+                os.utime(path)
+            except OSError:
+                # Файл удален другим экземпляром приложения
+                self._total -= self._index.pop(name)
+                return None
+            self._index.move_to_end(name)
+        return path
+
+    def put(self, key, kind, image):
+        """Сохранение изображения в кэш и вытеснение старых файлов сверх лимита"""
+        name = self._name(key, kind)
+        path = os.path.join(self.root, name)
+        os.makedirs(self.root, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        os.close(fd)
+        try:
+            if not image.save(temp_path, 'JPG', JPEG_QUALITY):
+                raise OSError(f"Не удалось записать {temp_path}")
+            size = os.path.getsize(temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        with self._lock:
+            self._load_index()
+            self._total += size - self._index.pop(name, 0)
+            self._index[name] = size
+            while self._total > self.max_bytes and len(self._index) > 1:
+                old_name, old_size = self._index.popitem(last=False)
+                self._total -= old_size
+                try:
+                    os.remove(os.path.join(self.root, old_name))
+                except OSError:
+                    pass
+        return path
+
+    def size(self):
+        with self._lock:
+            self._load_index()
+            return self._total
+
+
+class _TaskSignals(QObject):
+    done = pyqtSignal(str, str)  # ключ, ошибка ('' - успешно)
+
+
+class _RenderTask(QRunnable):
+    """Отрисовка превью и миниатюры одного документа в рабочем потоке"""
+
+    def __init__(self, cache, key, path, mtime=None):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.cache = cache
+        self.key = key
+        self.path = path
+        self.mtime = mtime  # время изменения файла при постановке в очередь
+        self.signals = _TaskSignals()
+
+    def run(self):
+        error = ''
+        try:
+            if not self.path or not os.path.isfile(self.path):
+                raise FileNotFoundError(f"Файл не найден: {self.path}")
+            image = render_first_page(self.path, SIZES[PREVIEW])
+            if image is None:
+                raise ValueError("Формат файла не поддерживается")
+            self.cache.put(self.key, PREVIEW, image)
+            self.cache.put(self.key, THUMBNAIL, image.scaled(
+                QSize(SIZES[THUMBNAIL], SIZES[THUMBNAIL]), Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.SmoothTransformation
+            ))
+        except Exception as e:
+            if not isinstance(e, (FileNotFoundError, ValueError)):
+                logger.exception("Ошибка отрисовки превью %s", self.path)
+            error = str(e) or e.__class__.__name__
+        self.signals.done.emit(self.key, error)
+
+
+class PreviewService(QObject):
+    """Превью документов: кэш и очередь отрисовки в пуле потоков.
+
+    cached() отдает готовый файл сразу, request() ставит отрисовку в
+    очередь; по готовности испускается ready(ключ) или failed(ключ, причина).
+    """
+
+    ready = pyqtSignal(str)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        settings = load_config().get('previews', {})
+        self.cache = PreviewCache(
+            settings.get('cache', PREVIEW_CACHE_DIR),
+            settings.get('max_mb', PREVIEW_CACHE_MB) * 1024 * 1024
+        )
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(MAX_PREVIEW_THREADS)
+        self._pending = {}  # ключ -> задача
+        # ключ -> (время изменения файла, причина): неудачная отрисовка
+        # повторяется, только когда файл появился или изменился
+        self._errors = {}
+
+    def cached(self, key, kind):
+        return self.cache.get(key, kind)
+
+    def error(self, key):
+        error = self._errors.get(key)
+        return error[1] if error else None
+
+    def request(self, key, path):
+        """Отрисовка превью документа, если их еще нет в кэше"""
+        if key in self._pending:
+            return
+        mtime = _mtime(path)
+        if key in self._errors:
+            if self._errors[key][0] == mtime:
+                return
+            del self._errors[key]
+        if self.cache.get(key, THUMBNAIL) and self.cache.get(key, PREVIEW):
+            return
+        task = _RenderTask(self.cache, key, path, mtime)
+        task.signals.done.connect(self._on_done)
+        self._pending[key] = task
+        self.pool.start(task)
+
+    def _on_done(self, key, error):
+        task = self._pending.pop(key, None)
+        if error:
+            self._errors[key] = (task.mtime if task else None, error)
+            self.failed.emit(key, error)
+        else:
+            self.ready.emit(key)
+
+
+_service = None
+
+
+def preview_service():
+    """Общий для окон сервис превью"""
+    global _service
+    if _service is None:
+        _service = PreviewService()
+    return _service
@@ -0,0 +1,122 @@
+import logging
+import threading
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from database import Session
+
+logger = logging.getLogger(__name__)
+
+# Число потоков для запросов; не больше размера пула соединений
+MAX_QUERY_THREADS = 4
+
+
+class QueryCancelled(Exception):
+    """Задача прервана пользователем: не ошибка, пишется в журнал только на уровне DEBUG"""
+
+
+class _TaskSignals(QObject):
+    done = pyqtSignal(object)
+
+
+class _QueryTask(QRunnable):
+    """Запрос к БД в рабочем потоке с собственной сессией"""
+
+    def __init__(self, key, fn):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.key = key
+        self.fn = fn
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        self.signals = _TaskSignals()
+        self._dbapi_connection = None
+        self._lock = threading.Lock()
+
+    def run(self):
+        if not self.cancelled:
+            session = Session()
+            try:
+                with self._lock:
+                    self._dbapi_connection = session.connection().connection.dbapi_connection
+                self.result = self.fn(session)
+            except Exception as e:
+                self.error = e
+            finally:
+                with self._lock:
+                    self._dbapi_connection = None
+                session.close()
+        self.signals.done.emit(self)
+
+    def cancel(self):
+        """Отмена: результат будет отброшен, выполняемый запрос SQLite прерван"""
+        self.cancelled = True
+        with self._lock:
+            if self._dbapi_connection is not None and hasattr(self._dbapi_connection, 'interrupt'):
+                self._dbapi_connection.interrupt()
+
+
+class QueryRunner(QObject):
+    """Выполнение запросов к БД вне потока интерфейса.
+
+    fn(session) выполняется в пуле потоков, результат передается в
+    on_result уже в потоке интерфейса. Новый запрос с тем же ключом
+    отменяет предыдущий: его результат не будет доставлен.
+    """
+
+    _pool = None
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._current = {}  # key -> (task, on_result, on_error)
+        self._alive = set()  # задачи, которые еще выполняются в пуле
+
+    @classmethod
+    def pool(cls):
+        if cls._pool is None:
+            cls._pool = QThreadPool()
+            cls._pool.setMaxThreadCount(MAX_QUERY_THREADS)
+        return cls._pool
+
+    def submit(self, key, fn, on_result, on_error=None):
+        self.cancel(key)
+        task = _QueryTask(key, fn)
+        task.signals.done.connect(self._on_done)
+        self._current[key] = (task, on_result, on_error)
+        self._alive.add(task)
+        self.pool().start(task)
+        return task
+
+    def cancel(self, key):
+        entry = self._current.pop(key, None)
+        if entry is None:
+            return
+        task = entry[0]
+        task.cancel()
+        if self.pool().tryTake(task):
+            # Задача еще не начиналась - завершения в пуле не будет
+            self._alive.discard(task)
+
+    def cancel_all(self):
+        for key in list(self._current):
+            self.cancel(key)
+
+    def is_running(self, key):
+        return key in self._current
+
+    def _on_done(self, task):
+        self._alive.discard(task)
+        entry = self._current.get(task.key)
+        if entry is None or entry[0] is not task:
+            return  # запрос устарел или отменен
+        del self._current[task.key]
+        _, on_result, on_error = entry
+
+        if task.error is not None:
+            if isinstance(task.error, QueryCancelled):
+                logger.debug("Запрос %s прерван", task.key)
+            else:
+                logger.error("Ошибка запроса к БД", exc_info=task.error)
+            if on_error:
+                on_error(task.error)
+            return
+        on_result(task.result)
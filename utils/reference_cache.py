@@ -0,0 +1,105 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+from database import Session
+from database.models import Client, Carrier, Vehicle
+from utils.events import event_bus, CLIENT_CHANGED, CARRIER_CHANGED, TABLES_CHANGED
+
+CLIENTS = 'clients'
+CARRIERS = 'carriers'
+VEHICLES = 'vehicles'
+
+
+class ReferenceCache(QObject):
+    """Общий для всех форм кэш справочников для выпадающих списков.
+
+    Хранит пары (id, название) клиентов, перевозчиков и ТС. Данные
+    загружаются одним запросом при первом обращении и сбрасываются по
+    событиям изменения справочников на шине; формы получают сигнал
+    changed и перезаполняют свои списки из памяти.
+    """
+
+    changed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._data = {}
+        bus = event_bus()
+        bus.subscribe(CLIENT_CHANGED, lambda payload: self.invalidate(CLIENTS))
+        bus.subscribe(CARRIER_CHANGED, lambda payload: self.invalidate(CARRIERS, VEHICLES))
+        bus.subscribe(TABLES_CHANGED, self.on_tables_changed)
+
+    def on_tables_changed(self, payload):
+        # Имена справочников совпадают с именами таблиц
+        self.invalidate(*(entity for entity in (CLIENTS, CARRIERS, VEHICLES)
+                          if entity in payload['tables']))
+
+    def _load(self, entity):
+        session = Session()
+        try:
+            if entity == CLIENTS:
+                return [
+                    tuple(row) for row in
+                    session.query(Client.id, Client.name).order_by(Client.name, Client.id)
+                ]
+            if entity == CARRIERS:
+                return [
+                    tuple(row) for row in
+                    session.query(Carrier.id, Carrier.company_name)
+                    .order_by(Carrier.company_name, Carrier.id)
+                ]
+            if entity == VEHICLES:
+                vehicles = {}
+                for vehicle_id, carrier_id, plate, model in session.query(
+                    Vehicle.id, Vehicle.carrier_id, Vehicle.plate_number, Vehicle.model
+                ).order_by(Vehicle.id):
+                    vehicles.setdefault(carrier_id, []).append((vehicle_id, f"{plate} ({model})"))
+                return vehicles
+            raise ValueError(f"Неизвестный справочник: {entity}")
+        finally:
+            session.close()
+
+    def _get(self, entity):
+        if entity not in self._data:
+            self._data[entity] = self._load(entity)
+        return self._data[entity]
+
+    def clients(self):
+        return self._get(CLIENTS)
+
+    def carriers(self):
+        return self._get(CARRIERS)
+
+    def vehicles(self, carrier_id):
+        return self._get(VEHICLES).get(carrier_id, [])
+
+    def name(self, entity, entity_id):
+        """Название записи справочника по id (None, если не найдена)"""
+        return dict(self._get(entity)).get(entity_id)
+
+    def invalidate(self, *entities):
+        """Сброс справочников после изменения данных"""
+        for entity in entities:
+            self._data.pop(entity, None)
+            self.changed.emit(entity)
+
+    def fill_combo(self, combo, items, all_label=None):
+        """Заполнение списка с сохранением выбранного значения"""
+        current = combo.currentData()
+        combo.clear()
+        if all_label:
+            combo.addItem(all_label, 0)
+        for item_id, name in items:
+            combo.addItem(name, item_id)
+        index = combo.findData(current) if current is not None else -1
+        if index >= 0:
+            combo.setCurrentIndex(index)
+
+
+_cache = None
+
+
+def reference_cache():
+    """Общий экземпляр кэша справочников"""
+    global _cache
+    if _cache is None:
+        _cache = ReferenceCache()
+    return _cache
@@ -0,0 +1,315 @@
+"""Планировщик периодических задач.
+
+Задача запускается по интервалу (секунды) или по cron-выражению из пяти
+полей "минута час день месяц день_недели". Задачи выполняются в
+ограниченном пуле потоков, поэтому долгая задача не задерживает
+остальные. Функция задачи получает threading.Event, который
+устанавливается при превышении таймаута и при остановке планировщика:
+долгие задачи должны проверять его и завершаться.
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Число потоков для выполнения задач
+DEFAULT_WORKERS = 2
+
+# Максимальное ожидание цикла планировщика, с (переоценка после смены часов)
+MAX_WAIT = 60
+
+_CRON_FIELDS = (
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day', 1, 31),
+    ('month', 1, 12),
+    ('weekday', 0, 7),
+)
+
+
+def _parse_cron_field(value, low, high):
+    result = set()
+    for part in value.split(','):
+        step = 1
+        if '/' in part:
+            part, step = part.split('/')
+            step = int(step)
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(bound) for bound in part.split('-'))
+        else:
+            start = end = int(part)
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f"Некорректное поле cron: {value}")
+        result.update(range(start, end + 1, step))
+    return result
+
+
+class CronSchedule:
+    """Расписание в формате cron (день недели: 0 или 7 - воскресенье)"""
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != len(_CRON_FIELDS):
+            raise ValueError(f"Ожидается 5 полей cron: {expression}")
+        self.expression = expression
+        values = {
+            name: _parse_cron_field(field, low, high)
+            for field, (name, low, high) in zip(fields, _CRON_FIELDS)
+        }
+        self.minutes = sorted(values['minute'])
+        self.hours = sorted(values['hour'])
+        self.days = values['day']
+        self.months = values['month']
+        self.weekdays = {day % 7 for day in values['weekday']}
+        # Как в cron: если ограничены и день месяца, и день недели, подходит любой.
+        # Поле, начинающееся с '*' (в том числе */2), ограничением не считается
+        self._any_day = not fields[2].startswith('*') and not fields[4].startswith('*')
+
+    def _day_matches(self, moment):
+        if moment.month not in self.months:
+            return False
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        return (day or weekday) if self._any_day else (day and weekday)
+
+    def next_after(self, moment):
+        """Ближайшее время запуска строго после moment"""
+        start = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for _ in range(366 * 8):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"Расписание cron никогда не срабатывает: {self.expression}")
+
+
+class Job:
+    """Периодическая задача и ее статистика выполнения"""
+
+    def __init__(self, name, fn, interval=None, cron=None, jitter=0, timeout=None):
+        if (interval is None) == (cron is None):
+            raise ValueError("Нужно указать либо interval, либо cron")
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.cron = CronSchedule(cron) if cron else None
+        self.jitter = jitter
+        self.timeout = timeout
+        self.next_run = None
+        self.future = None
+        self.started = None
+        self.cancel_event = threading.Event()
+        self.timed_out = False
+        # Статистика
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.timeouts = 0
+        self.last_duration = None
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+        self.last_error = None
+
+    def next_after(self, moment):
+        if self.cron:
+            planned = self.cron.next_after(moment)
+        else:
+            planned = moment + timedelta(seconds=self.interval)
+        if self.jitter:
+            planned += timedelta(seconds=random.uniform(0, self.jitter))
+        return planned
+
+    def is_running(self):
+        return self.future is not None and not self.future.done()
+
+    def metrics(self):
+        return {
+            'runs': self.runs,
+            'failures': self.failures,
+            'skipped': self.skipped,
+            'timeouts': self.timeouts,
+            'last_duration': self.last_duration,
+            'max_duration': self.max_duration,
+            'avg_duration': self.total_duration / self.runs if self.runs else None,
+            'last_error': self.last_error,
+            'running': self.is_running(),
+            'next_run': self.next_run,
+        }
+
+
+class Scheduler:
+    """Запуск задач по расписанию в отдельном потоке.
+
+    state - необязательное хранилище времени последних запусков с методами
+    load() -> {имя: datetime} и save(имя, datetime). По нему после
+    перезапуска пропущенный запуск выполняется сразу, один раз.
+    Задача не запускается повторно, пока не завершилась предыдущая.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, state=None):
+        self.max_workers = max_workers
+        self.state = state
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._executor = None
+        self._thread = None
+
+    def add_job(self, name, fn, interval=None, cron=None, jitter=0, timeout=None):
+        """Добавление задачи; можно и после запуска планировщика"""
+        job = Job(name, fn, interval=interval, cron=cron, jitter=jitter, timeout=timeout)
+        with self._lock:
+            if name in self._jobs:
+                raise ValueError(f"Задача {name} уже добавлена")
+            if self._thread is not None:
+                self._schedule_first(job, self._last_runs())
+            self._jobs[name] = job
+        self._wakeup.set()
+        return job
+
+    def _last_runs(self):
+        if self.state is None:
+            return {}
+        try:
+            return self.state.load()
+        except Exception:
+            logger.exception("Не удалось прочитать время последних запусков задач")
+            return {}
+
+    def _schedule_first(self, job, last_runs):
+        now = datetime.now()
+        last_run = last_runs.get(job.name)
+        if last_run is not None:
+            # Пропущенный запуск (приложение было закрыто) выполняется сразу
+            job.next_run = max(job.next_after(last_run), now)
+        elif job.cron:
+            job.next_run = job.next_after(now)
+        else:
+            job.next_run = now
+
+    def start(self):
+        last_runs = self._last_runs()
+        with self._lock:
+            for job in self._jobs.values():
+                self._schedule_first(job, last_runs)
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='job')
+            self._thread = threading.Thread(target=self._loop, name='scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """Остановка: новые запуски прекращаются, выполняемым задачам подается сигнал отмены.
+
+        Завершения выполняемых задач ожидаем не дольше timeout секунд.
+        """
+        deadline = time.monotonic() + timeout
+        self._stopping.set()
+        self._wakeup.set()
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._lock:
+            running = {job.name: job.future for job in self._jobs.values() if job.is_running()}
+        if running:
+            _, not_done = wait(running.values(), timeout=max(deadline - time.monotonic(), 0))
+            if not_done:
+                logger.warning("Задачи не завершились за %s с: %s", timeout, ", ".join(
+                    name for name, future in running.items() if future in not_done
+                ))
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def run_now(self, name):
+        """Запуск задачи вне расписания"""
+        with self._lock:
+            self._jobs[name].next_run = datetime.now()
+        self._wakeup.set()
+
+    def metrics(self):
+        """Статистика выполнения: {имя задачи: словарь показателей}"""
+        with self._lock:
+            return {name: job.metrics() for name, job in self._jobs.items()}
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            with self._lock:
+                now = datetime.now()
+                self._check_timeouts(now)
+                for job in self._jobs.values():
+                    if job.next_run <= now:
+                        self._dispatch(job, now)
+                # Просыпаемся к ближайшему запуску или истечению таймаута
+                deadlines = [job.next_run for job in self._jobs.values()]
+                deadlines += [
+                    job.started + timedelta(seconds=job.timeout)
+                    for job in self._jobs.values()
+                    if job.timeout and job.is_running() and not job.timed_out
+                ]
+                timeout = min(
+                    [(deadline - now).total_seconds() for deadline in deadlines],
+                    default=MAX_WAIT
+                )
+            self._wakeup.wait(min(max(timeout, 0), MAX_WAIT))
+            self._wakeup.clear()
+
+    def _check_timeouts(self, now):
+        for job in self._jobs.values():
+            if (job.timeout and job.is_running() and not job.timed_out
+                    and (now - job.started).total_seconds() > job.timeout):
+                job.timed_out = True
+                job.timeouts += 1
+                job.cancel_event.set()
+                logger.warning("Задача %s превысила таймаут %s с", job.name, job.timeout)
+
+    def _dispatch(self, job, now):
+        # Следующий запуск считается от текущего момента: накопившиеся
+        # пропуски не выполняются подряд, а сливаются в один запуск
+        job.next_run = job.next_after(now)
+        if self._stopping.is_set():
+            return
+        if job.is_running():
+            job.skipped += 1
+            logger.warning("Задача %s еще выполняется, запуск пропущен", job.name)
+            return
+        job.started = now
+        job.timed_out = False
+        job.cancel_event = threading.Event()
+        job.future = self._executor.submit(self._execute, job, job.cancel_event)
+
+    def _execute(self, job, cancel_event):
+        started = time.perf_counter()
+        error = None
+        try:
+            job.fn(cancel_event)
+        except Exception as e:
+            error = e
+            logger.exception("Ошибка в задаче %s", job.name)
+        duration = time.perf_counter() - started
+
+        with self._lock:
+            job.runs += 1
+            job.last_duration = duration
+            job.max_duration = max(job.max_duration, duration)
+            job.total_duration += duration
+            if error is not None:
+                job.failures += 1
+                job.last_error = str(error)
+        logger.info("Задача %s выполнена за %.3f с", job.name, duration)
+
+        if self.state is not None and error is None:
+            try:
+                self.state.save(job.name, job.started)
+            except Exception:
+                logger.exception("Не удалось сохранить время запуска задачи %s", job.name)
@@ -0,0 +1,22 @@
+"""Журнал этапов запуска приложения.
+
+Время считается от импорта этого модуля - его первым импортирует
+главное окно. Строки пишутся в лог на уровне INFO, например:
+"Запуск: главное окно создано - 180 мс (+35 мс)".
+"""
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+_started = time.perf_counter()
+_last = _started
+
+
+def mark(stage):
+    """Запись этапа запуска: время от старта и от предыдущего этапа, мс"""
+    global _last
+    now = time.perf_counter()
+    logger.info("Запуск: %s - %.0f мс (+%.0f мс)", stage, (now - _started) * 1000, (now - _last) * 1000)
+    _last = now
+